@@ -1,47 +1,251 @@
-
 import os
+import json
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List
 from supabase import create_client, Client
 
 logger = logging.getLogger("AuditLogger")
 
+# Buffered writer defaults (overridable via Env)
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "50"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "2.0"))
+AUDIT_MAX_BUFFER = int(os.getenv("AUDIT_MAX_BUFFER", "5000"))
+# Local JSONL file that takes the overflow while the DB is down (replayed first on the next flush).
+# Relative paths are anchored to the worker dir, so every process start finds the same file.
+script_dir = os.path.dirname(os.path.abspath(__file__))
+AUDIT_SPILL_PATH = os.path.join(script_dir, os.getenv("AUDIT_SPILL_PATH", "audit_spill.jsonl"))
+
 class AuditLogger:
     """
     Client-side wrapper for the Immutable Audit Log.
     Just inserts data; the DB Trigger handles the hashing/chaining.
+
+    Two write paths:
+    - log_action(): synchronous single insert (Fail Closed, raises on error).
+    - log_action_async(): buffered. Entries are queued in memory and flushed
+      via the append_audit_logs RPC (one statement per batch) off the event loop. Critical actions flush immediately
+      and raise if the write fails (Fail Closed).
+      Accepted entries are never dropped: while the DB is down, whatever exceeds
+      max_buffer is spilled to a local JSONL file and replayed before newer entries.
     """
-    def __init__(self, supabase_client: Client):
+    def __init__(self, supabase_client: Client,
+                 batch_size: int = AUDIT_BATCH_SIZE,
+                 flush_interval: float = AUDIT_FLUSH_INTERVAL,
+                 max_buffer: int = AUDIT_MAX_BUFFER,
+                 spill_path: str = AUDIT_SPILL_PATH):
         self.db = supabase_client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.spill_path = spill_path
 
-    def log_action(self, action: str, resource: str, actor_id: Optional[str] = None, details: Dict[str, Any] = None):
-        """
-        Logs an action to the audit_logs table.
-        """
-        if details is None:
-            details = {}
-            
-        payload = {
+        self._buffer: List[Dict[str, Any]] = []
+        # _lock guards the buffer (held briefly, also from the event loop).
+        # _flush_lock serializes the actual DB writes, which run in threads.
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _build_payload(action: str, resource: str, actor_id: Optional[str], details: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
             "action": action,
             "resource": resource,
             "actor_id": actor_id,
-            "details": details
+            "details": details if details is not None else {},
         }
-        
+
+    def log_action(self, action: str, resource: str, actor_id: Optional[str] = None, details: Dict[str, Any] = None):
+        """
+        Logs an action to the audit_logs table.
+        """
+        payload = self._build_payload(action, resource, actor_id, details)
+
         try:
             # We don't verify return here, just fire and forget or check error
             # If we want the ID back, we use .execute() and check data
             data, count = self.db.table("audit_logs").insert(payload).execute()
-            
+
             # For debug/verification, we might return the new entry
             if data and len(data[1]) > 0:
                  entry = data[1][0]
                  logger.info(f"Audit Log Created: {entry.get('id')} | Hash: {entry.get('curr_hash')[:8]}...")
                  return entry
-                 
+
         except Exception as e:
             logger.error(f"Failed to write Audit Log: {e}")
-            # Fail Closed? 
+            # Fail Closed?
             # Lastenheft say "Rechtssicherheit". If logging fails, should action fail?
             # Ideally yes for critical actions.
             raise e
+
+    # --- Buffered Path ---
+
+    async def log_action_async(self, action: str, resource: str, actor_id: Optional[str] = None,
+                               details: Dict[str, Any] = None, critical: bool = False):
+        """
+        Queues an audit entry for the next bulk insert.
+
+        The event timestamp is taken now (not at flush time), so the chain order
+        in the DB matches the order in which actions happened.
+        If critical=True, the buffer is flushed immediately and any write error
+        is raised to the caller (Fail Closed).
+        """
+        payload = self._build_payload(action, resource, actor_id, details)
+        payload["timestamp"] = datetime.now(timezone.utc).isoformat()
+
+        with self._lock:
+            self._buffer.append(payload)
+            buffered = len(self._buffer)
+
+        if critical:
+            await self.flush(raise_on_error=True)
+        elif buffered >= self.batch_size:
+            await self.flush()
+
+    async def flush(self, raise_on_error: bool = False) -> int:
+        """
+        Writes all buffered entries in one batch, in a worker thread.
+        Returns the number of entries written.
+        """
+        return await asyncio.to_thread(self.flush_sync, raise_on_error)
+
+    def flush_sync(self, raise_on_error: bool = True) -> int:
+        """
+        Synchronous flush. Used from flush() and on worker shutdown.
+        Spilled entries (older than anything buffered) are replayed first, one batch
+        per flush; the buffer waits until the spill file is empty. Critical flushes
+        (raise_on_error) drain the whole spill file, so their entry is written too.
+        On failure the batch is put back at the front of the buffer so the
+        next flush retries it; beyond max_buffer the oldest entries go to the spill file.
+        """
+        # Only one flush at a time, so batches reach the DB in queue order.
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+
+            replayed = 0
+            try:
+                while self._has_spill():
+                    replayed += self._replay_spill_batch()
+                    if not raise_on_error:
+                        break
+                if self._has_spill():
+                    # Still draining the spill file: newer entries keep waiting
+                    self._requeue(batch)
+                    batch = []
+                elif batch:
+                    # Set-based insert: one statement, chained in list order by the DB
+                    self.db.rpc("append_audit_logs", {"p_entries": batch}).execute()
+            except Exception as e:
+                logger.error(f"Failed to write Audit Log batch ({len(batch)} entries): {e}")
+                self._requeue(batch)
+                if raise_on_error:
+                    raise
+                return replayed
+
+        if not replayed and not batch:
+            return 0
+        logger.info(f"Audit Log batch written: {replayed + len(batch)} entries.")
+        return replayed + len(batch)
+
+    def _requeue(self, batch: List[Dict[str, Any]]):
+        """Puts an unwritten batch back at the front of the buffer (overflow goes to the spill file)."""
+        with self._lock:
+            self._buffer = batch + self._buffer
+            overflow = len(self._buffer) - self.max_buffer
+            if overflow > 0 and self._spill(self._buffer[:overflow]):
+                self._buffer = self._buffer[overflow:]
+
+    # --- Spill File ---
+
+    def _spill(self, entries: List[Dict[str, Any]]) -> bool:
+        """
+        Appends the oldest buffered entries to the spill file. They are newer than
+        anything already spilled, so appending keeps the order. If the file cannot
+        be written, the entries stay in memory (the buffer grows rather than losing them).
+        """
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            logger.critical(f"Audit buffer overflow and spill to {self.spill_path} failed ({e}). "
+                            f"Keeping {len(entries)} entries in memory.")
+            return False
+        logger.warning(f"Audit buffer overflow. Spilled {len(entries)} oldest entries to {self.spill_path}.")
+        return True
+
+    def _has_spill(self) -> bool:
+        """Cheap check (one stat) so flushes only open the spill file when it holds entries."""
+        try:
+            return os.path.getsize(self.spill_path) > 0
+        except OSError:
+            return False
+
+    def _replay_spill_batch(self) -> int:
+        """
+        Writes the oldest batch_size spilled entries, then keeps only the rest in the
+        file (removed once empty). If the write fails, the file is left unchanged.
+        """
+        entries, rest = [], []
+        with open(self.spill_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                if len(entries) < self.batch_size:
+                    entries.append(json.loads(line))
+                else:
+                    rest.append(line)
+
+        if entries:
+            self.db.rpc("append_audit_logs", {"p_entries": entries}).execute()
+
+        if rest:
+            tmp_path = f"{self.spill_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(rest)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.spill_path)
+        else:
+            os.remove(self.spill_path)
+        logger.info(f"Replayed {len(entries)} spilled audit entries ({len(rest)} left in {self.spill_path}).")
+        return len(entries)
+
+    async def run_flusher(self):
+        """Background loop: flushes the buffer every flush_interval seconds."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Audit flusher error: {e}")
+
+    def start(self):
+        """Starts the periodic flusher on the running event loop."""
+        if self._flusher_task is None or self._flusher_task.done():
+            self._flusher_task = asyncio.create_task(self.run_flusher())
+
+    async def close(self):
+        """Stops the flusher and writes everything still buffered (Fail Closed)."""
+        if self._flusher_task:
+            self._flusher_task.cancel()
+            self._flusher_task = None
+        await self.flush(raise_on_error=True)
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    @property
+    def spilled(self) -> int:
+        if not self._has_spill():
+            return 0
+        with open(self.spill_path, encoding="utf-8") as f:
+            return sum(1 for line in f if line.strip())
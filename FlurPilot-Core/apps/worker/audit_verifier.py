@@ -0,0 +1,202 @@
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Optional, Dict, Any, List
+from supabase import Client
+
+logger = logging.getLogger("AuditVerifier")
+
+GENESIS_HASH = "0" * 64
+ROW_COLUMNS = "seq, timestamp, actor_id, action, resource, details, prev_hash, curr_hash"
+
+# --- Postgres Text Representations ---
+# The DB hashes `timestamp::text || actor_id::text || action || resource || details::text || prev_hash`
+# (see audit_entry_hash in 20260209_audit_chain_head.sql). To recompute hashes locally we
+# must reproduce Postgres' text output for timestamptz (session TimeZone = UTC) and jsonb.
+
+def pg_timestamptz_text(value: str) -> str:
+    """
+    ISO timestamp (as returned by PostgREST) -> Postgres timestamptz::text in UTC.
+    Example: '2026-02-08T12:34:56.120000+00:00' -> '2026-02-08 12:34:56.12+00'
+    """
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    ts = ts.astimezone(timezone.utc)
+
+    text = ts.strftime("%Y-%m-%d %H:%M:%S")
+    if ts.microsecond:
+        # Postgres prints only the significant fractional digits
+        text += f".{ts.microsecond:06d}".rstrip("0")
+    return text + "+00"
+
+
+def _pg_number(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    text = repr(value)
+    if "e" in text or "E" in text:
+        # numeric output never uses exponent notation
+        text = format(Decimal(text), "f")
+    return text
+
+
+def pg_jsonb_text(value: Any) -> str:
+    """
+    Python JSON value -> Postgres jsonb::text.
+    jsonb orders object keys by byte length first, then bytewise, and uses
+    ', ' / ': ' separators.
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, (bool, int, float)):
+        return _pg_number(value)
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, list):
+        return "[" + ", ".join(pg_jsonb_text(v) for v in value) + "]"
+    if isinstance(value, dict):
+        keys = sorted(value.keys(), key=lambda k: (len(k.encode("utf-8")), k.encode("utf-8")))
+        items = (f"{json.dumps(k, ensure_ascii=False)}: {pg_jsonb_text(value[k])}" for k in keys)
+        return "{" + ", ".join(items) + "}"
+    raise TypeError(f"Unsupported JSON value: {type(value).__name__}")
+
+
+def compute_entry_hash(row: Dict[str, Any], prev_hash: str) -> str:
+    """Recomputes curr_hash for an audit_logs row, mirroring audit_entry_hash()."""
+    payload = (
+        (pg_timestamptz_text(row["timestamp"]) if row.get("timestamp") else "")
+        + (row.get("actor_id") or "SYSTEM")
+        + (row.get("action") or "")
+        + (row.get("resource") or "")
+        + (pg_jsonb_text(row["details"]) if row.get("details") is not None else "")
+        + prev_hash
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class VerificationReport:
+    """Result of one incremental verification run."""
+    checked: int
+    start_seq: int
+    last_seq: int
+    last_hash: str
+    elapsed_s: float
+    broken_seq: Optional[int] = None
+    reason: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.broken_seq is None
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.checked / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+
+class AuditChainVerifier:
+    """
+    Streaming, incremental verifier for the audit hash chain.
+    - Reads audit_logs in keyset-paginated batches (seq > last_seq ORDER BY seq).
+    - Recomputes hashes locally; the next page is fetched while the current one is hashed.
+    - Persists the last verified position in audit_chain_checkpoints, so each run
+      only checks entries written since the previous one.
+    """
+
+    def __init__(self, client: Client, checkpoint: str = "stream", batch_size: int = 5000):
+        self.client = client
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+
+    def load_checkpoint(self) -> tuple:
+        """Returns (seq, curr_hash) of the last verified entry, or the genesis position."""
+        res = self.client.table("audit_chain_checkpoints") \
+            .select("seq, curr_hash") \
+            .eq("name", self.checkpoint) \
+            .execute()
+        if res.data:
+            return res.data[0]["seq"], res.data[0]["curr_hash"]
+        return 0, GENESIS_HASH
+
+    def save_checkpoint(self, seq: int, curr_hash: str):
+        self.client.table("audit_chain_checkpoints").upsert({
+            "name": self.checkpoint,
+            "seq": seq,
+            "curr_hash": curr_hash,
+            "verified_at": datetime.now(timezone.utc).isoformat()
+        }, on_conflict="name").execute()
+
+    def _fetch_page(self, after_seq: int) -> List[Dict[str, Any]]:
+        res = self.client.table("audit_logs") \
+            .select(ROW_COLUMNS) \
+            .gt("seq", after_seq) \
+            .order("seq") \
+            .limit(self.batch_size) \
+            .execute()
+        return res.data or []
+
+    @staticmethod
+    def check_batch(rows: List[Dict[str, Any]], seq: int, prev_hash: str) -> tuple:
+        """
+        Verifies a batch against the running chain state.
+        Returns (seq, hash, checked, broken_seq, reason).
+        """
+        checked = 0
+        for row in rows:
+            if row["seq"] != seq + 1:
+                return seq, prev_hash, checked, row["seq"], f"gap after seq {seq}"
+            if row["prev_hash"] != prev_hash:
+                return seq, prev_hash, checked, row["seq"], "prev_hash does not match predecessor"
+            if compute_entry_hash(row, prev_hash) != row["curr_hash"]:
+                return seq, prev_hash, checked, row["seq"], "curr_hash does not match content"
+            seq = row["seq"]
+            prev_hash = row["curr_hash"]
+            checked += 1
+        return seq, prev_hash, checked, None, None
+
+    def verify(self, full: bool = False, max_rows: Optional[int] = None) -> VerificationReport:
+        """
+        Verifies all entries after the checkpoint (or from genesis if full=True).
+        The checkpoint is advanced after every fully valid page.
+        """
+        start = time.perf_counter()
+        seq, prev_hash = (0, GENESIS_HASH) if full else self.load_checkpoint()
+        start_seq = seq
+        checked = 0
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            page = self._fetch_page(seq)
+            while page:
+                # Prefetch the next page (keyset by the last seq of this page)
+                next_page = None
+                if len(page) == self.batch_size:
+                    next_page = pool.submit(self._fetch_page, page[-1]["seq"])
+
+                seq, prev_hash, n, broken_seq, reason = self.check_batch(page, seq, prev_hash)
+                checked += n
+
+                if broken_seq is not None:
+                    if checked:
+                        self.save_checkpoint(seq, prev_hash)
+                    logger.error(f"Audit chain broken at seq {broken_seq}: {reason}")
+                    return VerificationReport(checked, start_seq, seq, prev_hash,
+                                              time.perf_counter() - start, broken_seq, reason)
+
+                self.save_checkpoint(seq, prev_hash)
+
+                if next_page is None or (max_rows is not None and checked >= max_rows):
+                    break
+                page = next_page.result()
+
+        report = VerificationReport(checked, start_seq, seq, prev_hash, time.perf_counter() - start)
+        logger.info(f"Verified {report.checked} new entries (seq {start_seq} -> {seq}) "
+                    f"in {report.elapsed_s:.2f}s ({report.rows_per_second:.0f} rows/s).")
+        return report
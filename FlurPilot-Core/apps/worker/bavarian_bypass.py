@@ -1,19 +1,24 @@
 
+import hashlib
 import json
 import logging
 import os
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from supabase import Client
-from shapely.geometry import shape, mapping, Polygon
+from shapely.geometry import shape, mapping, Point, Polygon
 from shapely.wkt import dumps as wkt_dumps
 import geojson
 
 # New dependency
 from fetcher import ResilientFetcher
+from gml_parser import parse_gml_features
+from wfs_harvester import WFSHarvester, WFS_DEFAULT_SRS
+from wfs_tile_cache import WFSTileCache, bboxes_intersect, covering_bbox, feature_key, geometry_bbox
 
 # Import Rust Geometry Engine (with fallback)
 try:
-    from geometry_engine import calculate_virtual_parcel as rust_calculate_virtual_parcel
+    from geometry_engine import calculate_virtual_parcels_batch as rust_calculate_virtual_parcels_batch
+    from geometry_engine import calculate_virtual_parcel_arrays, pack_polygons, unpack_multipolygon
     RUST_ENGINE_AVAILABLE = True
     logging.info("✅ Rust Geometry Engine loaded successfully")
 except ImportError:
@@ -22,6 +27,74 @@ except ImportError:
 
 logger = logging.getLogger("BavarianBypass")
 
+# WFS geometries are requested as EPSG:4326 (lon/lat). The Rust engine projects them
+# to UTM internally and returns the area in m², like ST_Area(geography) in the RPC.
+GEOMETRY_CRS = "EPSG:4326"
+
+# Input fingerprints: coordinates are rounded to 1e-7° (~1 cm) before hashing, so
+# re-serialized but unchanged WFS geometries hash identically. Bump the version when
+# the calculation itself changes, so every parcel is recomputed once.
+FINGERPRINT_VERSION = 1
+FINGERPRINT_PRECISION = 7
+
+
+def _normalize_ring(ring: List[List[float]], ccw: bool) -> List[Tuple[float, float]]:
+    """Rounded, de-duplicated ring with fixed orientation, starting at its smallest vertex."""
+    points: List[Tuple[float, float]] = []
+    for p in ring:
+        q = (round(p[0], FINGERPRINT_PRECISION), round(p[1], FINGERPRINT_PRECISION))
+        if not points or q != points[-1]:
+            points.append(q)
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    if not points:
+        return []
+
+    # Shoelace sign: > 0 is counter-clockwise
+    area2 = sum(
+        points[i][0] * points[(i + 1) % len(points)][1] - points[(i + 1) % len(points)][0] * points[i][1]
+        for i in range(len(points))
+    )
+    if (area2 > 0) != ccw:
+        points.reverse()
+    start = points.index(min(points))
+    return points[start:] + points[:start]
+
+
+def _normalize_geometry(geometry: Dict[str, Any]) -> List[List[List[Tuple[float, float]]]]:
+    """(Multi)Polygon GeoJSON -> sorted list of normalized polygons (exterior CCW, holes CW, holes sorted)."""
+    if geometry.get('type') == 'MultiPolygon':
+        polygons = geometry.get('coordinates') or []
+    elif geometry.get('type') == 'Polygon':
+        polygons = [geometry.get('coordinates') or []]
+    else:
+        return []
+
+    normalized = []
+    for rings in polygons:
+        if not rings:
+            continue
+        exterior = _normalize_ring(rings[0], ccw=True)
+        holes = sorted(_normalize_ring(r, ccw=False) for r in rings[1:])
+        normalized.append([exterior] + holes)
+    return sorted(normalized)
+
+
+def input_fingerprint(field_geojson: dict, building_geojsons: List[dict]) -> str:
+    """
+    SHA-256 over the normalized field and building geometries.
+    Independent of building order, ring start vertex, ring orientation and duplicates,
+    so it only changes when the cadastral input actually changed.
+    """
+    buildings = sorted({json.dumps(_normalize_geometry(b), separators=(',', ':')) for b in building_geojsons})
+    payload = json.dumps({
+        "v": FINGERPRINT_VERSION,
+        "crs": GEOMETRY_CRS,
+        "field": _normalize_geometry(field_geojson),
+        "buildings": buildings
+    }, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
 import xml.etree.ElementTree as ET
 
 class WFSClient:
@@ -31,16 +104,84 @@ class WFSClient:
     Protocol: WFS 2.0.0
     Details: https://geodaten.bayern.de/
     """
-    def __init__(self, fetcher: ResilientFetcher):
+    def __init__(self, fetcher: ResilientFetcher, tile_cache: Optional[WFSTileCache] = None):
         self.fetcher = fetcher
         # Default URLs (can be overridden by Env)
         self.url_fields = os.getenv("WFS_URL_FIELDS", "https://geoportal.bayern.de/gdi/wfs/feldbloecke")
         self.url_buildings = os.getenv("WFS_URL_BUILDINGS", "https://geoportal.bayern.de/gdi/wfs/hausumringe")
-        
+        # Local tile cache (None = default from env, False = every query goes to the WFS)
+        self.tile_cache = tile_cache if tile_cache is not None else WFSTileCache.from_env()
+        self.harvester = WFSHarvester(fetcher)
+        self.layers = {
+            "fields": (self.url_fields, "Feldblock"), # Verify exact typename via capabilities
+            "buildings": (self.url_buildings, "GebaeudeBauwerk") # Standard ALKIS name
+        }
+
+    async def fetch_layer(self, layer: str, bbox: List[float]) -> Optional[List[Dict[str, Any]]]:
+        """
+        All features of 'fields' or 'buildings' within bbox (minlon, minlat, maxlon, maxlat),
+        via the tile cache if enabled. Returns None if the WFS failed.
+        """
+        url, type_name = self.layers[layer]
+        if self.tile_cache:
+            return await self._fetch_tiled(layer, url, type_name, bbox)
+        return await self._get_features(url, type_name, bbox)
+
+    async def _get_features(self, url: str, type_name: str, bbox: List[float]) -> Optional[List[Dict[str, Any]]]:
+        """
+        All features of a layer within bbox (minlon, minlat, maxlon, maxlat).
+        Large bboxes are paged and split into sub-tiles by the harvester (see wfs_harvester.py).
+        Returns None if the request failed, so failures are never cached as empty tiles.
+        """
+        return await self.harvester.harvest(url, type_name, tuple(bbox))
+
+    async def _fetch_tiled(self, layer: str, url: str, type_name: str, bbox: List[float]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Bbox query answered from the tile cache. Only missing/expired tiles are
+        fetched, with one request for their covering bbox.
+        Returns the deduplicated features intersecting the bbox, or None if the WFS failed.
+        """
+        tiles = self.tile_cache.tiles_for_bbox(tuple(bbox))
+        cached = self.tile_cache.get_many(layer, tiles)
+        missing = [t for t in tiles if t not in cached]
+
+        if missing:
+            features = await self._get_features(url, type_name, list(covering_bbox(missing)))
+            if features is None:
+                return None
+            fetched = self.tile_cache.assign_to_tiles(features, missing)
+            self.tile_cache.put_many(layer, fetched)
+            cached.update(fetched)
+
+        logger.info(f"WFS tiles [{layer}]: {len(tiles) - len(missing)}/{len(tiles)} from cache.")
+
+        result, seen = [], set()
+        for tile in tiles:
+            for feature in cached[tile]:
+                key = feature_key(feature)
+                fb = geometry_bbox(feature.get("geometry"))
+                if key in seen or fb is None or not bboxes_intersect(fb, tuple(bbox)):
+                    continue
+                seen.add(key)
+                result.append(feature)
+        return result
+
     async def fetch_field_block(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
         """
         Fetches the field block at the given coordinate.
+        Served from the tile cache when possible (all field blocks of the tile are cached).
         """
+        if self.tile_cache:
+            features = await self.fetch_layer("fields", [lon, lat, lon, lat])
+            point = Point(lon, lat)
+            for feature in features or []:
+                try:
+                    if shape(feature['geometry']).intersects(point):
+                        return feature
+                except Exception:
+                    continue
+            # Not in the cache (or WFS down): fall through to the direct point query
+
         # 1. Build WFS GetFeature Request (Spatial Filter: Intersects Point)
         # Note: WFS 2.0 axis order for EPSG:4326 is typically Lat,Lon
         params = {
@@ -97,46 +238,13 @@ class WFSClient:
     def _parse_gml(self, content: str) -> Optional[Dict[str, Any]]:
         """
         Parses WFS GML/XML response to extract the first feature.
-        Returns a GeoJSON-like Feature dict.
+        Returns a GeoJSON-like Feature dict (holes, multi-polygons and properties like FLIK included).
         """
         try:
-            # Remove namespaces for easier parsing (naive but effective for simple extraction)
-            # Or use regex to find coordinates
-            # GML is complex. Let's try a regex approach for the polygon coordinates first as robust fallback
-            # Pattern for gml:posList or gml:coordinates
-            import re
-            
-            # Look for 2D coords
-            # <gml:posList>48.12 11.56 48.13 11.57 ...</gml:posList>
-            pos_list_match = re.search(r'<[^>]*posList[^>]*>(.*?)</[^>]*posList>', content, re.DOTALL)
-            
-            if pos_list_match:
-                coords_str = pos_list_match.group(1).strip()
-                # Split by whitespace
-                values = [float(v) for v in coords_str.split()]
-                
-                # Pair them up (Lat Lon) or (Lon Lat) depending on SRS
-                # EPSG:25832 is usually Easting, Northing (Metric)
-                # EPSG:4326 in WFS 2.0 is Lat, Lon
-                
-                # Create Polygon
-                pairs = list(zip(values[0::2], values[1::2]))
-                # GeoJSON expects [Lon, Lat]
-                # If WFS gave Lat, Lon, we need to swap? 
-                # Let's assume input matches requested SRS.
-                # If we requested EPSG:4326, usually comes back Lat, Lon.
-                # But GeoJSON needs Lon, Lat.
-                swapped_pairs = [[p[1], p[0]] for p in pairs]
-                
-                return {
-                    "type": "Feature",
-                    "properties": {"source": "WFS_GML"},
-                    "geometry": {
-                        "type": "Polygon",
-                        "coordinates": [swapped_pairs]
-                    }
-                }
-                
+            features = parse_gml_features(content.encode("utf-8"), default_srs=WFS_DEFAULT_SRS)
+            if features:
+                features[0]["properties"].setdefault("source", "WFS_GML")
+                return features[0]
             return None
         except Exception as e:
             logger.error(f"GML Parsing failed: {e}")
@@ -147,34 +255,16 @@ class WFSClient:
         Fetches buildings within the bbox.
         Bbox: [minx, miny, maxx, maxy] (EPSG:4326 or whatever shape passed)
         """
-        # Convert bbox to string: minlat,minlon,maxlat,maxlon (WFS 1.1+) or minlon,minlat... depending on version
-        # WFS 2.0 with EPSG:4326 usually Lat,Lon
         # Input 'bbox' from shapely .bounds is (minx, miny, maxx, maxy) -> (Lon, Lat, Lon, Lat)
-        
-        wfs_bbox = f"{bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]}" # Lat,Lon order
-        
-        params = {
-            "service": "WFS",
-            "version": "2.0.0",
-            "request": "GetFeature",
-            "typeNames": "GebaeudeBauwerk", # Standard ALKIS name
-            "srsName": "EPSG:4326",
-            "bbox": wfs_bbox,
-            "outputFormat": "application/json"
-        }
-        
         logger.info(f"Fetching Buildings from {self.url_buildings}...")
-        response = await self.fetcher.get(self.url_buildings, params=params)
-        
-        if response and response.status_code == 200:
-            try:
-                features = response.json().get('features', [])
-                logger.info(f"Found {len(features)} buildings via WFS.")
-                return features
-            except:
-                logger.warning("Failed to parse Building WFS JSON.")
-        
-        return [] # Return empty if fail, safe for subtraction logic (result = field)
+        features = await self.fetch_layer("buildings", bbox)
+
+        if features is None:
+            logger.warning("Failed to fetch Building WFS features.")
+            return [] # Return empty if fail, safe for subtraction logic (result = field)
+
+        logger.info(f"Found {len(features)} buildings via WFS.")
+        return features
 
 class BavarianBypass:
     """
@@ -188,13 +278,30 @@ class BavarianBypass:
         self.fetcher = fetcher if fetcher else ResilientFetcher()
         self.wfs = WFSClient(self.fetcher)
 
-    async def compute_virtual_parcel(self, lat: float, lon: float) -> Optional[str]:
+    def fetch_fingerprints(self, field_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Stored input fingerprints for the given field blocks.
+        Returns {source_field_id: {"id": ..., "input_fingerprint": ...}}
+        """
+        stored: Dict[str, Dict[str, Any]] = {}
+        # Chunked to keep the PostgREST 'in' filter (URL) short
+        for i in range(0, len(field_ids), 200):
+            resp = self.db.table("virtual_parcels") \
+                .select("id, source_field_id, input_fingerprint") \
+                .in_("source_field_id", field_ids[i:i + 200]) \
+                .execute()
+            for row in resp.data or []:
+                stored[row['source_field_id']] = row
+        return stored
+
+    async def compute_virtual_parcel(self, lat: float, lon: float, force: bool = False) -> Optional[str]:
         """
         Main entry point.
         1. Fetch Field Block (containing lat/lon)
         2. Fetch Buildings (inside Field bbox)
-        3. Calculate Virtual Parcel using Rust Engine (or fallback to Supabase RPC)
-        4. Return new ID
+        3. Skip if the input fingerprint matches the stored one (unless force)
+        4. Calculate Virtual Parcel using Rust Engine (or fallback to Supabase RPC)
+        5. Return new ID
         """
         logger.info(f"Computing Virtual Parcel at {lat}, {lon}...")
         
@@ -221,9 +328,26 @@ class BavarianBypass:
         
         # logger.info(f"Field: {field_id}, Buildings found: {len(building_features)}")
 
-        # 3. Calculate Virtual Parcel
+        # Only buildings touching the field matter (the bbox query returns more),
+        # otherwise a change next to the field would invalidate the fingerprint
         field_geojson = field_feature['geometry']
-        building_geojsons = [b['geometry'] for b in building_features]
+        building_geojsons = []
+        for b in building_features:
+            try:
+                if field_geom.intersects(shape(b['geometry'])):
+                    building_geojsons.append(b['geometry'])
+            except Exception:
+                continue
+
+        # 3. Skip unchanged inputs
+        fingerprint = input_fingerprint(field_geojson, building_geojsons)
+        if not force:
+            existing = self.fetch_fingerprints([field_id]).get(field_id)
+            if existing and existing.get('input_fingerprint') == fingerprint:
+                logger.info(f"⏭️ Virtual Parcel {existing['id']} unchanged (Field {field_id}), skipping.")
+                return existing['id']
+
+        # 4. Calculate Virtual Parcel
 
         try:
             if RUST_ENGINE_AVAILABLE:
@@ -241,12 +365,13 @@ class BavarianBypass:
             net_geom = result['net_geom']
             net_area = result['net_area']
             
-            # 4. Save to virtual_parcels
+            # 5. Save to virtual_parcels
             # We need to upsert based on source_field_id
             payload = {
                 "source_field_id": field_id,
                 "net_area_m2": net_area,
                 "geometry": net_geom, # PostREST handles GeoJSON -> Geometry automatic casting usually
+                "input_fingerprint": fingerprint,
                 "last_calculated_at": "now()"
             }
             
@@ -266,29 +391,56 @@ class BavarianBypass:
         """
         Calculate Virtual Parcel using the high-performance Rust engine.
         
+        Coordinates are handed over as flat NumPy arrays (no GeoJSON text round-trip).
+        
         Returns:
             dict with 'net_geom' (GeoJSON) and 'net_area' (float)
         """
-        import json
-        
-        # Prepare request for Rust
-        request = {
-            "field_block_geojson": json.dumps(field_geojson),
-            "building_geojsons": [json.dumps(bg) for bg in building_geojsons]
-        }
-        
-        # Call Rust function
-        request_json = json.dumps(request)
-        result_json = rust_calculate_virtual_parcel(request_json)
-        
-        # Parse result
-        result = json.loads(result_json)
-        
+        try:
+            (coords, ring_offsets, polygon_offsets), net_area = calculate_virtual_parcel_arrays(
+                pack_polygons([field_geojson]),
+                pack_polygons(building_geojsons),
+                crs=GEOMETRY_CRS
+            )
+        except ValueError as e:
+            logger.error(f"Rust Engine Error: {e}")
+            return None
+
         return {
-            'net_geom': json.loads(result['virtual_parcel_geojson']),
-            'net_area': result['net_area_sqm']
+            'net_geom': unpack_multipolygon(coords, ring_offsets, polygon_offsets),
+            'net_area': net_area
         }
 
+    def _calculate_batch_with_rust(self, items: List[Tuple[dict, List[dict]]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Calculate many Virtual Parcels in one Rust call (parallel, GIL released).
+        One json.dumps for the whole batch in, one json.loads out.
+
+        Args:
+            items: list of (field_geojson, building_geojsons)
+
+        Returns:
+            list (same order) of dicts with 'net_geom' and 'net_area', or None for failed items
+        """
+        request = [
+            {"field_block": field_geojson, "buildings": building_geojsons, "crs": GEOMETRY_CRS}
+            for field_geojson, building_geojsons in items
+        ]
+
+        results = json.loads(rust_calculate_virtual_parcels_batch(json.dumps(request)))
+
+        parcels = []
+        for result in results:
+            if result.get('error'):
+                logger.error(f"Rust Engine Error: {result['error']}")
+                parcels.append(None)
+                continue
+            parcels.append({
+                'net_geom': result['virtual_parcel'],
+                'net_area': result['net_area_sqm']
+            })
+        return parcels
+
     async def _calculate_with_rpc(self, field_geojson: dict, building_geojsons: List[dict]) -> Optional[Dict[str, Any]]:
         """
         Fallback: Calculate Virtual Parcel using Supabase RPC.
@@ -0,0 +1,80 @@
+import importlib.util
+import logging
+import os
+import shutil
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger("Capabilities")
+
+# Capabilities a worker can advertise (matched against job_type_requirements)
+CAPABILITY_OCR = "ocr"                  # pdf2image + pytesseract + tesseract/poppler binaries
+CAPABILITY_NER = "ner"                  # spaCy + the privacy NER model (F-03)
+CAPABILITY_RUST_ENGINE = "rust_engine"  # geometry_engine (F-02)
+ALL_CAPABILITIES = (CAPABILITY_OCR, CAPABILITY_NER, CAPABILITY_RUST_ENGINE)
+
+# Explicit configuration, e.g. WORKER_CAPABILITIES="" for an IO-only poller or
+# WORKER_CAPABILITIES="ocr,ner" for a PDF worker. Unset = auto-detect.
+WORKER_CAPABILITIES = os.getenv("WORKER_CAPABILITIES")
+WORKER_MAX_MEMORY_MB = os.getenv("WORKER_MAX_MEMORY_MB")
+
+
+def _has_module(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def detect_capabilities() -> List[str]:
+    """
+    Detects what this installation can run, without importing the heavy libraries
+    (spaCy, tesseract bindings, the Rust engine are only looked up).
+    """
+    found = []
+    if (_has_module("pdf2image") and _has_module("pytesseract")
+            and shutil.which("tesseract") and shutil.which("pdftoppm")):
+        found.append(CAPABILITY_OCR)
+    ner_model = os.getenv("PRIVACY_NER_MODEL", "de_core_news_lg")
+    if _has_module("spacy") and _has_module(ner_model):
+        found.append(CAPABILITY_NER)
+    if _has_module("geometry_engine"):
+        found.append(CAPABILITY_RUST_ENGINE)
+    return found
+
+
+def detect_memory_mb() -> Optional[int]:
+    """Physical memory, or the cgroup (container) limit if lower."""
+    limits = []
+    try:
+        limits.append(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024))
+    except (ValueError, OSError, AttributeError):
+        pass
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+            if value.isdigit():
+                limits.append(int(value) // (1024 * 1024))
+        except OSError:
+            continue
+    return min(limits) if limits else None
+
+
+def worker_capabilities() -> Tuple[List[str], Optional[int]]:
+    """
+    Capabilities and memory this worker advertises.
+    Configured capabilities that are not actually installed are dropped (with a warning),
+    so a misconfigured worker never claims jobs it would fail.
+    """
+    detected = detect_capabilities()
+    if WORKER_CAPABILITIES is None:
+        capabilities = detected
+    else:
+        configured = [c.strip() for c in WORKER_CAPABILITIES.split(",") if c.strip()]
+        for c in configured:
+            if c not in detected:
+                logger.warning(f"Capability '{c}' configured but not available, ignoring it.")
+        capabilities = [c for c in configured if c in detected]
+
+    max_memory_mb = int(WORKER_MAX_MEMORY_MB) if WORKER_MAX_MEMORY_MB else detect_memory_mb()
+    return sorted(capabilities), max_memory_mb
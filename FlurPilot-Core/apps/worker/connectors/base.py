@@ -0,0 +1,117 @@
+import abc
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, AsyncIterator
+
+logger = logging.getLogger("Connectors")
+
+# Records a connector may discover ahead of the pipeline before its paging pauses
+CONNECTOR_BUFFER_SIZE = int(os.getenv("CONNECTOR_BUFFER_SIZE", "50"))
+
+
+@dataclass
+class PaperRecord:
+    """
+    A discovered document, normalized across all acquisition tiers.
+    Shaped after OParl Paper / File, so every tier feeds the same pipeline steps
+    (version checks, file cache, download, extraction, redaction).
+    """
+    id: str                                    # Stable external id (OParl id or document URL)
+    name: str
+    type: str = "https://schema.oparl.org/1.1/Paper"
+    date: Optional[str] = None
+    modified: Optional[str] = None
+    file: Optional[Dict[str, Any]] = None      # OParl File subset: accessUrl, mimeType, size, sha1Checksum, modified
+    source: str = "unknown"                    # oparl / sessionnet / brave / google
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_oparl(cls, paper: Dict[str, Any], file: Optional[Dict[str, Any]] = None) -> "PaperRecord":
+        return cls(
+            id=paper.get("id"),
+            name=paper.get("name") or paper.get("reference") or "Untitled",
+            type=paper.get("type") or cls.type,
+            date=paper.get("date"),
+            modified=paper.get("modified"),
+            file=file,
+            source="oparl",
+        )
+
+    def as_paper(self) -> Dict[str, Any]:
+        """The OParl-like paper dict the pipeline payloads carry."""
+        return {"id": self.id, "name": self.name, "type": self.type, "date": self.date, "modified": self.modified}
+
+
+class PaperConnector(abc.ABC):
+    """
+    Common interface of all acquisition engines (OParl, SessionNet, search APIs).
+
+    iter_papers is an async iterator: records are yielded as they are discovered
+    (page by page), so the pipeline enqueues the first documents while the listing
+    is still running, and a slow consumer pauses the paging (see buffered()).
+    """
+
+    source = "unknown"
+
+    @abc.abstractmethod
+    def iter_papers(self, days: int = 7, keywords: Optional[List[str]] = None) -> AsyncIterator[PaperRecord]:
+        """Yields the papers of the last `days` days (implemented as an async generator)."""
+
+    async def check_connectivity(self) -> bool:
+        return True
+
+    async def close(self):
+        pass
+
+
+class SiteSearchConnector(PaperConnector):
+    """
+    Tier 2: binds a shared search API client (Brave / Google) to one municipality's
+    site, so search results flow through the same pipeline as RIS papers.
+    """
+
+    def __init__(self, search_client, site_domain: str, source: str):
+        self.search_client = search_client
+        self.site_domain = site_domain
+        self.source = source
+
+    async def iter_papers(self, days: int = 7, keywords: Optional[List[str]] = None) -> AsyncIterator[PaperRecord]:
+        async for record in self.search_client.iter_site_documents(self.site_domain, keywords or [], days=days):
+            yield record
+
+
+async def buffered(records: AsyncIterator[PaperRecord], maxsize: int = CONNECTOR_BUFFER_SIZE) -> AsyncIterator[PaperRecord]:
+    """
+    Runs a connector's iterator in a background task, feeding a bounded queue.
+    The next page is fetched while the consumer works on the current one, but at most
+    maxsize records are held: a full queue blocks the connector (backpressure).
+    Errors of the connector are re-raised to the consumer.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, maxsize))
+    done = object()
+
+    async def produce():
+        try:
+            async for record in records:
+                await queue.put(record)
+            await queue.put(done)
+        except Exception as e:
+            await queue.put(e)
+
+    task = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
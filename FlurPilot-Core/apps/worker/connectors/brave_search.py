@@ -1,11 +1,17 @@
 import os
 import logging
-from typing import List, Dict, Optional
+from datetime import date, timedelta
+from typing import List, Dict, Optional, AsyncIterator
 from urllib.parse import quote
 import httpx
 
+from connectors.base import PaperRecord
+
 logger = logging.getLogger("BraveSearchClient")
 
+# Result pages per crawl (20 results each); every page is one billed query
+BRAVE_MAX_PAGES = int(os.getenv("BRAVE_MAX_PAGES", "2"))
+
 class BraveSearchClient:
     """
     Tier 2 Acquisition Engine using Brave Search API.
@@ -77,7 +83,8 @@ class BraveSearchClient:
         encoded = quote(query)
         return f"https://search.brave.com/search?q={encoded}"
     
-    async def search(self, query: str, count: int = 20, offset: int = 0) -> List[Dict]:
+    async def search(self, query: str, count: int = 20, offset: int = 0,
+                     freshness: Optional[str] = None) -> List[Dict]:
         """
         Execute search via Brave Search API.
         
@@ -85,6 +92,7 @@ class BraveSearchClient:
             query: Search query string
             count: Number of results to return (max 20)
             offset: Offset for pagination
+            freshness: Optional age filter ('pd', 'pw', 'pm', 'py' or 'YYYY-MM-DDtoYYYY-MM-DD')
             
         Returns:
             List of search results with title, url, description
@@ -107,6 +115,8 @@ class BraveSearchClient:
             "count": min(count, 20),  # Brave allows max 20 per request
             "offset": offset
         }
+        if freshness:
+            params["freshness"] = freshness
         
         logger.info(f"Searching Brave: {query[:50]}...")
         
@@ -201,6 +211,33 @@ class BraveSearchClient:
         
         return all_results
 
+    async def iter_site_documents(self, site_domain: str, keywords: List[str],
+                                  days: int = 7) -> AsyncIterator[PaperRecord]:
+        """
+        PDFs on a site matching any keyword, discovered within the last X days.
+        Yields each result page as it arrives; stops at BRAVE_MAX_PAGES or a short page.
+        """
+        terms = " OR ".join(f'"{k}"' if " " in k else k for k in keywords)
+        query = f"{self.generate_search_query(site_domain, [], filetype='pdf')} ({terms})"
+        since = date.today() - timedelta(days=days)
+        freshness = f"{since.isoformat()}to{date.today().isoformat()}"
+
+        for page in range(BRAVE_MAX_PAGES):
+            results = await self.search(query, count=20, offset=page, freshness=freshness)
+            for item in results:
+                if not item.get("url"):
+                    continue
+                yield PaperRecord(
+                    id=item["url"],
+                    name=item.get("title") or item["url"],
+                    type="https://schema.oparl.org/1.1/File",
+                    file={"accessUrl": item["url"]},
+                    source="brave",
+                    extra={"snippet": item.get("snippet")},
+                )
+            if len(results) < 20:
+                return
+
 
 # Example Usage
 if __name__ == "__main__":
@@ -1,22 +1,112 @@
 import httpx
 import asyncio
-from typing import Optional, Dict, Any, List
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
 import sys
 import os
 # Allow importing from parent directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from pdf_processor import PDFProcessor
+from connectors.base import PaperConnector, PaperRecord
 
-class OParlClient:
+# Files above this size are not downloaded (OParl File.size, checked before the request)
+OPARL_MAX_FILE_BYTES = int(os.getenv("OPARL_MAX_FILE_BYTES", str(50 * 1024 * 1024)))
+PDF_MIME_TYPES = ("application/pdf", "application/x-pdf")
+# Safety cap for servers that ignore the modified_since filter
+OPARL_MAX_PAGES = int(os.getenv("OPARL_MAX_PAGES", "20"))
+
+
+class OParlError(Exception):
+    """The paper listing could not be read (handshake, body or a list page failed)."""
+
+
+def _parse_modified(value: Optional[str]) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00")) if value else None
+    except ValueError:
+        return None
+    if parsed and parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def file_url(file: Dict[str, Any]) -> Optional[str]:
+    """Download URL of an OParl File (accessUrl or downloadUrl)."""
+    return file.get('accessUrl') or file.get('downloadUrl')
+
+
+def file_size(file: Dict[str, Any]) -> Optional[int]:
+    size = file.get('size')
+    try:
+        return int(size) if size is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_pdf_file(file: Dict[str, Any]) -> bool:
+    """By File.mimeType if given, otherwise by the file name / URL extension."""
+    mime_type = (file.get('mimeType') or '').split(';')[0].strip().lower()
+    if mime_type:
+        return mime_type in PDF_MIME_TYPES
+    name = (file.get('fileName') or file_url(file) or '').split('?')[0].lower()
+    return name.endswith('.pdf')
+
+
+def file_skip_reason(file: Dict[str, Any], max_bytes: int = OPARL_MAX_FILE_BYTES) -> Optional[str]:
+    """
+    Why a File should not be downloaded at all (None = download it).
+    Only skips on metadata the server actually published: a file without mimeType
+    or size is downloaded (and checked while streaming).
+    """
+    mime_type = (file.get('mimeType') or '').split(';')[0].strip().lower()
+    if mime_type and mime_type not in PDF_MIME_TYPES:
+        return f"not a PDF ({mime_type})"
+    size = file_size(file)
+    if size is not None and max_bytes and size > max_bytes:
+        return f"too large ({size} bytes > {max_bytes})"
+    return None
+
+
+def file_cache_key(file: Dict[str, Any]) -> Optional[str]:
+    """
+    Identity of a file's content from its metadata, for reusing extraction results:
+    sha1Checksum if published, otherwise URL + modified (+ size). None if the
+    metadata cannot tell whether the file changed.
+    """
+    sha1 = (file.get('sha1Checksum') or '').strip().lower()
+    if sha1:
+        return f"sha1:{sha1}"
+    url = file_url(file)
+    if url and file.get('modified'):
+        return f"url:{url}|{file.get('modified')}|{file_size(file) or ''}"
+    return None
+
+
+class OParlClient(PaperConnector):
     """
     A robust client for interacting with OParl APIs (v1.0/1.1).
     Implements the Hybrid Acquisition Strategy (Tier 1).
     """
-    
+
+    source = "oparl"
+
     def __init__(self, base_url: str, fetcher):
         self.base_url = base_url.rstrip('/')
         self.fetcher = fetcher
-        self.pdf_processor = PDFProcessor(fetcher=fetcher)
+        self._system_info: Optional[Dict[str, Any]] = None
+        self._pdf_processor = None
+        # File-level cache: file_cache_key -> (content_hash, redacted text)
+        self._file_cache: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+    @property
+    def pdf_processor(self):
+        """
+        Created on first PDF download: importing it loads spaCy and the NER model,
+        which IO-only workers (list polling) never need.
+        """
+        if self._pdf_processor is None:
+            from pdf_processor import PDFProcessor
+            self._pdf_processor = PDFProcessor(fetcher=self.fetcher)
+        return self._pdf_processor
 
     async def get_system_info(self) -> Optional[Dict[str, Any]]:
         """
@@ -38,111 +128,178 @@ class OParlClient:
             print(f"[OParl] Connection Failed: {e}")
             return None
 
-    async def fetch_recent_papers(self, days: int = 7) -> List[Dict[str, Any]]:
+    async def check_connectivity(self) -> bool:
+        self._system_info = await self.get_system_info()
+        return self._system_info is not None
+
+    async def _papers_url(self) -> str:
         """
-        Fetches 'Papers' (Drucksachen) modified in the last X days.
-        Traverses: System -> Body -> Papers
+        Traverses: System -> Body -> Papers list URL.
+        Raises OParlError if any step fails.
         """
-        try:
-            # 1. Get System Info to find Body
-            system_info = await self.get_system_info()
-            if not system_info:
-                return []
-            
-            # 2. Extract Body URL (Taking the first body if list, or direct link)
-            bodies = system_info.get('body', [])
-            if not bodies:
-                print("[OParl] No Body URL found in System Info.")
-                return []
-            
-            # Handle list of URLs or list of Objects
-            body_url = bodies[0] if isinstance(bodies, list) else bodies
-            if isinstance(body_url, dict):
-                body_url = body_url.get('id')
-
-            print(f"[OParl] Fetching Body: {body_url}")
-            print(f"[OParl] Fetching Body: {body_url}")
-            body_res = await self.fetcher.get(body_url)
-            if not body_res or body_res.status_code != 200:
-                print(f"[OParl] Failed to fetch Body: {body_res.status_code if body_res else 'No Response'}")
-                return []
-            
-            raw_body = body_res.json()
-            # Handle OParl List Wrapper
-            if 'data' in raw_body:
-                body_data = raw_body['data']
-                # If it's a list (which it likely is for /body endpoint), take first
-                if isinstance(body_data, list):
-                    if not body_data: 
-                        print("[OParl] Body list is empty.")
-                        return []
-                    body_data = body_data[0]
-            else:
-                body_data = raw_body
+        # 1. Get System Info to find Body (reuses the handshake)
+        system_info = self._system_info or await self.get_system_info()
+        if not system_info:
+            raise OParlError(f"System unreachable: {self.base_url}")
 
-            print(f"[DEBUG] Body Info: {body_data.get('name', 'Unknown')}")
-            
-            # 3. Get Papers URL
-            papers_url = body_data.get('paper')
-            if not papers_url:
-                print("[OParl] No 'paper' endpoint in Body.")
-                return []
-            
-            # 4. Fetch Papers (with limit/filter)
-            # Standard OParl supports 'modified_since' or just pagination.
-            # For this MVP we just fetch the list (often paginated).
-            print(f"[OParl] Fetching Papers from: {papers_url}")
-            
-            # We append query params manually or use params dict
-            # We append query params manually or use params dict
-            papers_res = await self.fetcher.get(papers_url) 
-            
+        # 2. Extract Body URL (Taking the first body if list, or direct link)
+        bodies = system_info.get('body', [])
+        if not bodies:
+            raise OParlError("No Body URL found in System Info.")
+
+        # Handle list of URLs or list of Objects
+        body_url = bodies[0] if isinstance(bodies, list) else bodies
+        if isinstance(body_url, dict):
+            body_url = body_url.get('id')
+
+        print(f"[OParl] Fetching Body: {body_url}")
+        body_res = await self.fetcher.get(body_url)
+        if not body_res or body_res.status_code != 200:
+            raise OParlError(f"Failed to fetch Body: {body_res.status_code if body_res else 'No Response'}")
+
+        raw_body = body_res.json()
+        # Handle OParl List Wrapper
+        if 'data' in raw_body:
+            body_data = raw_body['data']
+            # If it's a list (which it likely is for /body endpoint), take first
+            if isinstance(body_data, list):
+                if not body_data:
+                    raise OParlError("Body list is empty.")
+                body_data = body_data[0]
+        else:
+            body_data = raw_body
+
+        print(f"[DEBUG] Body Info: {body_data.get('name', 'Unknown')}")
+
+        # 3. Get Papers URL
+        papers_url = body_data.get('paper')
+        if not papers_url:
+            raise OParlError("No 'paper' endpoint in Body.")
+        return papers_url
+
+    async def _iter_raw_papers(self, days: int) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Papers modified in the last X days, page by page (OParl 1.1 modified_since filter,
+        following links.next). Servers ignoring the filter are filtered client-side and
+        capped at OPARL_MAX_PAGES pages. A failed page raises OParlError instead of
+        ending the listing early.
+        """
+        papers_url = await self._papers_url()
+
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        params = {"modified_since": since.strftime("%Y-%m-%dT%H:%M:%S+00:00")}
+        url = papers_url
+        for page in range(OPARL_MAX_PAGES):
+            print(f"[OParl] Fetching Papers from: {url}")
+            # The next links already carry the filter
+            papers_res = await self.fetcher.get(url, params=params if page == 0 else None)
             if not papers_res or papers_res.status_code != 200:
-                print(f"[OParl] Failed to fetch Papers: {papers_res.status_code if papers_res else 'No Response'}")
-                return []
-            
+                raise OParlError(f"Failed to fetch Papers: {papers_res.status_code if papers_res else 'No Response'}")
+
             papers_data = papers_res.json()
-            
             # OParl lists are often wrapped in { "data": [...] } or are direct lists
             items = papers_data.get('data', []) if isinstance(papers_data, dict) else papers_data
-            
+            for item in items:
+                modified = _parse_modified(item.get('modified'))
+                if modified and modified < since:
+                    continue
+                yield item
+
+            url = (papers_data.get('links') or {}).get('next') if isinstance(papers_data, dict) else None
+            if not url:
+                return
+        print(f"[OParl] Stopped after {OPARL_MAX_PAGES} pages (OPARL_MAX_PAGES).")
+
+    async def iter_papers(self, days: int = 7, keywords: Optional[List[str]] = None) -> AsyncIterator[PaperRecord]:
+        """
+        Yields the recent papers as normalized records while the list pages are fetched.
+        Listing errors propagate (the list job retries; what was yielded is already queued).
+        """
+        async for paper in self._iter_raw_papers(days):
+            yield PaperRecord.from_oparl(paper, self.primary_file(paper))
+
+    async def fetch_recent_papers(self, days: int = 7) -> List[Dict[str, Any]]:
+        """
+        Fetches 'Papers' (Drucksachen) modified in the last X days.
+        Traverses: System -> Body -> Papers
+        """
+        try:
+            items = [paper async for paper in self._iter_raw_papers(days)]
             print(f"[OParl] Found {len(items)} papers.")
             return items
-
         except Exception as e:
             print(f"[OParl] Fetch Error: {e}")
             return []
 
-    async def fetch_full_text(self, paper: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def primary_file(paper: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
-        Enriches a paper object with full text and hash from its PDF.
-        Finds the primary file (accessUrl or downloadUrl).
+        The paper's primary OParl File object (url strings are wrapped as {'accessUrl': url}),
+        None if it has no files. Prefers Paper.mainFile, then the first PDF of the
+        file / auxiliaryFile lists (Anlagen), then their first entry.
         """
+        main_file = paper.get('mainFile')
+        if main_file:
+            return {'accessUrl': main_file} if isinstance(main_file, str) else main_file
+
         # Finds file list
         files = paper.get('file', [])
         if not files:
             files = paper.get('auxiliaryFile', [])
-            
+
         if not files:
-            return paper
+            return None
 
         # Handle list or single obj
-        target_file = files[0] if isinstance(files, list) else files
-        if isinstance(target_file, str):
-            # If it's just a URL string (rare in Oparl but possible)
-            file_url = target_file
+        candidates = files if isinstance(files, list) else [files]
+        # If it's just a URL string (rare in Oparl but possible)
+        candidates = [{'accessUrl': f} if isinstance(f, str) else f for f in candidates if f]
+        if not candidates:
+            return None
+        return next((f for f in candidates if is_pdf_file(f)), candidates[0])
+
+    @classmethod
+    def primary_file_url(cls, paper: Dict[str, Any]) -> Optional[str]:
+        """
+        URL of the paper's primary file (accessUrl or downloadUrl), None if it has no files.
+        """
+        target_file = cls.primary_file(paper)
+        if not target_file:
+            return None
+        return file_url(target_file)
+
+    async def fetch_full_text(self, paper: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Enriches a paper object with (redacted) full text and hash from its PDF.
+        Non-PDF and oversized files are skipped before downloading; files already
+        processed by this client (same checksum / size / modified) are not downloaded again.
+        """
+        target_file = self.primary_file(paper)
+        if not target_file or not file_url(target_file):
+            return paper
+
+        reason = file_skip_reason(target_file)
+        if reason:
+            print(f"[OParl] Skipping file {file_url(target_file)}: {reason}")
+            return paper
+
+        cache_key = file_cache_key(target_file)
+        cached = self._file_cache.get(cache_key) if cache_key else None
+        if cached:
+            content_hash, text = cached
+            print(f"[OParl] Reusing extracted text of {file_url(target_file)} (unchanged file)")
         else:
-            file_url = target_file.get('accessUrl') or target_file.get('downloadUrl')
+            print(f"[OParl] Processing PDF: {file_url(target_file)}")
+            content_hash, _, result = await self.pdf_processor.process_url(file_url(target_file))
+            text = result.sanitized_text if result else None
+            if cache_key and content_hash:
+                self._file_cache[cache_key] = (content_hash, text)
+
+        if text:
+            paper['full_text'] = text
+            paper['content_hash'] = content_hash
+            print(f"[OParl] Added {len(text)} chars of text.")
 
-        if file_url:
-            print(f"[OParl] Processing PDF: {file_url}")
-            content_hash, _, text = await self.pdf_processor.process_url(file_url)
-            
-            if text:
-                paper['full_text'] = text
-                paper['content_hash'] = content_hash
-                print(f"[OParl] Added {len(text)} chars of text.")
-            
         return paper
 
     async def close(self):
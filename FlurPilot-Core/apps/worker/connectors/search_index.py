@@ -1,5 +1,8 @@
 import urllib.parse
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, AsyncIterator
+
+from connectors.base import PaperRecord
 
 class SearchIndexClient:
     """
@@ -65,6 +68,23 @@ class SearchIndexClient:
         
         return []
 
+    async def iter_site_documents(self, site_domain: str, keywords: List[str],
+                                  days: int = 7) -> AsyncIterator[PaperRecord]:
+        """Documents found by the site dork, as normalized records."""
+        year = (datetime.now() - timedelta(days=days)).year
+        for item in await self.execute_search(self.generate_dork(site_domain, keywords, year=year)):
+            url = item.get("link") or item.get("url")
+            if not url:
+                continue
+            yield PaperRecord(
+                id=url,
+                name=item.get("title") or url,
+                type="https://schema.oparl.org/1.1/File",
+                file={"accessUrl": url},
+                source="google",
+                extra={"snippet": item.get("snippet")},
+            )
+
 # Example Usage
 if __name__ == "__main__":
     client = SearchIndexClient()
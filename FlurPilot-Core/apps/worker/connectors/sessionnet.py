@@ -1,113 +1,240 @@
-import httpx
-from bs4 import BeautifulSoup
+import asyncio
+import os
+import re
 import urllib.parse
-from typing import List, Dict, Any
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, AsyncIterator
 
-class SessionNetClient:
+from bs4 import BeautifulSoup, SoupStrainer
+
+from connectors.base import PaperConnector, PaperRecord
+
+# Search terms if the caller passes none
+DEFAULT_KEYWORDS = ["Solar", "Photovoltaik", "Freiflächen"]
+
+# Result pages per keyword (safety cap) and detail pages fetched at once
+SESSIONNET_MAX_PAGES = int(os.getenv("SESSIONNET_MAX_PAGES", "20"))
+SESSIONNET_DETAIL_CONCURRENCY = int(os.getenv("SESSIONNET_DETAIL_CONCURRENCY", "4"))
+
+# lxml only builds the parts we read: tables (results, detail fields) and links (paging, files)
+RESULT_STRAINER = SoupStrainer(["table", "a"])
+DETAIL_STRAINER = SoupStrainer(["table", "dl", "a"])
+HTML_PARSER = "lxml"
+
+DATE_PATTERN = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{4})")
+DATE_LABELS = ("datum", "vorlagendatum", "erstellt")
+NEXT_PAGE_LABELS = ("»", ">", "weiter", "nächste", "next")
+
+
+def parse_german_date(text: str) -> Optional[str]:
+    """'12.03.2026' -> '2026-03-12' (None if the text holds no valid date)."""
+    match = DATE_PATTERN.search(text or "")
+    if not match:
+        return None
+    day, month, year = (int(g) for g in match.groups())
+    try:
+        return datetime(year, month, day).date().isoformat()
+    except ValueError:
+        return None
+
+
+class SessionNetClient(PaperConnector):
     """
     Tier 1.5 Acquisition Engine.
     Scrapes 'SessionNet' (Somacos) RIS installations directly via HTML.
     Target: generic /bi/ URLs (Bürgerinformation).
+    Runs on the shared ResilientFetcher (robots.txt, crawl-delay, breakers, per-domain
+    limits); its client keeps the SessionNet session cookie across all requests.
     """
 
-    def __init__(self, base_url: str):
+    source = "sessionnet"
+
+    def __init__(self, base_url: str, fetcher):
         # Base URL should be the root of the RIS, e.g., "https://ris.stadt.de/bi"
         self.base_url = base_url.rstrip("/")
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-            "Accept-Language": "de-DE,de;q=0.9,en-US;q=0.8,en;q=0.7",
-            "Upgrade-Insecure-Requests": "1"
-        }
+        self.fetcher = fetcher
 
     async def check_connectivity(self) -> bool:
         """
         Verifies if the SessionNet instance is reachable.
-        Tries to hit the main page.
+        Hits the search mask, which also opens the session (cookie) used by the searches.
         """
-        try:
-            async with httpx.AsyncClient(headers=self.headers, verify=False, follow_redirects=True, http2=True) as client:
-                res = await client.get(self.base_url)
-                print(f"[SessionNet] Connectivity Check: {res.status_code} | {res.url}")
-                return res.status_code == 200
-        except Exception as e:
-            print(f"[SessionNet] Connectivity Error: {e}")
+        res = await self.fetcher.get(f"{self.base_url}/si0090.php")
+        if res is None:
+            print(f"[SessionNet] Connectivity Error: {self.base_url}")
             return False
+        print(f"[SessionNet] Connectivity Check: {res.status_code} | {res.url}")
+        return res.status_code == 200
 
-    async def search_documents(self, keywords: List[str], days: int = 30) -> List[Dict[str, Any]]:
+    # --- Search Results ---
+
+    async def _iter_result_pages(self, keywords: List[str]) -> AsyncIterator[List[Dict[str, Any]]]:
         """
-        Performs a search on /bi/si0090.php (Generic Search Mask)
+        Performs a search on /bi/si0090.php (Generic Search Mask) and follows the result
+        pages. Yields the rows of each page as soon as it is parsed.
         Note: This is highly dependent on the specific version of SessionNet.
-        We attempt a standard POST request simulation.
         """
-        
         search_url = f"{self.base_url}/si0090.php"
-        
-        # Join keywords for simple text search
-        query = " ".join(keywords)
-        
+
         # Standard SessionNet POST fields (reverse engineered)
         # 'smc_query': search text
         # 'smc_doctype': often 100 for everything or specific IDs
         data = {
-            "smc_query": query,
-            "smc_doctype": "100" # All doc types
+            "smc_query": " ".join(keywords),
+            "smc_doctype": "100"  # All doc types
         }
-        
+
+        res = await self.fetcher.post(search_url, data=data)
+        seen_pages = set()
+        for _ in range(SESSIONNET_MAX_PAGES):
+            if res is None or res.status_code != 200:
+                print(f"[SessionNet] Search failed: {res.status_code if res is not None else 'No Response'}")
+                return
+            page_url = str(res.url)
+            seen_pages.add(page_url)
+
+            soup = BeautifulSoup(res.text, HTML_PARSER, parse_only=RESULT_STRAINER)
+            yield self.parse_result_rows(soup, page_url)
+
+            next_url = self.next_page_url(soup, page_url)
+            if not next_url or next_url in seen_pages:
+                return
+            res = await self.fetcher.get(next_url)
+        print(f"[SessionNet] Stopped after {SESSIONNET_MAX_PAGES} result pages (SESSIONNET_MAX_PAGES).")
+
+    @staticmethod
+    def parse_result_rows(soup: BeautifulSoup, page_url: str) -> List[Dict[str, Any]]:
+        """Result table rows -> [{id: detail page URL, name, date}]."""
+        # Usually class "smc_table" or similar grid
+        rows = soup.select("table.smc_table tr")
+        if not rows:
+            rows = soup.select("table.rismain tr")
+        if not rows:
+            rows = soup.select("table.smccontenttable tr")
+
         results = []
-        
-        try:
-            async with httpx.AsyncClient(headers=self.headers, verify=False) as client:
-                # 1. GET to get cookies/session if needed (skip for now)
-                
-                # 2. POST Search
-                res = await client.post(search_url, data=data, timeout=10.0)
-                if res.status_code != 200:
-                    print(f"[SessionNet] Search failed: {res.status_code}")
-                    return []
-                
-                soup = BeautifulSoup(res.text, 'html.parser')
-                
-                # Parse Result Table
-                # Usually class "smc_table" or similar grid
-                # This is fragile and needs testing against a real target
-                rows = soup.select("table.smc_table tr")
-                if not rows:
-                    rows = soup.select("table.rismain tr")
-                
-                for row in rows:
-                    # Heuristic parsing
-                    cells = row.find_all("td")
-                    if len(cells) < 3:
-                        continue
-                        
-                    # Extract Link
-                    link_tag = row.find("a")
-                    if not link_tag:
-                        continue
-                        
-                    href = link_tag.get("href")
-                    title = link_tag.get_text(strip=True)
-                    
-                    if not href or not title:
-                        continue
-                        
-                    # Filter: Only keep "Solar" relevant titles here if we want pre-filtering
-                    # But we trust the Worker's filter function later.
-                    
-                    full_url = urllib.parse.urljoin(self.base_url + "/", href)
-                    
-                    # Create pseudo-document
-                    doc = {
-                        "id": full_url,
-                        "name": title,
-                        "date": datetime.now().isoformat(), # SessionNet tables often lack clear dates in search view
-                        "type": "https://oparl.org/schema/1.0/Paper"
-                    }
-                    results.append(doc)
-                    
-        except Exception as e:
-            print(f"[SessionNet] Error: {e}")
-            
+        for row in rows:
+            # Heuristic parsing
+            cells = row.find_all("td")
+            if len(cells) < 3:
+                continue
+
+            # Extract Link
+            link_tag = row.find("a", href=True)
+            if not link_tag:
+                continue
+
+            title = link_tag.get_text(strip=True)
+            if not title:
+                continue
+
+            results.append({
+                "id": urllib.parse.urljoin(page_url, link_tag["href"]),
+                "name": title,
+                # Date column if the view has one (the detail page's date takes precedence)
+                "date": parse_german_date(" ".join(c.get_text(" ", strip=True) for c in cells)),
+                "type": "https://oparl.org/schema/1.0/Paper"
+            })
         return results
+
+    @staticmethod
+    def next_page_url(soup: BeautifulSoup, page_url: str) -> Optional[str]:
+        """Link to the next result page (rel=next or a 'weiter' / '»' pager link)."""
+        link = soup.find("a", rel="next", href=True)
+        if not link:
+            for candidate in soup.find_all("a", href=True):
+                label = " ".join([candidate.get_text(strip=True), candidate.get("title", "")]).strip().lower()
+                if any(label == l or label.startswith(l) for l in NEXT_PAGE_LABELS):
+                    link = candidate
+                    break
+        if not link or link["href"].startswith(("#", "javascript:")):
+            return None
+        return urllib.parse.urljoin(page_url, link["href"])
+
+    async def search_documents(self, keywords: List[str], days: int = 30) -> List[Dict[str, Any]]:
+        """
+        All result rows of a search (every result page), without detail pages.
+        """
+        results = []
+        async for rows in self._iter_result_pages(keywords):
+            results.extend(rows)
+        return results
+
+    # --- Detail Pages ---
+
+    @staticmethod
+    def parse_detail(html: str, page_url: str) -> Dict[str, Any]:
+        """
+        Vorlage detail page -> {date, files}. The date comes from the labelled field
+        (Datum / Vorlagendatum / Erstellt), the files from the getfile.php / PDF links.
+        """
+        soup = BeautifulSoup(html, HTML_PARSER, parse_only=DETAIL_STRAINER)
+
+        date = None
+        for label in soup.find_all(["th", "td", "dt"]):
+            text = label.get_text(" ", strip=True).lower().rstrip(":")
+            if text in DATE_LABELS:
+                value = label.find_next_sibling(["td", "dd"])
+                date = parse_german_date(value.get_text(" ", strip=True) if value else "")
+                if date:
+                    break
+
+        files = []
+        seen = set()
+        for link in soup.find_all("a", href=True):
+            href = urllib.parse.urljoin(page_url, link["href"])
+            name = link.get_text(" ", strip=True)
+            is_pdf = href.lower().split("?")[0].endswith(".pdf") or "pdf" in name.lower()
+            if ("getfile.php" not in href and not is_pdf) or href in seen:
+                continue
+            seen.add(href)
+            file = {"accessUrl": href, "fileName": name}
+            if is_pdf:
+                file["mimeType"] = "application/pdf"
+            files.append(file)
+
+        return {"date": date, "files": files}
+
+    async def _fetch_detail(self, row: Dict[str, Any], limit: asyncio.Semaphore) -> PaperRecord:
+        async with limit:
+            res = await self.fetcher.get(row["id"])
+        detail = {"date": None, "files": []}
+        if res is not None and res.status_code == 200:
+            detail = self.parse_detail(res.text, str(res.url))
+        else:
+            # Still a (title-only) record: the title matched the search
+            print(f"[SessionNet] Detail page failed: {row['id']}")
+
+        files = detail["files"]
+        # Main file: the first PDF, otherwise the first attachment
+        main_file = next((f for f in files if f.get("mimeType")), files[0] if files else None)
+        return PaperRecord(
+            id=row["id"],
+            name=row["name"],
+            type=row["type"],
+            date=detail["date"] or row.get("date"),
+            file=main_file,
+            source=self.source,
+            extra={"files": files},
+        )
+
+    async def iter_papers(self, days: int = 7, keywords: Optional[List[str]] = None) -> AsyncIterator[PaperRecord]:
+        """
+        One search per keyword, all result pages. The detail pages of each result page
+        are fetched concurrently (real dates and attachments) and yielded before the next
+        result page is requested. Results are deduplicated by URL; dated papers older
+        than X days are skipped.
+        """
+        since = (datetime.now() - timedelta(days=days)).date().isoformat()
+        limit = asyncio.Semaphore(max(1, SESSIONNET_DETAIL_CONCURRENCY))
+        seen = set()
+        for keyword in keywords or DEFAULT_KEYWORDS:
+            async for rows in self._iter_result_pages([keyword]):
+                # Rows dated in the result table are filtered before their detail page is fetched
+                new_rows = [r for r in rows if r["id"] not in seen and not (r.get("date") and r["date"] < since)]
+                seen.update(r["id"] for r in new_rows)
+                records = await asyncio.gather(*(self._fetch_detail(r, limit) for r in new_rows))
+                for record in records:
+                    if record.date and record.date < since:
+                        continue
+                    yield record
@@ -0,0 +1,551 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+from urllib.parse import urlparse
+
+from connectors.base import PaperRecord, buffered
+from connectors.oparl import OPARL_MAX_FILE_BYTES, file_cache_key, file_skip_reason, file_url
+from job_queue import JobQueue, PRIORITY_NORMAL, PRIORITY_BULK
+from source_selector import SourceSelector
+import text_extraction
+
+logger = logging.getLogger("CrawlPipeline")
+
+# F-01 crawl as chained jobs, each with its own payload and retries:
+#   list_papers -> fetch_document -> extract_text -> redact_document -> index_document
+# A failing PDF only retries its own step, and the steps fan out across the cluster
+# (see job_type_requirements for which workers run which step).
+JOB_LIST_PAPERS = "list_papers"
+JOB_FETCH_DOCUMENT = "fetch_document"
+JOB_EXTRACT_TEXT = "extract_text"
+JOB_REDACT_DOCUMENT = "redact_document"
+JOB_INDEX_DOCUMENT = "index_document"
+PIPELINE_JOB_TYPES = (JOB_LIST_PAPERS, JOB_FETCH_DOCUMENT, JOB_EXTRACT_TEXT, JOB_REDACT_DOCUMENT, JOB_INDEX_DOCUMENT)
+
+# Intermediate artifacts (raw PDFs and unredacted text) live in a PRIVATE bucket and are
+# deleted as soon as the next step has succeeded. Only redacted text reaches evidence_docs.
+# They are keyed per paper (see artifact_path): papers sharing a file must not delete
+# each other's artifacts while their own steps are still queued.
+DOCUMENT_BUCKET = os.getenv("CRAWLER_DOCUMENT_BUCKET", "crawler-documents")
+
+KEYWORDS = ["Solar", "Photovoltaik", "Freiflächen", "Sondergebiet", "Aufstellungsbeschluss"]
+SUMMARY_CHARS = 500
+FILE_CACHE_TABLE = "document_file_cache"
+# Versions of papers skipped by the content-hash dedup (they have no evidence_docs row)
+SKIPPED_VERSIONS_TABLE = "evidence_skipped_versions"
+VERSION_COLUMNS = ("source_modified", "file_sha1", "file_size")
+# Discovered papers whose files are checked against the file cache in one query
+LIST_BATCH_SIZE = int(os.getenv("CRAWL_LIST_BATCH_SIZE", "25"))
+
+
+def profile_tenant(profile: Dict[str, Any]) -> Optional[str]:
+    """Fair-share group of a profile's jobs: its federal state (AGS prefix)."""
+    ags = profile.get('ags')
+    return f"land:{ags[:2]}" if ags else None
+
+
+def artifact_path(kind: str, paper_id: Optional[str], content_hash: str, ext: str) -> str:
+    """Bucket path of a paper's intermediate artifact, e.g. pdf/<sha1(paper id)>/<content hash>.pdf"""
+    paper_key = hashlib.sha1((paper_id or "").encode("utf-8")).hexdigest()
+    return f"{kind}/{paper_key}/{content_hash}.{ext}"
+
+
+def is_relevant(title: str) -> bool:
+    """Simple Keyword Check (Pre-Filter)"""
+    return any(k.lower() in title.lower() for k in KEYWORDS)
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def source_version(paper: Dict[str, Any], file: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Change markers of a paper as published by OParl (Paper.modified, File.sha1Checksum/size)."""
+    file = file or {}
+    size = file.get("size")
+    return {
+        "source_modified": paper.get("modified"),
+        "file_sha1": (file.get("sha1Checksum") or "").lower() or None,
+        "file_size": int(size) if isinstance(size, (int, float, str)) and str(size).isdigit() else None,
+    }
+
+
+def is_unchanged(version: Dict[str, Any], known: Optional[Dict[str, Any]]) -> bool:
+    """
+    True if the indexed evidence was built from the same source version.
+    Strongest marker wins: file checksum, then modified timestamp, then file size
+    (size only if neither side has a checksum or timestamp).
+    """
+    if not known:
+        return False
+    if version.get("file_sha1") and known.get("file_sha1"):
+        return version["file_sha1"] == known["file_sha1"].lower()
+    modified, known_modified = _parse_timestamp(version.get("source_modified")), _parse_timestamp(known.get("source_modified"))
+    if modified and known_modified:
+        return modified == known_modified
+    if version.get("source_modified") or known.get("source_modified"):
+        return False
+    return version.get("file_size") is not None and version.get("file_size") == known.get("file_size")
+
+
+class DocumentStore:
+    """Supabase Storage wrapper for the pipeline's intermediate files."""
+
+    def __init__(self, client, bucket: str = DOCUMENT_BUCKET):
+        self.client = client
+        self.bucket = bucket
+
+    def put(self, path: str, data: bytes, content_type: str):
+        self.client.storage.from_(self.bucket).upload(
+            path, data, {"content-type": content_type, "upsert": "true"}
+        )
+
+    def get(self, path: str) -> bytes:
+        return self.client.storage.from_(self.bucket).download(path)
+
+    def remove(self, paths: List[str]):
+        try:
+            self.client.storage.from_(self.bucket).remove(paths)
+        except Exception as e:
+            # Non-blocking: the bucket is private and paths are content hashes (overwritten on re-crawl)
+            logger.warning(f"Failed to remove {paths} from {self.bucket}: {e}")
+
+
+class DocumentTooLarge(Exception):
+    """The download exceeded the size limit (the File metadata had no or a wrong size)."""
+
+
+async def download_document(fetcher, url: str, max_bytes: int = OPARL_MAX_FILE_BYTES) -> Tuple[str, bytes]:
+    """
+    Streams a document, returns (sha256 content hash, bytes). Raises on HTTP errors
+    and DocumentTooLarge once more than max_bytes arrived (0 = no limit).
+    """
+    async with await fetcher.stream('GET', url) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code} for {url}")
+        sha256_hash = hashlib.sha256()
+        file_buffer = io.BytesIO()
+        async for chunk in response.aiter_bytes():
+            sha256_hash.update(chunk)
+            file_buffer.write(chunk)
+            if max_bytes and file_buffer.tell() > max_bytes:
+                raise DocumentTooLarge(f"{url} exceeds {max_bytes} bytes")
+    return sha256_hash.hexdigest(), file_buffer.getvalue()
+
+
+class CrawlPipeline:
+    """
+    Runs one step of the crawl pipeline per job and enqueues the next step.
+    Steps raise on failure, so the job queue retries just that step (with backoff).
+    """
+
+    def __init__(self, client, queue: JobQueue, fetcher, audit=None, worker_id: str = None,
+                 store: Optional[DocumentStore] = None, privacy_engine=None):
+        self.client = client
+        self.queue = queue
+        self.fetcher = fetcher
+        self.audit = audit
+        self.worker_id = worker_id
+        self.store = store or DocumentStore(client)
+        self._privacy_engine = privacy_engine
+
+    @property
+    def privacy_engine(self):
+        # Lazy: only redact workers load spaCy + NER model
+        if self._privacy_engine is None:
+            from privacy import get_privacy_engine
+            self._privacy_engine = get_privacy_engine()
+        return self._privacy_engine
+
+    async def run(self, job_type: str, payload: Dict[str, Any]):
+        steps = {
+            JOB_LIST_PAPERS: self.list_papers,
+            JOB_FETCH_DOCUMENT: self.fetch_document,
+            JOB_EXTRACT_TEXT: self.extract_text,
+            JOB_REDACT_DOCUMENT: self.redact_document,
+            JOB_INDEX_DOCUMENT: self.index_document,
+        }
+        await steps[job_type](payload)
+
+    def _push(self, job_type: str, payload: Dict[str, Any], dedup_key: str, domain: str = None,
+              priority: int = PRIORITY_NORMAL):
+        """Enqueues the next step; a failed push fails (and retries) the current step."""
+        if not self.queue.push(job_type, payload, domain=domain, priority=priority,
+                               tenant=payload.get('tenant'), dedup_key=dedup_key):
+            raise RuntimeError(f"Failed to enqueue {job_type} ({dedup_key})")
+
+    # --- Step 1: List Papers (IO) ---
+    async def list_papers(self, profile: Dict[str, Any]):
+        logger.info(f"Listing Papers: {profile.get('name')} ({profile.get('url')})")
+
+        url = profile.get("url") or profile.get("oparl_url")
+        if not url:
+            logger.warning(f"Profile {profile.get('name')} has no URL.")
+            return
+
+        # Hybrid Engine Selection (OParl, SessionNet or site search): all yield PaperRecords
+        client = SourceSelector.select_client(profile, self.fetcher)
+        if not client:
+            logger.warning(f"No suitable client found for {profile.get('name')}")
+            return
+
+        try:
+            if not await client.check_connectivity():
+                # Raise: retry later with backoff instead of silently skipping the council
+                raise RuntimeError(f"{client.source} source unreachable: {url}")
+
+            # Pre-download check: one bulk load of what is already indexed for this profile
+            known = self.load_known_versions(profile.get("id"))
+
+            stats = {"found": 0, "queued": 0, "unchanged": 0, "cached": 0, "shared": 0, "skipped_files": 0}
+            fetching = set()
+            to_fetch: List[Dict[str, Any]] = []
+            # Papers are queued while the connector is still paging (bounded read-ahead),
+            # so downstream workers start on the first documents before the listing ends.
+            async for record in buffered(client.iter_papers(days=7, keywords=KEYWORDS)):
+                stats["found"] += 1
+                payload = self._list_record(record, profile, known, stats)
+                if payload:
+                    to_fetch.append(payload)
+                if len(to_fetch) >= LIST_BATCH_SIZE:
+                    self._queue_fetches(to_fetch, fetching, stats)
+                    to_fetch = []
+            self._queue_fetches(to_fetch, fetching, stats)
+
+            logger.info(
+                f"Queued {stats['queued']} of {stats['found']} papers of {profile.get('name')} "
+                f"({stats['unchanged']} unchanged, {stats['cached']} from file cache, "
+                f"{stats['shared']} sharing a file, "
+                f"{stats['skipped_files']} files skipped)"
+            )
+        finally:
+            await client.close()
+
+        # Update last_scout_at
+        self.client.table("scout_profiles").update({"last_scout_at": "now()"}).eq("id", profile["id"]).execute()
+
+    def _list_record(self, record: PaperRecord, profile: Dict[str, Any], known: Dict[str, Dict[str, Any]],
+                     stats: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """
+        Filters one discovered record. Title-only papers are queued right away;
+        returns the payload if its file still has to go through the file cache / download.
+        """
+        title = record.name or "Untitled"
+        # Search hits often have generic titles: their snippet counts as well
+        if not is_relevant(f"{title} {record.extra.get('snippet') or ''}"):
+            return None
+
+        file = record.file
+        version = source_version(record.as_paper(), file)
+        if is_unchanged(version, known.get(record.id)):
+            stats["unchanged"] += 1
+            return None
+
+        payload = {
+            "paper": {
+                "id": record.id,
+                "name": title,
+                "type": record.type,
+                "date": record.date,
+            },
+            "version": version,
+            "region_id": profile.get("id"),
+            "tenant": profile_tenant(profile),
+        }
+        stats["queued"] += 1
+        url = file_url(file) if file else None
+        reason = file_skip_reason(file) if url else None
+        if reason:
+            # Decided on the File metadata, before any byte is downloaded
+            logger.info(f"   > [SKIP FILE] {title[:30]}...: {reason}")
+            stats["skipped_files"] += 1
+            url = None
+
+        if not url:
+            # No (usable) document: title-only evidence
+            self._push(JOB_REDACT_DOCUMENT, payload, f"{JOB_REDACT_DOCUMENT}:{record.id}")
+            return None
+
+        payload["file_url"] = url
+        cache_key = file_cache_key(file)
+        if cache_key:
+            payload["file_cache_key"] = cache_key
+        return payload
+
+    def _queue_fetches(self, to_fetch: List[Dict[str, Any]], fetching: set, stats: Dict[str, int]):
+        """
+        Files processed before (same checksum / modified) are not downloaded again (one
+        cache lookup per batch). Papers sharing a file (Anlagen) with an earlier paper of the
+        listing are queued at bulk priority, behind the first download.
+        """
+        if not to_fetch:
+            return
+        cache = self.load_file_cache([p["file_cache_key"] for p in to_fetch if p.get("file_cache_key")])
+        for payload in to_fetch:
+            cache_key = payload.get("file_cache_key")
+            if cache_key in cache:
+                stats["cached"] += 1
+                self._push_cached(payload, cache[cache_key])
+                continue
+            priority = PRIORITY_NORMAL
+            if cache_key in fetching:
+                # Same file as an earlier paper of this listing: queued behind it (bulk), so
+                # its fetch_document usually finds the file cache filled and skips the download
+                stats["shared"] += 1
+                priority = PRIORITY_BULK
+                logger.info(f"   > [SHARED FILE] {payload['paper']['name'][:30]}... (queued after the first download)")
+            elif cache_key:
+                fetching.add(cache_key)
+            self._push(JOB_FETCH_DOCUMENT, payload, f"{JOB_FETCH_DOCUMENT}:{payload['paper'].get('id')}",
+                       domain=urlparse(payload["file_url"]).netloc or None, priority=priority)
+
+    # --- Step 2: Fetch Document (IO) ---
+    async def fetch_document(self, payload: Dict[str, Any]):
+        paper = payload["paper"]
+
+        # Another paper with the same file may have been processed since the listing
+        cache_key = payload.get("file_cache_key")
+        cached = self.load_file_cache([cache_key]).get(cache_key) if cache_key else None
+        if cached:
+            self._push_cached(payload, cached)
+            return
+
+        logger.info(f"Downloading PDF for: {paper.get('name', '')[:30]}...")
+        try:
+            content_hash, file_bytes = await download_document(self.fetcher, payload["file_url"],
+                                                                 max_bytes=OPARL_MAX_FILE_BYTES)
+        except DocumentTooLarge as e:
+            logger.warning(f"   > [SKIP FILE] {paper.get('name', '')[:30]}...: {e}")
+            title_only = {k: v for k, v in payload.items() if k not in ("file_url", "file_cache_key")}
+            self._push(JOB_REDACT_DOCUMENT, title_only, f"{JOB_REDACT_DOCUMENT}:{paper.get('id')}")
+            return
+
+        if self._refresh_version(paper.get("id"), content_hash, payload.get("version")):
+            logger.info(f"   > [UNCHANGED] {paper.get('name', '')[:20]}... (same content, version updated)")
+            return
+
+        if self._already_indexed(content_hash, exclude_external_id=paper.get("id")):
+            logger.info(f"   > [DEDUP] Skipping {paper.get('name', '')[:20]}... (Hash match)")
+            self._record_skipped_version(paper.get("id"), payload.get("region_id"), content_hash,
+                                         payload.get("version"))
+            return
+
+        pdf_path = artifact_path("pdf", paper.get("id"), content_hash, "pdf")
+        self.store.put(pdf_path, file_bytes, "application/pdf")
+        self._push(JOB_EXTRACT_TEXT, {**payload, "content_hash": content_hash, "pdf_path": pdf_path},
+                   f"{JOB_EXTRACT_TEXT}:{paper.get('id')}")
+
+    # --- Step 3: Extract Text (CPU, OCR) ---
+    async def extract_text(self, payload: Dict[str, Any]):
+        file_bytes = self.store.get(payload["pdf_path"])
+        # pypdf / tesseract are CPU-bound: off the event loop, so lease heartbeats keep running
+        raw_text = await asyncio.to_thread(text_extraction.extract_text, file_bytes)
+
+        text_path = artifact_path("text", payload["paper"].get("id"), payload["content_hash"], "txt")
+        self.store.put(text_path, raw_text.encode("utf-8"), "text/plain; charset=utf-8")
+        next_payload = {k: v for k, v in payload.items() if k != "pdf_path"}
+        self._push(JOB_REDACT_DOCUMENT, {**next_payload, "text_path": text_path},
+                   f"{JOB_REDACT_DOCUMENT}:{payload['paper'].get('id')}")
+        self.store.remove([payload["pdf_path"]])
+
+    # --- Step 4: Redact (NER) ---
+    async def redact_document(self, payload: Dict[str, Any]):
+        paper = payload["paper"]
+        title = paper.get("name") or "Untitled"
+
+        raw_text = ""
+        if payload.get("text_path"):
+            raw_text = self.store.get(payload["text_path"]).decode("utf-8")
+
+        # File cache hit: the summary was redacted when the file was first processed
+        cached_summary = (payload.get("cached_file") or {}).get("summary")
+
+        score = 80  # Base score for Title Match
+        summary_text = f"Detected keywords in title: {title}"
+        if raw_text:
+            summary_text = raw_text[:SUMMARY_CHARS] + "..."
+            score = 90
+        elif cached_summary:
+            score = 90
+
+        # F-03: Privacy Pipeline (Fail Closed: exceptions retry this step, nothing is stored)
+        # spaCy (model load + NER) runs in a thread so lease heartbeats keep running
+        privacy_engine = await asyncio.to_thread(lambda: self.privacy_engine)
+        title_result = await asyncio.to_thread(privacy_engine.clean_text, title)
+        summary_result = None if cached_summary else await asyncio.to_thread(privacy_engine.clean_text, summary_text)
+        summary = cached_summary or summary_result.sanitized_text
+        summary_redactions = summary_result.redaction_count if summary_result else 0
+        summary_entities = summary_result.redacted_entities if summary_result else []
+
+        total_redactions = title_result.redaction_count + summary_redactions
+        if total_redactions > 0 and self.audit:
+            try:
+                # Buffered: flushed in batches by the audit flusher.
+                # actor_id is a UUID column, so the worker goes into details.
+                await self.audit.log_action_async(
+                    action="pii_redaction",
+                    resource=paper.get("id", "unknown"),
+                    actor_id=None,
+                    details={
+                        "worker_id": self.worker_id,
+                        "title_redactions": title_result.redaction_count,
+                        "summary_redactions": summary_redactions,
+                        "entity_types": list(set(
+                            e.entity_type for e in
+                            title_result.redacted_entities + summary_entities
+                        )),
+                    }
+                )
+            except Exception as audit_err:
+                logger.warning(f"Audit log failed (non-blocking): {audit_err}")
+
+        doc = {
+            "external_id": paper.get("id"),
+            "title": title_result.sanitized_text,
+            "doc_type": (paper.get("type") or "unknown").split("/")[-1],
+            "published_date": paper.get("date"),
+            "url": paper.get("id"),
+            "region_id": payload.get("region_id"),
+            "relevant": True,
+            "risk_score": score,
+            "summary": summary,
+            "content_hash": payload.get("content_hash"),
+            **(payload.get("version") or {})
+        }
+        self._push(JOB_INDEX_DOCUMENT, {"doc": doc, "tenant": payload.get("tenant")},
+                   f"{JOB_INDEX_DOCUMENT}:{paper.get('id')}")
+
+        # Remember the (redacted) extraction result for other papers with the same file
+        if payload.get("file_cache_key") and payload.get("content_hash") and not payload.get("cached_file"):
+            self.client.table(FILE_CACHE_TABLE).upsert({
+                "cache_key": payload["file_cache_key"],
+                "content_hash": payload["content_hash"],
+                "summary": summary if raw_text else None,
+                "file_url": payload.get("file_url"),
+                "file_size": (payload.get("version") or {}).get("file_size"),
+            }, on_conflict="cache_key").execute()
+
+        # The unredacted text is not needed anymore
+        if payload.get("text_path"):
+            self.store.remove([payload["text_path"]])
+
+    # --- Step 5: Index (DB) ---
+    async def index_document(self, payload: Dict[str, Any]):
+        doc = payload["doc"]
+        if self._already_indexed(doc.get("content_hash"), exclude_external_id=doc.get("external_id")):
+            logger.info(f"   > [DEDUP] Skipping {doc['title'][:20]}... (Hash match)")
+            self._record_skipped_version(doc.get("external_id"), doc.get("region_id"), doc.get("content_hash"),
+                                         {k: doc[k] for k in VERSION_COLUMNS if k in doc})
+            return
+
+        self.client.table("evidence_docs").upsert(doc, on_conflict="external_id").execute()
+        logger.info(f"   > Indexed Evidence: {doc['title'][:50]}...")
+
+    def load_known_versions(self, region_id: Optional[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        {external_id: {source_modified, file_sha1, file_size}} of the profile's indexed evidence,
+        plus the papers skipped as duplicates of other evidence (indexed rows win).
+        Keyset-paged on external_id (PostgREST caps the rows per response, and offset
+        pages without a stable order can repeat or skip rows).
+        """
+        known: Dict[str, Dict[str, Any]] = {}
+        if not region_id:
+            return known
+        page = 1000
+        for table in (SKIPPED_VERSIONS_TABLE, "evidence_docs"):
+            after = None
+            while True:
+                query = self.client.table(table) \
+                    .select("external_id, source_modified, file_sha1, file_size") \
+                    .eq("region_id", region_id)
+                if after is not None:
+                    query = query.gt("external_id", after)
+                rows = query.order("external_id").limit(page).execute().data or []
+                for row in rows:
+                    known[row['external_id']] = row
+                # NULL ids sort last: nothing left to page after them
+                if len(rows) < page or rows[-1]['external_id'] is None:
+                    break
+                after = rows[-1]['external_id']
+        return known
+
+    def _record_skipped_version(self, external_id: Optional[str], region_id: Optional[str],
+                                content_hash: Optional[str], version: Optional[Dict[str, Any]]):
+        """
+        A paper skipped by the content-hash dedup gets no evidence_docs row: remember its
+        source version, so the next listing skips it before downloading.
+        """
+        if not external_id or not region_id or not version:
+            return
+        self.client.table(SKIPPED_VERSIONS_TABLE).upsert({
+            "external_id": external_id,
+            "region_id": region_id,
+            "content_hash": content_hash,
+            **version,
+        }, on_conflict="external_id").execute()
+
+    def load_file_cache(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """{cache_key: {content_hash, summary}} of already processed files (chunked IN queries)."""
+        cache: Dict[str, Dict[str, Any]] = {}
+        keys = list(dict.fromkeys(k for k in keys if k))
+        chunk = 100
+        for i in range(0, len(keys), chunk):
+            resp = self.client.table(FILE_CACHE_TABLE) \
+                .select("cache_key, content_hash, summary") \
+                .in_("cache_key", keys[i:i + chunk]) \
+                .execute()
+            for row in resp.data or []:
+                cache[row["cache_key"]] = row
+        return cache
+
+    def _push_cached(self, payload: Dict[str, Any], cached: Dict[str, Any]):
+        """Continues a paper from the file cache: no download, no extraction."""
+        paper = payload["paper"]
+        if self._refresh_version(paper.get("id"), cached["content_hash"], payload.get("version")):
+            logger.info(f"   > [UNCHANGED] {paper.get('name', '')[:20]}... (same content, version updated)")
+            return
+        # Content indexed under another paper: no redaction needed, index_document would skip it
+        if self._already_indexed(cached["content_hash"], exclude_external_id=paper.get("id")):
+            logger.info(f"   > [DEDUP] Skipping {paper.get('name', '')[:20]}... (Hash match)")
+            self._record_skipped_version(paper.get("id"), payload.get("region_id"), cached["content_hash"],
+                                         payload.get("version"))
+            return
+        logger.info(f"   > [FILE CACHE] {paper.get('name', '')[:20]}... (file processed before)")
+        self._push(JOB_REDACT_DOCUMENT, {
+            **payload,
+            "content_hash": cached["content_hash"],
+            "cached_file": {"summary": cached.get("summary")},
+        }, f"{JOB_REDACT_DOCUMENT}:{paper.get('id')}")
+
+    def _refresh_version(self, external_id: Optional[str], content_hash: str,
+                         version: Optional[Dict[str, Any]]) -> bool:
+        """
+        The paper is indexed with exactly this content (only its metadata changed):
+        store the new version markers so the next crawl skips it before downloading.
+        """
+        if not external_id or not version:
+            return False
+        resp = self.client.table("evidence_docs") \
+            .update(version) \
+            .eq("external_id", external_id) \
+            .eq("content_hash", content_hash) \
+            .execute()
+        return bool(resp.data)
+
+    def _already_indexed(self, content_hash: Optional[str], exclude_external_id: Optional[str] = None) -> bool:
+        """Global Dedup: the same content is already stored (under another paper)."""
+        if not content_hash:
+            return False
+        query = self.client.table("evidence_docs").select("id").eq("content_hash", content_hash)
+        if exclude_external_id:
+            query = query.neq("external_id", exclude_external_id)
+        return bool(query.limit(1).execute().data)
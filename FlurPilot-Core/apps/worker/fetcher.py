@@ -4,6 +4,7 @@ import logging
 import time
 import random
 import os
+from contextlib import asynccontextmanager
 from typing import Dict, Optional, Any
 
 from urllib.parse import urlparse
@@ -14,6 +15,9 @@ from urllib.parse import urlparse, urljoin
 
 logger = logging.getLogger("ResilientFetcher")
 
+# Max. concurrent requests per domain (get + stream)
+FETCHER_MAX_PER_DOMAIN = int(os.getenv("FETCHER_MAX_PER_DOMAIN", "4"))
+
 # Common User Agents (Modern, Desktop)
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -63,9 +67,12 @@ class ResilientFetcher:
     - User-Agent Rotation
     - Circuit Breaker per Domain
     - Rate Limiting (Token Bucket - Conceptual)
+    - Concurrency Limit per Domain
     """
-    def __init__(self):
+    def __init__(self, max_per_domain: int = FETCHER_MAX_PER_DOMAIN):
         self.breakers: Dict[str, CircuitBreaker] = {}
+        self.max_per_domain = max_per_domain
+        self.domain_limits: Dict[str, asyncio.Semaphore] = {}
         self.robots_parsers: Dict[str, urllib.robotparser.RobotFileParser] = {}
         self.robots_checked: Dict[str, float] = {} # Timestamp of last check
         self.last_request_time: Dict[str, float] = {} # For Crawl-Delay
@@ -156,6 +163,12 @@ class ResilientFetcher:
             self.breakers[domain] = CircuitBreaker()
         return self.breakers[domain]
 
+    def _get_limit(self, url: str) -> asyncio.Semaphore:
+        domain = urlparse(url).netloc
+        if domain not in self.domain_limits:
+            self.domain_limits[domain] = asyncio.Semaphore(self.max_per_domain)
+        return self.domain_limits[domain]
+
     def _get_headers(self) -> Dict[str, str]:
         return {
             "User-Agent": random.choice(USER_AGENTS),
@@ -164,6 +177,16 @@ class ResilientFetcher:
         }
 
     async def get(self, url: str, **kwargs) -> Optional[httpx.Response]:
+        return await self._request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> Optional[httpx.Response]:
+        """
+        Form / API POSTs (e.g. RIS search masks) with the same robots, crawl-delay,
+        breaker and per-domain limits as get(). Cookies are kept by the shared client.
+        """
+        return await self._request("POST", url, **kwargs)
+
+    async def _request(self, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
         breaker = self._get_breaker(url)
         if not breaker.can_request():
             logger.warning(f"Circuit OPEN for {url}. Skipping request.")
@@ -180,18 +203,19 @@ class ResilientFetcher:
         # We need to check if there is a delay set for this domain
         domain = urlparse(url).netloc
         parser = self.robots_parsers.get(domain)
-        if parser:
-            crawl_delay = parser.crawl_delay("*")
-            if crawl_delay:
-                last_req = self.last_request_time.get(domain, 0)
-                elapsed = time.time() - last_req
-                if elapsed < crawl_delay:
-                    wait_time = crawl_delay - elapsed
-                    if wait_time > 0:
-                        logger.info(f"Respecting Crawl-Delay for {domain}: Sleeping {wait_time:.2f}s")
-                        await asyncio.sleep(wait_time)
-        
-        self.last_request_time[domain] = time.time()
+        crawl_delay = parser.crawl_delay("*") if parser else None
+        now = time.time()
+        if crawl_delay:
+            # Reserve the next slot BEFORE sleeping: concurrent requests (e.g. detail pages
+            # via gather) each get their own slot instead of all waking up together.
+            slot = max(now, self.last_request_time.get(domain, 0) + float(crawl_delay))
+            self.last_request_time[domain] = slot
+            wait_time = slot - now
+            if wait_time > 0:
+                logger.info(f"Respecting Crawl-Delay for {domain}: Sleeping {wait_time:.2f}s")
+                await asyncio.sleep(wait_time)
+        else:
+            self.last_request_time[domain] = now
 
         try:
             # Merge headers
@@ -200,7 +224,8 @@ class ResilientFetcher:
                 headers.update(kwargs['headers'])
                 del kwargs['headers']
 
-            response = await self.client.get(url, headers=headers, **kwargs)
+            async with self._get_limit(url):
+                response = await self.client.request(method, url, headers=headers, **kwargs)
             
             if response.status_code >= 500:
                 breaker.record_failure()
@@ -218,7 +243,8 @@ class ResilientFetcher:
 
     async def stream(self, method: str, url: str, **kwargs):
         """
-        Wraps httpx stream context manager
+        Wraps httpx stream context manager.
+        The per-domain concurrency slot is held until the stream is closed.
         """
         breaker = self._get_breaker(url)
         # Note: We can't easily block here if it's a context manager generator without being async generator
@@ -231,7 +257,17 @@ class ResilientFetcher:
             headers.update(kwargs['headers'])
             del kwargs['headers']
 
-        return self.client.stream(method, url, headers=headers, **kwargs)
+        return self._limited_stream(breaker, method, url, headers=headers, **kwargs)
+
+    @asynccontextmanager
+    async def _limited_stream(self, breaker: CircuitBreaker, method: str, url: str, **kwargs):
+        async with self._get_limit(url):
+            async with self.client.stream(method, url, **kwargs) as response:
+                if response.status_code >= 500 or response.status_code == 429:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                yield response
 
     async def close(self):
         await self.client.aclose()
@@ -0,0 +1,201 @@
+import logging
+import re
+import xml.etree.ElementTree as ET
+from typing import List, Optional, Dict, Any, Iterator
+
+logger = logging.getLogger("GMLParser")
+
+# Element local names
+MEMBER_TAGS = {"member", "featureMember", "featureMembers"}
+POLYGON_TAGS = {"Polygon", "PolygonPatch"}
+MULTI_TAGS = {"MultiSurface", "MultiPolygon", "CompositeSurface", "Surface"}
+GEOMETRY_TAGS = POLYGON_TAGS | MULTI_TAGS
+EXTERIOR_TAGS = {"exterior", "outerBoundaryIs"}
+INTERIOR_TAGS = {"interior", "innerBoundaryIs"}
+
+# Geographic CRSs that are lat/lon in their URN / URI form (WFS 1.1+ / 2.0)
+LAT_LON_CODES = {"4326", "4258", "4839"}
+SRS_CODE = re.compile(r"(?:EPSG(?::|::|/0/|/)|crs:EPSG:[^:]*:)(\d+)$", re.IGNORECASE)
+
+
+def local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def axis_is_lat_lon(srs_name: Optional[str], default: bool = False) -> bool:
+    """
+    True if coordinates in `srs_name` come as lat/lon and must be swapped for GeoJSON.
+    'urn:ogc:def:crs:EPSG::4326' and 'http://www.opengis.net/def/crs/EPSG/0/4326' are
+    lat/lon; the legacy 'EPSG:4326' form is lon/lat. Projected CRSs (EPSG:25832) are x/y.
+    """
+    if not srs_name:
+        return default
+    match = SRS_CODE.search(srs_name.strip())
+    if not match:
+        return default
+    if match.group(1) not in LAT_LON_CODES:
+        return False
+    return srs_name.lower().startswith(("urn:", "http"))
+
+
+class GMLFeatureParser:
+    """
+    Incremental parser for WFS GetFeature responses (GML 2/3.1/3.2).
+    Feed it chunks of the response body; it yields complete GeoJSON features as soon
+    as their member element is closed and drops them from the tree right away, so
+    memory stays bounded by the size of one feature.
+
+    - Polygons with holes, MultiSurface/MultiPolygon/Surface patches
+    - posList (incl. srsDimension), pos and GML 2 coordinates
+    - srsName-aware axis order (inherited from enclosing elements)
+    - gml:id as feature id, simple properties (e.g. FLIK) as strings
+    """
+
+    def __init__(self, default_srs: Optional[str] = None):
+        self.default_srs = default_srs
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._stack: List[ET.Element] = []
+        self._srs_stack: List[Optional[str]] = []
+        self.feature_count = 0
+        # Local name of the document element, e.g. 'FeatureCollection' or 'ExceptionReport'
+        self.root_name: Optional[str] = None
+        # numberMatched / numberReturned of a WFS 2.0 FeatureCollection
+        self.root_attrib: Dict[str, str] = {}
+
+    def feed(self, chunk: bytes) -> Iterator[Dict[str, Any]]:
+        self._parser.feed(chunk)
+        return self._drain()
+
+    def close(self) -> Iterator[Dict[str, Any]]:
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> Iterator[Dict[str, Any]]:
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                if self.root_name is None:
+                    self.root_name = local_name(elem.tag)
+                    self.root_attrib = dict(elem.attrib)
+                srs = elem.get("srsName") or (self._srs_stack[-1] if self._srs_stack else self.default_srs)
+                self._stack.append(elem)
+                self._srs_stack.append(srs)
+                continue
+
+            self._stack.pop()
+            srs = self._srs_stack.pop()
+            parent = self._stack[-1] if self._stack else None
+            if parent is None:
+                continue
+            if local_name(elem.tag) in MEMBER_TAGS:
+                # Its feature was already consumed, drop the empty wrapper too
+                parent.remove(elem)
+                continue
+            if local_name(parent.tag) not in MEMBER_TAGS:
+                continue
+
+            try:
+                feature = self._parse_feature(elem, srs)
+            except (ValueError, IndexError) as e:
+                logger.warning(f"Skipping malformed GML feature: {e}")
+                feature = None
+
+            # Free the subtree (constant memory for large responses)
+            elem.clear()
+            parent.remove(elem)
+
+            if feature:
+                self.feature_count += 1
+                yield feature
+
+    def _parse_feature(self, elem: ET.Element, srs: Optional[str]) -> Optional[Dict[str, Any]]:
+        feature_id = next((v for k, v in elem.attrib.items() if local_name(k) == "id"), None)
+        properties: Dict[str, Any] = {}
+        geometry = None
+
+        for child in elem:
+            name = local_name(child.tag)
+            if len(child) == 0:
+                properties[name] = (child.text or "").strip()
+                continue
+            geom_elem = self._find_geometry(child)
+            if geom_elem is not None and geometry is None:
+                geometry = self._parse_geometry(geom_elem, child.get("srsName") or srs)
+
+        if geometry is None:
+            return None
+        return {
+            "type": "Feature",
+            "id": feature_id,
+            "properties": properties,
+            "geometry": geometry
+        }
+
+    @staticmethod
+    def _find_geometry(elem: ET.Element) -> Optional[ET.Element]:
+        for node in elem.iter():
+            if local_name(node.tag) in GEOMETRY_TAGS:
+                return node
+        return None
+
+    def _parse_geometry(self, elem: ET.Element, srs: Optional[str]) -> Optional[Dict[str, Any]]:
+        srs = elem.get("srsName") or srs
+        swap = axis_is_lat_lon(srs)
+
+        if local_name(elem.tag) in POLYGON_TAGS:
+            polygons = [self._parse_polygon(elem, swap)]
+        else:
+            polygons = [
+                self._parse_polygon(node, swap)
+                for node in elem.iter()
+                if local_name(node.tag) in POLYGON_TAGS
+            ]
+        polygons = [p for p in polygons if p]
+
+        if not polygons:
+            return None
+        if len(polygons) == 1:
+            return {"type": "Polygon", "coordinates": polygons[0]}
+        return {"type": "MultiPolygon", "coordinates": polygons}
+
+    def _parse_polygon(self, elem: ET.Element, swap: bool) -> Optional[List[List[List[float]]]]:
+        exterior, interiors = None, []
+        for child in elem:
+            name = local_name(child.tag)
+            if name in EXTERIOR_TAGS:
+                exterior = self._parse_ring(child, swap)
+            elif name in INTERIOR_TAGS:
+                ring = self._parse_ring(child, swap)
+                if ring:
+                    interiors.append(ring)
+        if not exterior:
+            return None
+        return [exterior] + interiors
+
+    @staticmethod
+    def _parse_ring(elem: ET.Element, swap: bool) -> List[List[float]]:
+        """All coordinates of a ring (LinearRing or Ring of curve segments), in document order."""
+        points: List[List[float]] = []
+        for node in elem.iter():
+            name = local_name(node.tag)
+            text = (node.text or "").strip()
+            if not text:
+                continue
+            if name in ("posList", "pos"):
+                dim = int(node.get("srsDimension") or node.get("dimension") or 2)
+                values = [float(v) for v in text.split()]
+                points.extend(values[i:i + 2] for i in range(0, len(values) - dim + 1, dim))
+            elif name == "coordinates":
+                # GML 2: "x,y x,y ..."
+                points.extend([float(v) for v in pair.split(",")[:2]] for pair in text.split())
+
+        if swap:
+            points = [[p[1], p[0]] for p in points]
+        # Curve segments repeat the shared vertex
+        deduped = [p for i, p in enumerate(points) if i == 0 or p != points[i - 1]]
+        return deduped if len(deduped) >= 4 else []
+
+
+def parse_gml_features(content: bytes, default_srs: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Convenience wrapper for a complete document."""
+    parser = GMLFeatureParser(default_srs)
+    return list(parser.feed(content)) + list(parser.close())
@@ -1,43 +1,100 @@
 
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+import os
+import socket
+from typing import Optional, Dict, Any, Awaitable, List
 from supabase import Client
 
 logger = logging.getLogger("JobQueue")
 
+# Lease: a claimed job is owned for JOB_LEASE_SECONDS and renewed every
+# JOB_HEARTBEAT_SECONDS while it runs. Expired leases are re-queued by the reaper.
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", str(JOB_LEASE_SECONDS / 4)))
+
+# Retry backoff: base * 2^retries (capped), with jitter, applied server-side by fail_job
+JOB_RETRY_BASE_SECONDS = int(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+JOB_RETRY_MAX_SECONDS = int(os.getenv("JOB_RETRY_MAX_SECONDS", "3600"))
+
+# Archival: finished jobs move to crawler_jobs_history after JOB_ARCHIVE_AFTER_DAYS
+JOB_ARCHIVE_AFTER_DAYS = int(os.getenv("JOB_ARCHIVE_AFTER_DAYS", "7"))
+JOB_ARCHIVE_BATCH = int(os.getenv("JOB_ARCHIVE_BATCH", "5000"))
+
+# Priority classes (lower = more urgent), see fetch_next_job for aging and fair share
+PRIORITY_INTERACTIVE = 0  # dashboard requests
+PRIORITY_NORMAL = 1       # regular crawls
+PRIORITY_BULK = 2         # seeding / region precomputation
+
+
+class LeaseLost(Exception):
+    """The job's lease expired and was reaped; another worker may own it now."""
+
 class JobQueue:
     """
     Interface for the Postgres-based Crawler Queue.
-    Handles Atomic Locking, Retries, and Dead Letter Queueing.
+    Handles Atomic Locking, Leases, Retries, and Dead Letter Queueing.
     """
-    def __init__(self, client: Client, worker_id: str):
+    def __init__(self, client: Client, worker_id: str, lease_seconds: int = JOB_LEASE_SECONDS,
+                 heartbeat_seconds: float = JOB_HEARTBEAT_SECONDS,
+                 retry_base_seconds: int = JOB_RETRY_BASE_SECONDS,
+                 retry_max_seconds: int = JOB_RETRY_MAX_SECONDS,
+                 capabilities: Optional[List[str]] = None,
+                 max_memory_mb: Optional[int] = None):
         self.client = client
         self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        # None = no routing (claims every job type)
+        self.capabilities = capabilities
+        self.max_memory_mb = max_memory_mb
 
-    def push(self, job_type: str, payload: Dict[str, Any], domain: str = None) -> bool:
-        """Pushes a new job to the queue."""
+    def push(self, job_type: str, payload: Dict[str, Any], domain: str = None,
+             priority: int = PRIORITY_NORMAL, tenant: Optional[str] = None,
+             dedup_key: Optional[str] = None) -> bool:
+        """
+        Pushes a new job to the queue.
+        `tenant` (customer or region key) is the fair-share group within the job type.
+        `dedup_key`: at most one pending/processing job per key; pushing a duplicate
+        is a no-op that counts as success.
+        """
         try:
             data = {
                 "type": job_type,
                 "payload": payload,
                 "status": "pending",
-                "domain": domain
+                "domain": domain,
+                "priority": priority,
+                "tenant": tenant
             }
+            if dedup_key:
+                data["dedup_key"] = dedup_key
             res = self.client.table("crawler_jobs").insert(data).execute()
-            logger.info(f"Queued Job: {job_type} (Domain: {domain})")
+            logger.info(f"Queued Job: {job_type} (Domain: {domain}, Priority: {priority}, Tenant: {tenant})")
             return True
         except Exception as e:
+            if dedup_key and "23505" in str(e):  # unique_violation on dedup_key
+                logger.info(f"Job already queued: {dedup_key}")
+                return True
             logger.error(f"Failed to push job: {e}")
             return False
 
     def fetch_next(self) -> Optional[Dict[str, Any]]:
         """
         Atomically fetches the next available job using the 'fetch_next_job' RPC.
-        This respects Domain Locking.
+        This respects Domain Locking, starts a lease of `lease_seconds` and only
+        returns job types whose requirements match this worker's capabilities.
         """
         try:
             # call RPC
-            response = self.client.rpc("fetch_next_job", {"p_worker_id": self.worker_id}).execute()
+            response = self.client.rpc("fetch_next_job", {
+                "p_worker_id": self.worker_id,
+                "p_lease_seconds": self.lease_seconds,
+                "p_capabilities": self.capabilities,
+                "p_max_memory_mb": self.max_memory_mb
+            }).execute()
             
             # response.data is expected to be a list of rows (length 0 or 1)
             if response.data and len(response.data) > 0:
@@ -47,70 +104,157 @@ class JobQueue:
                 return {
                     "id": job['j_id'],
                     "type": job['j_type'],
-                    "payload": job['j_payload']
+                    "payload": job['j_payload'],
+                    "lease_expires_at": job.get('j_lease_expires_at')
                 }
             return None
         except Exception as e:
             logger.error(f"Error fetching job: {e}")
             return None
 
-    def complete(self, job_id: str):
-        """Marks a job as completed and releases the domain lock."""
+    def register(self) -> bool:
+        """Advertises this worker's capabilities in worker_registry (and marks it alive)."""
+        try:
+            self.client.rpc("register_worker", {
+                "p_worker_id": self.worker_id,
+                "p_capabilities": self.capabilities,
+                "p_max_memory_mb": self.max_memory_mb,
+                "p_hostname": socket.gethostname()
+            }).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to register worker {self.worker_id}: {e}")
+            return False
+
+    def heartbeat(self, job_id: str) -> Optional[bool]:
+        """
+        Extends the lease of a running job.
+        Returns True if renewed, False if the lease was lost (job reaped),
+        None if the heartbeat itself failed (e.g. network) - the lease may still be alive.
+        """
+        try:
+            response = self.client.rpc("heartbeat_job", {
+                "p_job_id": job_id,
+                "p_worker_id": self.worker_id,
+                "p_lease_seconds": self.lease_seconds
+            }).execute()
+            return bool(response.data)
+        except Exception as e:
+            logger.warning(f"Heartbeat for job {job_id} failed: {e}")
+            return None
+
+    def reap_expired(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Re-queues jobs whose lease expired (crashed/hung workers). Returns the reaped jobs."""
+        try:
+            response = self.client.rpc("reap_expired_jobs", {"p_limit": limit}).execute()
+            reaped = response.data or []
+            for job in reaped:
+                logger.warning(f"Reaped job {job['j_id']} of worker {job.get('j_worker_id')} "
+                               f"(lease expired) -> {job['j_status']}")
+            return reaped
+        except Exception as e:
+            logger.error(f"Error reaping expired jobs: {e}")
+            return []
+
+    def archive_finished(self, older_than_days: int = JOB_ARCHIVE_AFTER_DAYS, batch: int = JOB_ARCHIVE_BATCH,
+                         max_batches: int = 20) -> int:
+        """
+        Moves finished jobs into crawler_jobs_history (+ daily rollups) via 'archive_crawler_jobs'.
+        Drains in batches (one transaction each) until a batch comes back short.
+        """
+        total = 0
+        try:
+            for _ in range(max_batches):
+                response = self.client.rpc("archive_crawler_jobs", {
+                    "p_older_than_days": older_than_days,
+                    "p_batch": batch
+                }).execute()
+                archived = response.data or 0
+                total += archived
+                if archived < batch:
+                    break
+            if total:
+                logger.info(f"Archived {total} finished jobs (older than {older_than_days} days).")
+        except Exception as e:
+            logger.error(f"Error archiving finished jobs: {e}")
+        return total
+
+    async def run_with_heartbeat(self, job_id: str, work: Awaitable[Any]) -> Any:
+        """
+        Runs `work` while renewing the job's lease every `heartbeat_seconds`.
+        Raises LeaseLost (after cancelling the work) if the lease was reaped meanwhile;
+        exceptions of the work propagate unchanged.
+        """
+        task = asyncio.ensure_future(work)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.heartbeat_seconds)
+                if done:
+                    return task.result()
+                # Off the event loop: the Supabase client is synchronous
+                renewed = await asyncio.to_thread(self.heartbeat, job_id)
+                if renewed is False:
+                    logger.error(f"Lost lease on job {job_id}, cancelling it.")
+                    task.cancel()
+                    try:
+                        await task
+                    except asyncio.CancelledError:
+                        pass
+                    except Exception:
+                        pass
+                    raise LeaseLost(job_id)
+        finally:
+            if not task.done():
+                task.cancel()
+
+    def complete(self, job_id: str) -> bool:
+        """
+        Marks a job as completed and releases the domain lock.
+        Returns False if the job is no longer owned (lease reaped) or the update failed.
+        """
         try:
-            self.client.table("crawler_jobs").update({
+            # Only while we still own it (the lease may have been reaped)
+            response = self.client.table("crawler_jobs").update({
                 "status": "completed",
-                "completed_at": "now()"
-            }).eq("id", job_id).execute()
+                "completed_at": "now()",
+                "lease_expires_at": None
+            }).eq("id", job_id).eq("worker_id", self.worker_id).execute()
+            if not response.data:
+                logger.warning(f"Job {job_id} not completed: no longer owned by {self.worker_id}.")
+                return False
             logger.info(f"Job {job_id} completed.")
+            return True
         except Exception as e:
             logger.error(f"Failed to complete job {job_id}: {e}")
+            return False
 
-    def fail(self, job_id: str, error_msg: str):
+    def fail(self, job_id: str, error_msg: str) -> Optional[Dict[str, Any]]:
         """
-        Handles job failure.
-        - Increments retries.
-        - If retries < max: status='pending' (release lock so it can be retried).
+        Handles job failure atomically via the 'fail_job' RPC.
+        - If retries < max: status='pending' with run_after = now + exponential backoff (jitter).
         - If retries >= max: status='dead' (DLQ).
+        Returns {status, retries, run_after} or None if the job was not ours anymore (reaped).
         """
         try:
-            # 1. Get current retry status
-            res = self.client.table("crawler_jobs").select("retries, max_retries, error_log").eq("id", job_id).single().execute()
-            if not res.data:
-                logger.error(f"Job {job_id} not found during fail handling.")
-                return
-
-            job = res.data
-            current_retries = job.get("retries", 0)
-            max_retries = job.get("max_retries", 3)
-            old_log = job.get("error_log", "") or ""
-            
-            new_log = f"{old_log}\n[Retry {current_retries+1}] {error_msg}".strip()
-            
-            if current_retries + 1 >= max_retries:
-                # Dead Letter Queue
+            response = self.client.rpc("fail_job", {
+                "p_job_id": job_id,
+                "p_worker_id": self.worker_id,
+                "p_error": error_msg,
+                "p_base_delay_seconds": self.retry_base_seconds,
+                "p_max_delay_seconds": self.retry_max_seconds
+            }).execute()
+            if not response.data:
+                logger.warning(f"Job {job_id} not failed: no longer owned by {self.worker_id}.")
+                return None
+
+            row = response.data[0]
+            result = {"status": row['j_status'], "retries": row['j_retries'], "run_after": row['j_run_after']}
+            if result["status"] == "dead":
                 logger.error(f"Job {job_id} moved to DLQ (Max Retries). Error: {error_msg}")
-                self.client.table("crawler_jobs").update({
-                    "status": "dead",
-                    "error_log": new_log,
-                    "completed_at": "now()"
-                }).eq("id", job_id).execute()
             else:
-                # Retry
-                logger.warning(f"Job {job_id} failed. Retrying ({current_retries+1}/{max_retries})...")
-                self.client.table("crawler_jobs").update({
-                    "status": "pending",
-                    "retries": current_retries + 1,
-                    "error_log": new_log,
-                    "worker_id": None, # Release worker assignment
-                    "domain": None,    # Release domain lock? 
-                    # WAIT: If we release domain lock (domain=Null), we lose the domain info for next time!
-                    # The table schema has 'domain' column.
-                    # We should NOT set domain=None. We just set status='pending'.
-                    # The fetch_next_job function checks (status='processing'). So pending jobs don't block.
-                    # BUT: Does the domain column persist? Yes.
-                    # So we just update status.
-                    "started_at": None
-                }).eq("id", job_id).execute()
-
+                logger.warning(f"Job {job_id} failed (retry {result['retries']}), "
+                               f"next attempt after {result['run_after']}. Error: {error_msg}")
+            return result
         except Exception as e:
             logger.error(f"Failed to fail job {job_id}: {e}")
+            return None
@@ -10,12 +10,12 @@ from dotenv import load_dotenv
 from supabase import create_client, Client
 
 # Custom Modules
-from connectors.oparl import OParlClient
 from fetcher import ResilientFetcher
-from job_queue import JobQueue
-from privacy import PrivacyEngine
+from job_queue import JobQueue, LeaseLost, PRIORITY_NORMAL
+from capabilities import worker_capabilities
 from bavarian_bypass import BavarianBypass
-from source_selector import SourceSelector
+from region_precompute import RegionPrecompute
+from crawl_pipeline import CrawlPipeline, PIPELINE_JOB_TYPES, JOB_LIST_PAPERS, profile_tenant
 from audit_logger import AuditLogger
 
 # Configure Logging
@@ -39,153 +39,18 @@ if not SUPABASE_URL or not SUPABASE_KEY:
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 fetcher = ResilientFetcher()
 worker_id = os.getenv("WORKER_ID", f"worker_{int(time.time())}")
-queue = JobQueue(supabase, worker_id)
-privacy_engine = PrivacyEngine()
+# Capability-based routing: only job types this worker can run are claimed
+capabilities, max_memory_mb = worker_capabilities()
+queue = JobQueue(supabase, worker_id, capabilities=capabilities, max_memory_mb=max_memory_mb)
 virtual_parcel_engine = BavarianBypass(supabase, fetcher)
+region_precompute = RegionPrecompute(virtual_parcel_engine)
 audit = AuditLogger(supabase)
+crawl_pipeline = CrawlPipeline(supabase, queue, fetcher, audit=audit, worker_id=worker_id)
 
 # --- CONFIG ---
-KEYWORDS = ["Solar", "Photovoltaik", "Freiflächen", "Sondergebiet", "Aufstellungsbeschluss"]
-
-async def process_crawl_profile(profile):
-    """
-    Executes the crawling logic for a single profile (City).
-    """
-    logger.info(f"Processing Profile: {profile.get('name')} ({profile.get('url')})")
-    
-    url = profile.get("url") or profile.get("oparl_url")
-    if not url: 
-        logger.warning(f"Profile {profile.get('name')} has no URL.")
-        return
-
-    # TIER 1: Hybrid Engine Selection
-    # The Selector chooses OParl, SessionNet, or Tier 2 based on profile data
-    client = SourceSelector.select_client(profile, fetcher)
-    
-    if not client:
-        logger.warning(f"No suitable client found for {profile.get('name')}")
-        return
-
-    try:
-        # Unified Interface Check
-        # Ideally all clients should share a base interface (fetch_recent_papers)
-        # For now, we check type or duck-type
-        
-        # OParl Specific Path
-        if isinstance(client, OParlClient):
-            sys_info = await client.get_system_info()
-            if not sys_info:
-                logger.warning(f"OParl System Unreachable: {url}")
-                return
-
-            # Fetch Papers
-            papers = await client.fetch_recent_papers(days=7)
-            logger.info(f"Found {len(papers)} papers for {profile.get('name')}")
-
-            # Papers fetched. Proceed to processing loop below.
-            pass 
-
-        # SessionNet / Tier 2 Placeholder
-        else:
-             logger.info(f"Client {type(client).__name__} not yet fully integrated in main loop.")
-             return
-
-        # --- REUSED PROCESSING LOGIC (Indented for OParl only right now) ---
-        # NOTE: To make this truly polymorphic, we'd need a common 'fetch_papers' return type.
-        # OParl returns dicts with 'id', 'name'. SessionNet returns similar.
-        # Let's assume OParl for now and Refactor loop later or just copy logic.
-        
-        # Actually, let's just restore the OParl logic but acting on 'client' variable
-        # assuming it is OParlClient.
-        
-        # The Loop:
-        for paper in papers:
-            title = paper.get("name", "Untitled")
-            
-            # Simple Keyword Check (Pre-Filter)
-            is_relevant = any(k.lower() in title.lower() for k in KEYWORDS)
-            
-            if is_relevant:
-                score = 80 # Base score for Title Match
-                
-                # F-01: Deep Analysis (Download PDF)
-                # Only OParlClient has fetch_full_text right now
-                if hasattr(client, 'fetch_full_text'):
-                    logger.info(f"   > [DEEP DIVE] Downloading PDF for: {title[:30]}...")
-                    paper = await client.fetch_full_text(paper)
-                
-                summary_text = f"Detected keywords in title: {title}"
-                if paper.get('full_text'):
-                    summary_text = paper.get('full_text')[:500] + "..."
-                    # Check text relevance again? (Optional)
-                    score = 90
-                
-                # F-03: Privacy Pipeline
-                title_result = privacy_engine.clean_text(title)
-                summary_result = privacy_engine.clean_text(summary_text)
-
-                # Audit: Log PII redactions
-                total_redactions = title_result.redaction_count + summary_result.redaction_count
-                if total_redactions > 0:
-                    try:
-                        audit.log_action(
-                            action="pii_redaction",
-                            resource=paper.get("id", "unknown"),
-                            actor_id=worker_id,
-                            details={
-                                "title_redactions": title_result.redaction_count,
-                                "summary_redactions": summary_result.redaction_count,
-                                "entity_types": list(set(
-                                    e.entity_type for e in
-                                    title_result.redacted_entities + summary_result.redacted_entities
-                                )),
-                            }
-                        )
-                    except Exception as audit_err:
-                        logger.warning(f"Audit log failed (non-blocking): {audit_err}")
-
-                doc = {
-                    "external_id": paper.get("id"), 
-                    "title": title_result.sanitized_text,
-                    "doc_type": paper.get("type", "unknown").split("/")[-1],
-                    "published_date": paper.get("date"),
-                    "url": paper.get("id"),
-                    "region_id": profile.get("id"),
-                    "relevant": True,
-                    "risk_score": score,
-                    "summary": summary_result.sanitized_text,
-                    "content_hash": paper.get("content_hash")
-                }
-                
-                # Dedup Check: Content Hash
-                content_hash = paper.get("content_hash")
-                if content_hash:
-                    # Check if this hash already exists (Global Dedup)
-                    # We only care if it's the SAME content.
-                    existing_hash = supabase.table("evidence_docs").select("id").eq("content_hash", content_hash).execute()
-                    if existing_hash.data:
-                        logger.info(f"   > [DEDUP] Skipping {title[:20]}... (Hash match)")
-                        continue
-
-                # Upsert Evidence
-                try:
-                    supabase.table("evidence_docs").upsert(doc, on_conflict="external_id").execute()
-                    logger.info(f"   > Indexed Evidence: {title_result.sanitized_text[:50]}...")
-                except Exception as db_err:
-                    logger.error(f"DB Error: {db_err}")
-
-    except Exception as e:
-        logger.error(f"Error crawling {profile.get('name')}: {e}")
-        raise e # Re-raise to trigger job failure/retry
-    finally:
-        if hasattr(client, 'close'):
-            await client.close()
-
-    # Create dummy Geometry (F-02) if needed
-    # (Leaving this out for now to focus on F-01)
-    
-    # Update last_scout_at
-    supabase.table("scout_profiles").update({"last_scout_at": "now()"}).eq("id", profile["id"]).execute()
+REAPER_INTERVAL_SECONDS = int(os.getenv("REAPER_INTERVAL_SECONDS", "30"))
+# Moves finished jobs to the history table; 0 disables (e.g. when pg_cron runs it)
+JOB_ARCHIVE_INTERVAL_SECONDS = int(os.getenv("JOB_ARCHIVE_INTERVAL_SECONDS", "3600"))
 
 
 async def process_job(job):
@@ -195,16 +60,26 @@ async def process_job(job):
     job_type = job.get('type')
     payload = job.get('payload')
     
-    if job_type == 'crawl_profile':
-        await process_crawl_profile(payload)
+    if job_type in PIPELINE_JOB_TYPES:
+        # F-01 crawl pipeline: list_papers -> fetch_document -> extract_text -> redact_document -> index_document
+        await crawl_pipeline.run(job_type, payload)
+    elif job_type == 'crawl_profile':
+        # Legacy monolithic crawl jobs still in the queue: now just the first pipeline step
+        await crawl_pipeline.run(JOB_LIST_PAPERS, payload)
     elif job_type == 'calculate_parcel':
-        # F-02 Payload: {lat: float, lon: float}
+        # F-02 Payload: {lat: float, lon: float, force?: bool}
         lat = payload.get('lat')
         lon = payload.get('lon')
         if lat and lon:
-            await virtual_parcel_engine.compute_virtual_parcel(lat, lon)
+            await virtual_parcel_engine.compute_virtual_parcel(lat, lon, force=bool(payload.get('force')))
         else:
             logger.warning("Job payload missing lat/lon")
+    elif job_type == 'precompute_region':
+        # Bulk F-02 Payload: {bbox: [minlon, minlat, maxlon, maxlat]} | {polygon: GeoJSON} | {ags: str}
+        stats = await region_precompute.run(payload)
+        logger.info(f"Region precomputed: {stats.upserted} virtual parcels from {stats.field_blocks} "
+                    f"field blocks ({stats.unchanged} unchanged, {stats.buildings} buildings, "
+                    f"{stats.failed} failed) in {stats.cells} cells.")
     else:
         logger.warning(f"Unknown Job Type: {job_type}")
 
@@ -243,6 +118,7 @@ async def run_producer():
         existing = supabase.table("crawler_jobs") \
             .select("id") \
             .in_("status", ["pending", "processing"]) \
+            .in_("type", [JOB_LIST_PAPERS, "crawl_profile"]) \
             .contains("payload", {"id": p["id"]}) \
             .execute()
             
@@ -256,8 +132,9 @@ async def run_producer():
                 except:
                     pass
             
-            # PUSH
-            if queue.push("crawl_profile", p, domain=domain):
+            # PUSH (fair share between federal states in a Germany-wide backlog)
+            if queue.push(JOB_LIST_PAPERS, p, domain=domain, priority=PRIORITY_NORMAL,
+                          tenant=profile_tenant(p), dedup_key=f"{JOB_LIST_PAPERS}:{p['id']}"):
                 queued_count += 1
         
     if queued_count > 0:
@@ -265,11 +142,18 @@ async def run_producer():
 
 
 async def worker_loop():
-    logger.info(f"Worker Cluster {worker_id} Starting...")
+    logger.info(f"Worker Cluster {worker_id} Starting (capabilities: {capabilities or 'none'}, "
+                f"memory: {max_memory_mb} MB)...")
+    queue.register()
+
+    # Background flusher for buffered audit entries
+    audit.start()
     
     # Force Producer run on start
     await run_producer()
     last_producer_run = time.time()
+    last_reaper_run = 0.0
+    last_archive_run = time.time()
     
     while True:
         # 1. Producer Tick (every 60s)
@@ -279,13 +163,32 @@ async def worker_loop():
             except Exception as e:
                 logger.error(f"Producer Error: {e}")
             last_producer_run = time.time()
+
+        # 2. Reaper Tick: re-queue jobs of crashed/hung workers (expired leases)
+        if time.time() - last_reaper_run > REAPER_INTERVAL_SECONDS:
+            queue.register()  # also our liveness signal in worker_registry
+            queue.reap_expired()
+            last_reaper_run = time.time()
+
+        # 3. Archive Tick: keep the hot queue table small
+        if JOB_ARCHIVE_INTERVAL_SECONDS > 0 and time.time() - last_archive_run > JOB_ARCHIVE_INTERVAL_SECONDS:
+            await asyncio.to_thread(queue.archive_finished)
+            last_archive_run = time.time()
             
-        # 2. Consumer Tick
+        # 4. Consumer Tick
         try:
             job = queue.fetch_next()
             if job:
                 start_time = time.time()
-                await process_job(job)
+                try:
+                    await queue.run_with_heartbeat(job['id'], process_job(job))
+                except LeaseLost:
+                    # Already re-queued by the reaper, neither complete nor fail it
+                    continue
+                except Exception as e:
+                    logger.error(f"Job {job['id']} ({job.get('type')}) failed: {e}")
+                    queue.fail(job['id'], f"{type(e).__name__}: {e}")
+                    continue
                 duration = time.time() - start_time
                 
                 queue.complete(job['id'])
@@ -303,3 +206,9 @@ if __name__ == "__main__":
         asyncio.run(worker_loop())
     except KeyboardInterrupt:
         logger.info("Worker Stopped.")
+    finally:
+        # Shutdown: write remaining audit entries synchronously
+        try:
+            audit.flush_sync()
+        except Exception as e:
+            logger.critical(f"Failed to flush audit log on shutdown ({audit.pending} entries lost): {e}")
@@ -7,15 +7,14 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from typing import Optional, Tuple
-from pypdf import PdfReader
-from privacy import PrivacyEngine, RedactionResult
+import text_extraction
+from privacy import PrivacyEngine, RedactionResult, get_privacy_engine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("PDFProcessor")
 
-# OCR threshold: if extracted text averages fewer than this many chars per page,
-# attempt OCR fallback
-OCR_CHARS_PER_PAGE_THRESHOLD = 50
+# Kept here for backwards compatibility (moved to text_extraction)
+OCR_CHARS_PER_PAGE_THRESHOLD = text_extraction.OCR_CHARS_PER_PAGE_THRESHOLD
 
 class PDFProcessor:
     """
@@ -24,32 +23,17 @@ class PDFProcessor:
     Supports text PDFs (pypdf) and scanned PDFs (pdf2image + pytesseract OCR fallback).
     """
 
-    def __init__(self, fetcher=None):
+    def __init__(self, fetcher=None, privacy: Optional[PrivacyEngine] = None):
         self.fetcher = fetcher
 
         # Fail Closed: Cannot start without privacy module
+        # (shared engine: the NER model is loaded once per process)
         try:
-            self.privacy = PrivacyEngine()
+            self.privacy = privacy or get_privacy_engine()
         except Exception as e:
             logger.critical(f"Failed to initialize PrivacyEngine: {e}")
             raise
 
-        # Lazy-load OCR capability
-        self._ocr_available: Optional[bool] = None
-
-    def _check_ocr_available(self) -> bool:
-        """Check if OCR dependencies are installed for fallback."""
-        if self._ocr_available is None:
-            try:
-                import pdf2image
-                import pytesseract
-                self._ocr_available = True
-                logger.info("OCR fallback available (pdf2image + pytesseract).")
-            except ImportError:
-                self._ocr_available = False
-                logger.warning("OCR dependencies not installed. OCR fallback disabled.")
-        return self._ocr_available
-
     async def process_url(self, url: str) -> Tuple[Optional[str], Optional[bytes], Optional[RedactionResult]]:
         """
         Downloads a PDF, calculates its hash, extracts & sanitizes text.
@@ -102,81 +86,7 @@ class PDFProcessor:
 
     def extract_text(self, file_bytes: bytes) -> str:
         """
-        Extracts text from PDF bytes.
-        Uses pypdf first, falls back to pdf2image + pytesseract OCR for scanned documents.
+        Extracts text from PDF bytes (pypdf, OCR fallback for scanned documents).
+        See text_extraction.py, which the crawl pipeline uses without the privacy module.
         """
-        text = self._extract_text_pypdf(file_bytes)
-
-        # Check if text extraction yielded meaningful content
-        page_count = max(self._count_pages(file_bytes), 1)
-        avg_chars = len(text) / page_count
-
-        if avg_chars < OCR_CHARS_PER_PAGE_THRESHOLD:
-            logger.info(f"Low text yield ({avg_chars:.0f} chars/page). Attempting OCR fallback...")
-            ocr_text = self._extract_text_ocr(file_bytes)
-            if len(ocr_text) > len(text):
-                logger.info(f"OCR extracted {len(ocr_text)} chars (vs {len(text)} from pypdf).")
-                return ocr_text
-
-        return text
-
-    def _extract_text_pypdf(self, file_bytes: bytes) -> str:
-        """Extract text using pypdf. Handles encrypted PDFs gracefully."""
-        try:
-            reader = PdfReader(io.BytesIO(file_bytes))
-
-            if reader.is_encrypted:
-                try:
-                    reader.decrypt("")
-                except Exception:
-                    logger.warning("PDF is encrypted and cannot be read.")
-                    return ""
-
-            text = ""
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-
-            return text.strip()
-
-        except Exception as e:
-            logger.error(f"pypdf text extraction failed: {e}")
-            return ""
-
-    def _extract_text_ocr(self, file_bytes: bytes) -> str:
-        """OCR fallback using pdf2image + pytesseract for scanned PDFs."""
-        if not self._check_ocr_available():
-            return ""
-
-        try:
-            from pdf2image import convert_from_bytes
-            import pytesseract
-
-            # Convert PDF pages to images
-            images = convert_from_bytes(file_bytes, dpi=200)
-            text_parts = []
-
-            for i, image in enumerate(images):
-                try:
-                    # OCR each page
-                    text = pytesseract.image_to_string(image, lang='deu')
-                    if text and text.strip():
-                        text_parts.append(text)
-                        logger.debug(f"OCR extracted text from page {i+1}")
-                except Exception as page_e:
-                    logger.warning(f"OCR failed for page {i+1}: {page_e}")
-
-            return "\n".join(text_parts).strip()
-
-        except Exception as e:
-            logger.error(f"OCR extraction failed: {e}")
-            return ""
-
-    def _count_pages(self, file_bytes: bytes) -> int:
-        """Count pages in PDF for threshold calculation."""
-        try:
-            reader = PdfReader(io.BytesIO(file_bytes))
-            return len(reader.pages)
-        except Exception:
-            return 1
+        return text_extraction.extract_text(file_bytes)
@@ -3,7 +3,7 @@ import os
 import re
 import logging
 from dataclasses import dataclass, field
-from typing import List
+from typing import List, Optional
 
 logger = logging.getLogger("PrivacyEngine")
 
@@ -140,3 +140,17 @@ class PrivacyEngine:
             redaction_count=len(redacted_entities),
             redacted_entities=sorted(redacted_entities, key=lambda x: x.start_char),
         )
+
+
+_shared_engine: Optional[PrivacyEngine] = None
+
+
+def get_privacy_engine() -> PrivacyEngine:
+    """
+    Process-wide PrivacyEngine. The NER model is loaded on first use only,
+    so workers that never run NER jobs don't pay for it.
+    """
+    global _shared_engine
+    if _shared_engine is None:
+        _shared_engine = PrivacyEngine()
+    return _shared_engine
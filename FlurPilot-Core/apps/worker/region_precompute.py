@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import math
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict, Any, Tuple
+
+from shapely.geometry import box, shape
+from shapely.strtree import STRtree
+
+from bavarian_bypass import BavarianBypass, RUST_ENGINE_AVAILABLE, input_fingerprint
+
+logger = logging.getLogger("RegionPrecompute")
+
+# --- Config ---
+# Region bboxes are processed in grid cells of this size (degrees, ~4 x 5.5 km in Bavaria),
+# so memory is bounded by one cell's field blocks and buildings.
+REGION_CHUNK_SIZE_DEG = float(os.getenv("REGION_CHUNK_SIZE_DEG", "0.05"))
+REGION_UPSERT_BATCH = int(os.getenv("REGION_UPSERT_BATCH", "500"))
+# Gemeinde boundaries (Verwaltungsgrenzen) for {"ags": ...} payloads
+WFS_URL_GEMEINDEN = os.getenv("WFS_URL_GEMEINDEN")
+WFS_TYPENAME_GEMEINDEN = os.getenv("WFS_TYPENAME_GEMEINDEN", "Gemeinde")
+WFS_AGS_PROPERTY = os.getenv("WFS_AGS_PROPERTY", "ags")
+
+
+@dataclass
+class PrecomputeStats:
+    cells: int = 0
+    field_blocks: int = 0
+    buildings: int = 0
+    upserted: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    failed_cells: List[Tuple[float, float, float, float]] = field(default_factory=list)
+
+
+def grid_cells(bbox: Tuple[float, float, float, float], size: float) -> List[Tuple[float, float, float, float]]:
+    """Splits a bbox into a row-major grid of cells of at most `size` degrees."""
+    minx, miny, maxx, maxy = bbox
+    nx = max(1, math.ceil((maxx - minx) / size))
+    ny = max(1, math.ceil((maxy - miny) / size))
+    dx, dy = (maxx - minx) / nx, (maxy - miny) / ny
+    return [
+        (minx + i * dx, miny + j * dy, minx + (i + 1) * dx, miny + (j + 1) * dy)
+        for j in range(ny) for i in range(nx)
+    ]
+
+
+def join_buildings(fields: List[Dict[str, Any]], buildings: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Spatial join (STRtree): for each field block the building geometries intersecting it.
+    """
+    building_geoms = [b['geometry'] for b in buildings]
+    tree = STRtree([shape(g) for g in building_geoms])
+    return [
+        [building_geoms[i] for i in tree.query(shape(f['geometry']), predicate="intersects")]
+        for f in fields
+    ]
+
+
+def field_block_id(feature: Dict[str, Any]) -> Optional[str]:
+    return (feature.get('properties') or {}).get('FLIK') or feature.get('id')
+
+
+class RegionPrecompute:
+    """
+    Bulk precomputation of virtual parcels for a region (job type 'precompute_region').
+    Payload: {"bbox": [minlon, minlat, maxlon, maxlat]} | {"polygon": GeoJSON geometry} | {"ags": "09162000"}
+             optional "force": true recomputes field blocks whose inputs are unchanged
+
+    Per grid cell:
+    1. Harvest all field blocks (paged/tiled WFS); a field block belongs to the cell
+       containing its representative point, so cells never compute it twice.
+    2. Harvest all buildings in the envelope of those field blocks.
+    3. Spatial join (STRtree); field blocks whose input fingerprint matches the
+       stored one are skipped, the rest are computed in one Rust batch.
+    4. Bulk upsert into virtual_parcels (on source_field_id).
+    """
+
+    def __init__(self, bypass: BavarianBypass, chunk_size_deg: float = REGION_CHUNK_SIZE_DEG,
+                 upsert_batch: int = REGION_UPSERT_BATCH):
+        self.bypass = bypass
+        self.db = bypass.db
+        self.wfs = bypass.wfs
+        self.chunk_size_deg = chunk_size_deg
+        self.upsert_batch = upsert_batch
+
+    async def resolve_region(self, payload: Dict[str, Any]):
+        """Payload -> shapely geometry of the region (EPSG:4326)."""
+        if payload.get('polygon'):
+            return shape(payload['polygon'])
+        if payload.get('bbox'):
+            return box(*payload['bbox'])
+        if payload.get('ags'):
+            if not WFS_URL_GEMEINDEN:
+                raise ValueError("WFS_URL_GEMEINDEN is not configured, cannot resolve an AGS")
+            features = await self.wfs.harvester.fetch_by_property(
+                WFS_URL_GEMEINDEN, WFS_TYPENAME_GEMEINDEN, WFS_AGS_PROPERTY, str(payload['ags'])
+            )
+            if not features:
+                raise ValueError(f"Gemeinde {payload['ags']} not found")
+            return shape(features[0]['geometry'])
+        raise ValueError("precompute_region payload needs 'bbox', 'polygon' or 'ags'")
+
+    async def run(self, payload: Dict[str, Any]) -> PrecomputeStats:
+        region = await self.resolve_region(payload)
+        cells = [c for c in grid_cells(region.bounds, self.chunk_size_deg) if region.intersects(box(*c))]
+        logger.info(f"Precomputing virtual parcels for region {region.bounds} in {len(cells)} cells...")
+
+        stats = PrecomputeStats()
+        for n, cell in enumerate(cells, 1):
+            try:
+                await self.process_cell(region, cell, stats, force=bool(payload.get('force')))
+            except Exception as e:
+                # Upserts are idempotent, a retried job simply redoes the failed cells
+                logger.error(f"Cell {cell} failed: {e}")
+                stats.failed_cells.append(cell)
+            stats.cells += 1
+            logger.info(f"Cell {n}/{len(cells)} done. Upserted so far: {stats.upserted}")
+
+        if stats.failed_cells:
+            raise RuntimeError(f"{len(stats.failed_cells)}/{len(cells)} cells failed: {stats.failed_cells[:5]}")
+        return stats
+
+    async def process_cell(self, region, cell: Tuple[float, float, float, float], stats: PrecomputeStats,
+                           force: bool = False):
+        fields = await self.wfs.fetch_layer("fields", list(cell))
+        if fields is None:
+            raise RuntimeError("field block harvest failed")
+
+        # Ownership: representative point inside this cell (half-open on the max edges)
+        own, bounds = [], []
+        for f in fields:
+            try:
+                geom = shape(f['geometry'])
+                p = geom.representative_point()
+            except Exception:
+                continue
+            if cell[0] <= p.x < cell[2] and cell[1] <= p.y < cell[3] and geom.intersects(region) \
+                    and field_block_id(f):
+                own.append(f)
+                bounds.append(geom.bounds)
+        if not own:
+            return
+        stats.field_blocks += len(own)
+
+        envelope = [
+            min(b[0] for b in bounds), min(b[1] for b in bounds),
+            max(b[2] for b in bounds), max(b[3] for b in bounds)
+        ]
+        buildings = await self.wfs.fetch_layer("buildings", envelope)
+        if buildings is None:
+            # Never store parcels computed without their buildings
+            raise RuntimeError("building harvest failed")
+        stats.buildings += len(buildings)
+
+        joined = join_buildings(own, buildings)
+        fingerprints = [input_fingerprint(f['geometry'], b) for f, b in zip(own, joined)]
+
+        if not force:
+            stored = self.bypass.fetch_fingerprints([field_block_id(f) for f in own])
+            changed = [
+                i for i, f in enumerate(own)
+                if (stored.get(field_block_id(f)) or {}).get('input_fingerprint') != fingerprints[i]
+            ]
+            stats.unchanged += len(own) - len(changed)
+            own = [own[i] for i in changed]
+            joined = [joined[i] for i in changed]
+            fingerprints = [fingerprints[i] for i in changed]
+            if not own:
+                return
+
+        items = [(f['geometry'], b) for f, b in zip(own, joined)]
+
+        if RUST_ENGINE_AVAILABLE:
+            # Rust releases the GIL, so the batch runs off the event loop
+            results = await asyncio.to_thread(self.bypass._calculate_batch_with_rust, items)
+        else:
+            results = [await self.bypass._calculate_with_rpc(fg, bg) for fg, bg in items]
+
+        rows = []
+        for f, fingerprint, result in zip(own, fingerprints, results):
+            if not result:
+                stats.failed += 1
+                continue
+            rows.append({
+                "source_field_id": field_block_id(f),
+                "net_area_m2": result['net_area'],
+                "geometry": result['net_geom'],
+                "input_fingerprint": fingerprint,
+                "last_calculated_at": "now()"
+            })
+
+        for i in range(0, len(rows), self.upsert_batch):
+            self.db.table("virtual_parcels").upsert(
+                rows[i:i + self.upsert_batch], on_conflict="source_field_id"
+            ).execute()
+        stats.upserted += len(rows)
@@ -3,6 +3,7 @@ import os
 import time
 from supabase import create_client
 from dotenv import load_dotenv
+from job_queue import PRIORITY_INTERACTIVE
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 load_dotenv(os.path.join(script_dir, ".env"))
@@ -24,7 +25,8 @@ job = {
     "type": "calculate_parcel",
     "payload": payload,
     "status": "pending",
-    "worker_id": None
+    "worker_id": None,
+    "priority": PRIORITY_INTERACTIVE  # interactive: a single parcel requested from the dashboard
 }
 
 try:
@@ -0,0 +1,57 @@
+import argparse
+import json
+import os
+from supabase import create_client
+from dotenv import load_dotenv
+from job_queue import PRIORITY_BULK
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+load_dotenv(os.path.join(script_dir, ".env"))
+
+SUPABASE_URL = os.getenv("NEXT_PUBLIC_SUPABASE_URL") or os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+
+def main():
+    """
+    Queues one 'precompute_region' job (bulk virtual parcels for a whole region)
+    instead of one 'calculate_parcel' job per coordinate.
+    """
+    parser = argparse.ArgumentParser(description="Seed a region-wide virtual parcel precomputation job.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--bbox", type=float, nargs=4, metavar=("MINLON", "MINLAT", "MAXLON", "MAXLAT"))
+    group.add_argument("--ags", help="Amtlicher Gemeindeschluessel (requires WFS_URL_GEMEINDEN on the worker)")
+    group.add_argument("--polygon-file", help="GeoJSON file with a (Multi)Polygon geometry or Feature (EPSG:4326)")
+    parser.add_argument("--tenant", help="fair-share group (customer or region key), e.g. 'land:09'")
+    args = parser.parse_args()
+
+    if args.bbox:
+        payload = {"bbox": args.bbox}
+    elif args.ags:
+        payload = {"ags": args.ags}
+    else:
+        with open(args.polygon_file) as f:
+            geojson = json.load(f)
+        payload = {"polygon": geojson.get("geometry", geojson)}
+
+    client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    print(f"Seeding Region Precompute Job: {list(payload.keys())[0]}...")
+
+    job = {
+        "type": "precompute_region",
+        "payload": payload,
+        "status": "pending",
+        "worker_id": None,
+        "priority": PRIORITY_BULK,  # bulk: yields to interactive and crawl jobs
+        "tenant": args.tenant
+    }
+
+    try:
+        data = client.table("crawler_jobs").insert(job).execute()
+        print(f"Job Queued: {data.data[0]['id']}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
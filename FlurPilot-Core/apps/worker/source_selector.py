@@ -10,6 +10,7 @@ from connectors.sessionnet import SessionNetClient
 from connectors.search_index import SearchIndexClient as GoogleSearchClient
 from connectors.brave_search import BraveSearchClient
 from connectors.bing_search import BingSearchClient
+from connectors.base import PaperConnector, SiteSearchConnector
 
 logger = logging.getLogger("SourceSelector")
 
@@ -22,6 +23,9 @@ class SourceSelector:
     Tier 1.5: RIS Scraper (SessionNet/Somacos) - HTML scraping for known systems
     Tier 2: Search APIs - Brave Search (Primary) or Google Custom Search (Fallback)
     
+    ⚠️  NOTE: The Google tier is not functional yet (SearchIndexClient.execute_search
+    sends no CSE request), so it is never selected as an acquisition engine.
+    
     ⚠️  NOTE: Bing Search API wurde am 11.08.2025 eingestellt und ist nicht mehr verfügbar.
     """
     
@@ -47,7 +51,7 @@ class SourceSelector:
                 logger.warning(f"⚠️ Failed to initialize Google Search: {e}")
     
     @staticmethod
-    def select_client(profile: dict, fetcher: Any) -> Any:
+    def select_client(profile: dict, fetcher: Any) -> Optional[PaperConnector]:
         """
         Determines the best client for the given profile.
         Returns an instance of the client (or None if no match).
@@ -57,21 +61,21 @@ class SourceSelector:
         selector = SourceSelector()
         return selector.select_acquisition_engine(profile, fetcher)
     
-    def select_acquisition_engine(self, profile: dict, fetcher: Any) -> Any:
+    def select_acquisition_engine(self, profile: dict, fetcher: Any) -> Optional[PaperConnector]:
         """
         Determines the best acquisition engine for the given profile.
         
         Priority:
         1. Tier 1: OParl API
         2. Tier 1.5: RIS Scraper (SessionNet/Somacos)
-        3. Tier 2: Search API (Brave or Google)
+        3. Tier 2: Search API (Brave; Google is not functional yet and is skipped)
         
         Args:
             profile: Municipality profile with metadata
             fetcher: ResilientFetcher instance for HTTP requests
             
         Returns:
-            Client instance or None if no suitable engine found
+            PaperConnector (iter_papers) or None if no suitable engine found
         """
         name = profile.get("name", "Unknown")
         oparl_url = profile.get("oparl_url")
@@ -88,19 +92,22 @@ class SourceSelector:
         if url:
             if "sessionnet" in url.lower() or "/bi/" in url.lower() or "ris" in url.lower():
                 logger.info(f"🥈 Selected Engine: SessionNet (Tier 1.5) for {name}")
-                # SessionNetClient currently doesn't accept fetcher, needs refactor or wrapper
-                # For now we instantiate it directly, but ideally it should use the fetcher.
-                # TODO: Upgrade SessionNetClient to use ResilientFetcher
-                return SessionNetClient(url)
+                return SessionNetClient(url, fetcher=fetcher)
 
-        # 3. Tier 2: Search API (Brave preferred, Google fallback)
-        # If no direct interface, use Search API to discover documents
+        # 3. Tier 2: Search API (Brave)
+        # If no direct interface, use Search API to discover documents on the municipality's site
+        site_domain = profile.get("domain") or (urlparse(url).netloc if url else None)
+        if self.brave_client and not site_domain:
+            logger.warning(f"⚠️ No site domain for {name}, Tier 2 search skipped")
+            return None
         if self.brave_client:
             logger.info(f"🔍 Selected Engine: Brave Search (Tier 2) for {name}")
-            return self.brave_client
+            return SiteSearchConnector(self.brave_client, site_domain, "brave")
         elif self.google_client:
-            logger.info(f"🔍 Selected Engine: Google Custom Search (Tier 2) for {name}")
-            return self.google_client
+            # The CSE request is not implemented: a Google "crawl" would always find
+            # zero papers and still stamp last_scout_at. Not selected until it exists.
+            logger.warning(f"⚠️ Google Custom Search (Tier 2) is not implemented yet, no engine for {name}")
+            return None
         else:
             logger.warning(f"⚠️ No Tier 2 search engine available for {name}")
             logger.warning("   Set BRAVE_API_KEY or GOOGLE_API_KEY environment variable")
@@ -1,5 +1,6 @@
 import asyncio
 from connectors.sessionnet import SessionNetClient
+from fetcher import ResilientFetcher
 
 async def test_sessionnet():
     # Target: Stadt Crailsheim (Hosted by KRZ)
@@ -8,7 +9,7 @@ async def test_sessionnet():
     
     print(f"Testing SessionNet Connector with: {url}")
     
-    client = SessionNetClient(url)
+    client = SessionNetClient(url, fetcher=ResilientFetcher())
     
     # 1. Connectivity
     alive = await client.check_connectivity()
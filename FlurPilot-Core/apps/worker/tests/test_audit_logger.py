@@ -0,0 +1,132 @@
+"""Tests for the buffered AuditLogger write path."""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audit_logger import AuditLogger
+
+
+class FakeRpc:
+    def __init__(self, db, rows):
+        self.db = db
+        self.rows = rows
+
+    def execute(self):
+        if self.db.fail:
+            raise RuntimeError("db down")
+        self.db.inserts.append(self.rows)
+        return self
+
+
+class FakeClient:
+    def __init__(self):
+        self.inserts = []
+        self.fail = False
+
+    def rpc(self, name, params):
+        assert name == "append_audit_logs"
+        return FakeRpc(self, params["p_entries"])
+
+
+def test_entries_are_buffered_until_batch_size():
+    db = FakeClient()
+    audit = AuditLogger(db, batch_size=3)
+
+    async def run():
+        await audit.log_action_async("pii_redaction", "paper_1")
+        await audit.log_action_async("pii_redaction", "paper_2")
+        assert db.inserts == []
+        await audit.log_action_async("pii_redaction", "paper_3")
+
+    asyncio.run(run())
+
+    # One bulk insert with all three entries, in order
+    assert len(db.inserts) == 1
+    assert [e["resource"] for e in db.inserts[0]] == ["paper_1", "paper_2", "paper_3"]
+    assert all("timestamp" in e for e in db.inserts[0])
+    assert audit.pending == 0
+
+
+def test_critical_action_flushes_and_fails_closed():
+    db = FakeClient()
+    audit = AuditLogger(db, batch_size=100)
+    db.fail = True
+
+    async def run():
+        await audit.log_action_async("pii_redaction", "paper_1")
+        with pytest.raises(RuntimeError):
+            await audit.log_action_async("export", "dataset", critical=True)
+
+    asyncio.run(run())
+
+    # Nothing lost: the failed batch is kept for the next flush
+    assert audit.pending == 2
+
+    db.fail = False
+    assert audit.flush_sync() == 2
+    assert [e["resource"] for e in db.inserts[0]] == ["paper_1", "dataset"]
+
+
+def test_overflow_is_spilled_to_disk_and_replayed_in_order(tmp_path):
+    db = FakeClient()
+    spill_path = str(tmp_path / "audit_spill.jsonl")
+    audit = AuditLogger(db, batch_size=1, max_buffer=2, spill_path=spill_path)
+    db.fail = True
+
+    async def run():
+        for i in range(4):
+            await audit.log_action_async("pii_redaction", f"paper_{i}")
+
+    asyncio.run(run())
+
+    # Nothing accepted is lost: the memory buffer is bounded, the rest is on disk
+    assert audit.pending == 2
+    assert audit.spilled == 2
+
+    db.fail = False
+    assert audit.flush_sync() == 4
+    assert [e["resource"] for batch in db.inserts for e in batch] == ["paper_0", "paper_1", "paper_2", "paper_3"]
+    assert not os.path.exists(spill_path)
+
+
+def test_failed_replay_keeps_the_spill_file(tmp_path):
+    db = FakeClient()
+    spill_path = str(tmp_path / "audit_spill.jsonl")
+    audit = AuditLogger(db, batch_size=10, max_buffer=1, spill_path=spill_path)
+    db.fail = True
+
+    for i in range(3):
+        audit._buffer.append({"action": "pii_redaction", "resource": f"paper_{i}"})
+        assert audit.flush_sync(raise_on_error=False) == 0
+
+    assert audit.pending == 1
+    assert audit.spilled == 2
+    with pytest.raises(RuntimeError):
+        audit.flush_sync()
+    assert audit.spilled == 2 and audit.pending == 1
+
+
+def test_periodic_flush_replays_one_spilled_batch_at_a_time(tmp_path):
+    db = FakeClient()
+    spill_path = str(tmp_path / "audit_spill.jsonl")
+    audit = AuditLogger(db, batch_size=2, max_buffer=10, spill_path=spill_path)
+    audit._spill([{"action": "pii_redaction", "resource": f"spilled_{i}"} for i in range(3)])
+    audit._buffer.append({"action": "pii_redaction", "resource": "new"})
+
+    assert audit.flush_sync(raise_on_error=False) == 2
+    assert audit.spilled == 1 and audit.pending == 1  # newer entry waits for the spill file
+
+    assert audit.flush_sync(raise_on_error=False) == 2
+    assert [e["resource"] for batch in db.inserts for e in batch] == ["spilled_0", "spilled_1", "spilled_2", "new"]
+    assert not os.path.exists(spill_path)
+
+
+def test_default_spill_path_is_anchored_to_the_worker_dir():
+    audit = AuditLogger(FakeClient())
+    worker_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert audit.spill_path == os.path.join(worker_dir, "audit_spill.jsonl")
@@ -0,0 +1,120 @@
+"""Tests for the streaming audit chain verifier."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audit_verifier import (
+    AuditChainVerifier,
+    GENESIS_HASH,
+    compute_entry_hash,
+    pg_jsonb_text,
+    pg_timestamptz_text,
+)
+
+
+def test_timestamptz_text_matches_postgres_output():
+    assert pg_timestamptz_text("2026-02-08T12:34:56.120000+00:00") == "2026-02-08 12:34:56.12+00"
+    assert pg_timestamptz_text("2026-02-08T12:34:56+00:00") == "2026-02-08 12:34:56+00"
+    assert pg_timestamptz_text("2026-02-08T13:34:56.000001+01:00") == "2026-02-08 12:34:56.000001+00"
+
+
+def test_jsonb_text_orders_keys_like_postgres():
+    # Shorter keys first, then bytewise; ', ' and ': ' separators
+    value = {"summary_redactions": 1, "b": [1, 2.5], "aa": None, "a": "Ä"}
+    assert pg_jsonb_text(value) == '{"a": "Ä", "b": [1, 2.5], "aa": null, "summary_redactions": 1}'
+    assert pg_jsonb_text({}) == "{}"
+    assert pg_jsonb_text(1e-05) == "0.00001"
+
+
+def build_chain(n):
+    rows, prev = [], GENESIS_HASH
+    for i in range(1, n + 1):
+        row = {
+            "seq": i,
+            "timestamp": f"2026-02-08T12:00:{i:02d}.5+00:00",
+            "actor_id": None,
+            "action": "pii_redaction",
+            "resource": f"paper_{i}",
+            "details": {"title_redactions": i},
+            "prev_hash": prev,
+        }
+        row["curr_hash"] = compute_entry_hash(row, prev)
+        prev = row["curr_hash"]
+        rows.append(row)
+    return rows
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db, self.table, self.filters, self.row_limit = db, table, {}, None
+
+    def select(self, _):
+        return self
+
+    def eq(self, col, val):
+        self.filters["eq"] = (col, val)
+        return self
+
+    def gt(self, col, val):
+        self.filters["gt"] = (col, val)
+        return self
+
+    def order(self, _):
+        return self
+
+    def limit(self, n):
+        self.row_limit = n
+        return self
+
+    def upsert(self, row, on_conflict=None):
+        self.db.checkpoints[row["name"]] = row
+        return self
+
+    def execute(self):
+        class Res:
+            pass
+        res = Res()
+        if self.table == "audit_logs":
+            after = self.filters["gt"][1]
+            res.data = [r for r in self.db.rows if r["seq"] > after][:self.row_limit]
+        else:
+            cp = self.db.checkpoints.get(self.filters.get("eq", (None, None))[1])
+            res.data = [cp] if cp else []
+        return res
+
+
+class FakeClient:
+    def __init__(self, rows):
+        self.rows = rows
+        self.checkpoints = {}
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+def test_verifier_is_incremental():
+    db = FakeClient(build_chain(7))
+    verifier = AuditChainVerifier(db, batch_size=3)
+
+    report = verifier.verify()
+    assert report.ok and report.checked == 7 and report.last_seq == 7
+
+    # Only new entries are checked on the next run
+    db.rows = build_chain(9)
+    report = verifier.verify()
+    assert report.ok and report.checked == 2 and report.start_seq == 7
+
+
+def test_verifier_detects_tampering():
+    rows = build_chain(5)
+    rows[3]["resource"] = "tampered"
+    db = FakeClient(rows)
+
+    report = AuditChainVerifier(db, batch_size=2).verify()
+    assert not report.ok
+    assert report.broken_seq == 4
+    assert report.checked == 3
+    # Checkpoint stays at the last valid entry
+    assert db.checkpoints["stream"]["seq"] == 3
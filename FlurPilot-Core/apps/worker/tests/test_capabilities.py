@@ -0,0 +1,40 @@
+"""Tests for worker capability detection and configuration (job routing)."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import capabilities
+from capabilities import CAPABILITY_NER, CAPABILITY_OCR, CAPABILITY_RUST_ENGINE
+
+
+def test_autodetect_when_unconfigured(monkeypatch):
+    monkeypatch.setattr(capabilities, "WORKER_CAPABILITIES", None)
+    monkeypatch.setattr(capabilities, "WORKER_MAX_MEMORY_MB", "2048")
+    monkeypatch.setattr(capabilities, "detect_capabilities", lambda: [CAPABILITY_RUST_ENGINE, CAPABILITY_NER])
+
+    assert capabilities.worker_capabilities() == ([CAPABILITY_NER, CAPABILITY_RUST_ENGINE], 2048)
+
+
+def test_empty_configuration_makes_an_io_only_worker(monkeypatch):
+    monkeypatch.setattr(capabilities, "WORKER_CAPABILITIES", "")
+    monkeypatch.setattr(capabilities, "detect_capabilities", lambda: [CAPABILITY_NER, CAPABILITY_OCR])
+
+    caps, _ = capabilities.worker_capabilities()
+    assert caps == []
+
+
+def test_configured_but_missing_capabilities_are_dropped(monkeypatch):
+    monkeypatch.setattr(capabilities, "WORKER_CAPABILITIES", "ocr, ner")
+    monkeypatch.setattr(capabilities, "detect_capabilities", lambda: [CAPABILITY_NER])
+
+    caps, _ = capabilities.worker_capabilities()
+    assert caps == [CAPABILITY_NER]
+
+
+def test_detection_does_not_import_heavy_modules():
+    sys.modules.pop("spacy", None)
+    capabilities.detect_capabilities()
+    assert "spacy" not in sys.modules
+    assert capabilities.detect_memory_mb() is None or capabilities.detect_memory_mb() > 0
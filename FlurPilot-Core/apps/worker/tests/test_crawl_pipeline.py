@@ -0,0 +1,458 @@
+"""Tests for the chained crawl pipeline (list -> fetch -> extract -> redact -> index)."""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import crawl_pipeline
+from connectors.base import PaperConnector, PaperRecord, SiteSearchConnector
+from connectors.oparl import OParlClient
+from crawl_pipeline import CrawlPipeline
+
+PDF_BYTES = b"%PDF-1.4 fake"
+PAPER = {"id": "https://ris.example.de/paper/1", "name": "Aufstellungsbeschluss Solarpark Nord",
+         "type": "https://schema.oparl.org/1.1/Paper", "date": "2026-02-01"}
+
+
+class FakeQueue:
+    def __init__(self):
+        self.pushed = []
+
+    def push(self, job_type, payload, domain=None, priority=1, tenant=None, dedup_key=None):
+        self.pushed.append({"type": job_type, "payload": payload, "domain": domain,
+                            "tenant": tenant, "dedup_key": dedup_key, "priority": priority})
+        return True
+
+
+class FakeStore:
+    def __init__(self, files=None):
+        self.files = dict(files or {})
+
+    def put(self, path, data, content_type):
+        self.files[path] = data
+
+    def get(self, path):
+        return self.files[path]
+
+    def remove(self, paths):
+        for path in paths:
+            self.files.pop(path, None)
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def neq(self, column, value):
+        return self
+
+    def in_(self, column, values):
+        return self
+
+    def gt(self, column, value):
+        self.db.filters.append((self.table, column, value))
+        return self
+
+    def order(self, column, desc=False):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def range(self, start, end):
+        return self
+
+    def update(self, data):
+        self.updating = True
+        return self
+
+    def upsert(self, data, on_conflict=None):
+        self.db.upserts.append((self.table, data))
+        return self
+
+    def execute(self):
+        if getattr(self, "updating", False):
+            return SimpleNamespace(data=[])  # no row matches the version refresh
+        return SimpleNamespace(data=self.db.existing.get(self.table, []))
+
+
+class FakeDB:
+    def __init__(self, existing=None):
+        self.existing = existing or {}
+        self.upserts = []
+        self.filters = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+class FakePrivacy:
+    def clean_text(self, text):
+        sanitized = text.replace("Max Mustermann", "[PER]")
+        return SimpleNamespace(sanitized_text=sanitized, redaction_count=int(sanitized != text),
+                               redacted_entities=[SimpleNamespace(entity_type="PER")] if sanitized != text else [])
+
+
+class FakeResponse:
+    status_code = 200
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def aiter_bytes(self):
+        yield PDF_BYTES[:5]
+        yield PDF_BYTES[5:]
+
+
+class FakeFetcher:
+    async def stream(self, method, url):
+        return FakeResponse()
+
+
+def make_pipeline(db=None, store=None):
+    queue = FakeQueue()
+    pipeline = CrawlPipeline(db or FakeDB(), queue, FakeFetcher(), store=store or FakeStore(),
+                             privacy_engine=FakePrivacy())
+    return pipeline, queue
+
+
+class FakeOParl(PaperConnector):
+    source = "oparl"
+
+    def __init__(self, papers):
+        self.papers = papers
+
+    async def iter_papers(self, days=7, keywords=None):
+        for paper in self.papers:
+            yield PaperRecord.from_oparl(paper, self.primary_file(paper))
+
+    @staticmethod
+    def primary_file(paper):
+        return (paper.get("file") or [None])[0]
+
+
+PROFILE = {"id": "region-1", "name": "Landshut", "ags": "09261000", "url": "https://ris.example.de/oparl"}
+PDF_FILE = {"accessUrl": "https://files.example.de/1.pdf", "sha1Checksum": "ABC123", "size": 1024}
+
+
+def test_list_papers_fans_out_relevant_papers(monkeypatch):
+    papers = [
+        {**PAPER, "file": [PDF_FILE]},
+        {"id": "p2", "name": "Haushaltsplan 2026"},
+        {"id": "p3", "name": "Photovoltaik auf Schuldach"},
+    ]
+    monkeypatch.setattr(crawl_pipeline.SourceSelector, "select_client", staticmethod(lambda p, f: FakeOParl(papers)))
+    pipeline, queue = make_pipeline()
+
+    asyncio.run(pipeline.list_papers(PROFILE))
+
+    assert [(j["type"], j["dedup_key"]) for j in queue.pushed] == [
+        ("redact_document", "redact_document:p3"),  # no file: title-only evidence
+        ("fetch_document", f"fetch_document:{PAPER['id']}"),  # after the file cache lookup
+    ]
+    assert queue.pushed[1]["domain"] == "files.example.de"
+    assert queue.pushed[1]["tenant"] == "land:09"
+    assert queue.pushed[1]["payload"]["version"] == {"source_modified": None, "file_sha1": "abc123", "file_size": 1024}
+
+
+def test_list_papers_skips_unchanged_papers(monkeypatch):
+    papers = [
+        {**PAPER, "modified": "2026-02-02T10:00:00+01:00", "file": [PDF_FILE]},
+        {"id": "p3", "name": "Photovoltaik auf Schuldach", "modified": "2026-02-05T08:00:00Z"},
+        {"id": "p4", "name": "Solarpark Süd", "modified": "2026-02-05T08:00:00Z"},
+    ]
+    known = [
+        # Same checksum (modified differs, checksum wins)
+        {"external_id": PAPER["id"], "source_modified": "2026-01-01T00:00:00+00:00", "file_sha1": "abc123"},
+        # Same instant in another timezone notation
+        {"external_id": "p3", "source_modified": "2026-02-05T09:00:00+01:00", "file_sha1": None},
+        # Modified since indexing
+        {"external_id": "p4", "source_modified": "2026-02-01T08:00:00+00:00", "file_sha1": None},
+    ]
+    monkeypatch.setattr(crawl_pipeline.SourceSelector, "select_client", staticmethod(lambda p, f: FakeOParl(papers)))
+    pipeline, queue = make_pipeline(FakeDB(existing={"evidence_docs": known}))
+
+    asyncio.run(pipeline.list_papers(PROFILE))
+
+    assert [j["dedup_key"] for j in queue.pushed] == ["redact_document:p4"]
+
+
+def test_document_flows_through_all_steps(monkeypatch):
+    monkeypatch.setattr(crawl_pipeline.text_extraction, "extract_text",
+                        lambda data: "Antrag von Max Mustermann auf Freiflächen-PV")
+    db = FakeDB()
+    store = FakeStore()
+    pipeline, queue = make_pipeline(db, store)
+
+    asyncio.run(pipeline.fetch_document({"paper": PAPER, "file_url": "https://files.example.de/1.pdf",
+                                         "region_id": "region-1", "tenant": "land:09"}))
+    extract = queue.pushed[-1]
+    assert extract["type"] == "extract_text"
+    assert store.files[extract["payload"]["pdf_path"]] == PDF_BYTES
+
+    asyncio.run(pipeline.run(extract["type"], extract["payload"]))
+    redact = queue.pushed[-1]
+    assert redact["type"] == "redact_document"
+    assert extract["payload"]["pdf_path"] not in store.files  # raw PDF removed
+
+    asyncio.run(pipeline.run(redact["type"], redact["payload"]))
+    index = queue.pushed[-1]
+    assert index["type"] == "index_document"
+    assert store.files == {}  # unredacted text removed
+    doc = index["payload"]["doc"]
+    assert "Max Mustermann" not in doc["summary"] and "[PER]" in doc["summary"]
+    assert doc["risk_score"] == 90 and doc["doc_type"] == "Paper"
+
+    asyncio.run(pipeline.run(index["type"], index["payload"]))
+    assert db.upserts == [("evidence_docs", doc)]
+
+
+def test_known_content_is_not_stored_again():
+    pipeline, queue = make_pipeline(FakeDB(existing={"evidence_docs": [{"id": "e1"}]}))
+
+    asyncio.run(pipeline.fetch_document({"paper": PAPER, "file_url": "https://files.example.de/1.pdf"}))
+
+    assert queue.pushed == []
+    assert pipeline.store.files == {}
+
+
+def test_failed_enqueue_fails_the_step():
+    pipeline, queue = make_pipeline()
+    queue.push = lambda *args, **kwargs: False
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(pipeline.fetch_document({"paper": PAPER, "file_url": "https://files.example.de/1.pdf"}))
+
+
+def test_list_papers_uses_file_metadata(monkeypatch):
+    shared = {"accessUrl": "https://files.example.de/anlage.pdf", "mimeType": "application/pdf",
+              "sha1Checksum": "FEED01", "size": 2048}
+    papers = [
+        {**PAPER, "mainFile": {**PDF_FILE, "mimeType": "application/pdf"}},
+        {"id": "p2", "name": "Solarpark Süd", "file": [{"accessUrl": "https://files.example.de/2.docx",
+                                                        "mimeType": "application/msword"}]},
+        {"id": "p3", "name": "Photovoltaik Bericht", "file": [{"accessUrl": "https://files.example.de/3.pdf",
+                                                               "size": 10 ** 10}]},
+        {"id": "p4", "name": "Solarpark Ost", "file": [shared]},
+        {"id": "p5", "name": "Solarpark West", "file": [shared]},
+    ]
+    oparl = FakeOParl(papers)
+    oparl.primary_file = OParlClient.primary_file
+    monkeypatch.setattr(crawl_pipeline.SourceSelector, "select_client", staticmethod(lambda p, f: oparl))
+    cache = [{"cache_key": "sha1:abc123", "content_hash": "h1", "summary": "Bebauungsplan [PER]"}]
+    pipeline, queue = make_pipeline(FakeDB(existing={"document_file_cache": cache}))
+
+    asyncio.run(pipeline.list_papers(PROFILE))
+
+    jobs = {j["dedup_key"]: j for j in queue.pushed}
+    assert list(jobs) == [
+        "redact_document:p2",  # not a PDF: title-only
+        "redact_document:p3",  # too large: title-only
+        f"redact_document:{PAPER['id']}",  # main file processed before: no download
+        "fetch_document:p4",  # Anlage shared with p5
+        "fetch_document:p5",  # queued behind p4's download (file cache hit by then)
+    ]
+    assert jobs["fetch_document:p4"]["priority"] == 1 and jobs["fetch_document:p5"]["priority"] == 2
+    assert "file_url" not in jobs["redact_document:p2"]["payload"]
+    cached = jobs[f"redact_document:{PAPER['id']}"]["payload"]
+    assert cached["content_hash"] == "h1" and cached["cached_file"] == {"summary": "Bebauungsplan [PER]"}
+    assert jobs["fetch_document:p4"]["payload"]["file_cache_key"] == "sha1:feed01"
+
+
+def test_redact_fills_and_reuses_file_cache():
+    db = FakeDB()
+    store = FakeStore({"text/h1.txt": "Antrag von Max Mustermann".encode("utf-8")})
+    pipeline, queue = make_pipeline(db, store)
+    payload = {"paper": PAPER, "file_url": "https://files.example.de/1.pdf", "file_cache_key": "sha1:abc123",
+               "content_hash": "h1", "version": {"file_size": 1024}}
+
+    asyncio.run(pipeline.redact_document({**payload, "text_path": "text/h1.txt"}))
+
+    table, row = db.upserts[-1]
+    assert table == "document_file_cache"
+    assert row["cache_key"] == "sha1:abc123" and "[PER]" in row["summary"] and "Max" not in row["summary"]
+
+    asyncio.run(pipeline.redact_document({**payload, "cached_file": {"summary": row["summary"]}}))
+
+    doc = queue.pushed[-1]["payload"]["doc"]
+    assert doc["summary"] == row["summary"] and doc["risk_score"] == 90
+    assert len(db.upserts) == 1  # cache hits are not written back
+
+
+def test_oversized_download_falls_back_to_title_only(monkeypatch):
+    # The File had no size: the limit is enforced while streaming
+    monkeypatch.setattr(crawl_pipeline, "OPARL_MAX_FILE_BYTES", 4)
+    pipeline, queue = make_pipeline()
+
+    asyncio.run(pipeline.fetch_document({"paper": PAPER, "file_url": "https://files.example.de/1.pdf",
+                                         "file_cache_key": "sha1:abc123"}))
+
+    assert [j["type"] for j in queue.pushed] == ["redact_document"]
+    assert "file_url" not in queue.pushed[0]["payload"] and pipeline.store.files == {}
+
+
+class FakeSearch:
+    async def iter_site_documents(self, site_domain, keywords, days=7):
+        assert site_domain == "www.landshut.de"
+        yield PaperRecord(id="https://www.landshut.de/bplan-17.pdf", name="Bebauungsplan Nr. 17",
+                          file={"accessUrl": "https://www.landshut.de/bplan-17.pdf"}, source="brave",
+                          extra={"snippet": "Sondergebiet Photovoltaik am Hofberg"})
+        yield PaperRecord(id="https://www.landshut.de/kita.pdf", name="Kita-Gebühren",
+                          file={"accessUrl": "https://www.landshut.de/kita.pdf"}, source="brave")
+
+
+def test_search_results_use_the_same_pipeline(monkeypatch):
+    connector = SiteSearchConnector(FakeSearch(), "www.landshut.de", "brave")
+    monkeypatch.setattr(crawl_pipeline.SourceSelector, "select_client", staticmethod(lambda p, f: connector))
+    pipeline, queue = make_pipeline()
+
+    asyncio.run(pipeline.list_papers({**PROFILE, "url": "https://www.landshut.de"}))
+
+    assert [(j["type"], j["domain"]) for j in queue.pushed] == [("fetch_document", "www.landshut.de")]
+
+
+def test_first_papers_are_queued_while_listing(monkeypatch):
+    monkeypatch.setattr(crawl_pipeline, "LIST_BATCH_SIZE", 1)
+    pipeline, queue = make_pipeline()
+    queued_during_listing = []
+
+    class SlowSource(PaperConnector):
+        async def iter_papers(self, days=7, keywords=None):
+            for i in range(3):
+                queued_during_listing.append(len(queue.pushed))
+                yield PaperRecord(id=f"p{i}", name=f"Solarpark {i}", file={"accessUrl": f"https://f.example.de/{i}.pdf"})
+                await asyncio.sleep(0)
+
+    monkeypatch.setattr(crawl_pipeline.SourceSelector, "select_client", staticmethod(lambda p, f: SlowSource()))
+
+    asyncio.run(pipeline.list_papers(PROFILE))
+
+    assert len(queue.pushed) == 3
+    assert queued_during_listing[-1] >= 1  # the first fetch job existed before the last page
+
+
+def test_buffered_applies_backpressure_and_reraises():
+    produced = []
+
+    async def source():
+        for i in range(10):
+            produced.append(i)
+            yield i
+        raise RuntimeError("page 2 failed")
+
+    async def consume():
+        seen = []
+        stream = crawl_pipeline.buffered(source(), maxsize=2)
+        seen.append(await stream.__anext__())
+        await asyncio.sleep(0.01)
+        # At most the buffer (+ the item waiting to be put) is read ahead
+        assert len(produced) <= 4
+        with pytest.raises(RuntimeError):
+            async for item in stream:
+                seen.append(item)
+        return seen
+
+    assert asyncio.run(consume()) == list(range(10))
+
+
+def test_extraction_and_redaction_run_off_the_event_loop(monkeypatch):
+    import threading
+    loop_thread = threading.current_thread()
+    threads = []
+
+    def extract(data):
+        threads.append(threading.current_thread())
+        return "Solarpark Text"
+
+    monkeypatch.setattr(crawl_pipeline.text_extraction, "extract_text", extract)
+    store = FakeStore({"pdf/h1.pdf": PDF_BYTES})
+    pipeline, queue = make_pipeline(store=store)
+    clean_text = pipeline.privacy_engine.clean_text
+    pipeline.privacy_engine.clean_text = lambda text: threads.append(threading.current_thread()) or clean_text(text)
+
+    asyncio.run(pipeline.extract_text({"paper": PAPER, "content_hash": "h1", "pdf_path": "pdf/h1.pdf"}))
+    asyncio.run(pipeline.redact_document(queue.pushed[-1]["payload"]))
+
+    assert len(threads) == 3 and loop_thread not in threads  # heartbeats are not blocked
+
+
+def test_papers_with_the_same_content_keep_their_own_artifacts(monkeypatch):
+    monkeypatch.setattr(crawl_pipeline.text_extraction, "extract_text", lambda data: "Solarpark Text")
+    store = FakeStore()
+    pipeline, queue = make_pipeline(store=store)
+    paper_b = {**PAPER, "id": "https://ris.example.de/paper/2"}
+
+    def step(job):
+        asyncio.run(pipeline.run(job["type"], job["payload"]))
+        return queue.pushed[-1]
+
+    # Same bytes, neither paper indexed yet: both fetches store the PDF
+    extract_a = step({"type": "fetch_document", "payload": {"paper": PAPER, "file_url": "https://files.example.de/a.pdf"}})
+    extract_b = step({"type": "fetch_document", "payload": {"paper": paper_b, "file_url": "https://files.example.de/b.pdf"}})
+    assert extract_a["payload"]["content_hash"] == extract_b["payload"]["content_hash"]
+    assert extract_a["payload"]["pdf_path"] != extract_b["payload"]["pdf_path"]
+
+    # A's steps clean up only A's artifacts
+    redact_a = step(extract_a)
+    redact_b = step(extract_b)
+    assert step(redact_a)["type"] == "index_document"
+    assert step(redact_b)["type"] == "index_document"
+    assert store.files == {}
+
+
+def test_duplicate_papers_remember_their_version():
+    version = {"source_modified": None, "file_sha1": "abc123", "file_size": 1024}
+    db = FakeDB(existing={"evidence_docs": [{"id": "e1"}]})
+    pipeline, queue = make_pipeline(db)
+
+    asyncio.run(pipeline.fetch_document({"paper": PAPER, "file_url": "https://files.example.de/1.pdf",
+                                         "region_id": "region-1", "version": version}))
+
+    assert queue.pushed == []
+    assert db.upserts == [("evidence_skipped_versions", {"external_id": PAPER["id"], "region_id": "region-1",
+                                                         "content_hash": db.upserts[0][1]["content_hash"],
+                                                         **version})]
+
+    # The next listing knows the paper without an evidence_docs row
+    db.existing = {"evidence_skipped_versions": [{"external_id": PAPER["id"], **version}]}
+    known = pipeline.load_known_versions("region-1")
+    assert crawl_pipeline.is_unchanged(version, known[PAPER["id"]])
+
+
+def test_known_versions_are_keyset_paged():
+    rows = [{"external_id": f"p{i:04d}", "file_sha1": str(i)} for i in range(1500)]
+
+    class PagedQuery(FakeQuery):
+        after = None
+
+        def gt(self, column, value):
+            self.after = value
+            return super().gt(column, value)
+
+        def execute(self):
+            data = [r for r in self.db.existing.get(self.table, []) if self.after is None or r["external_id"] > self.after]
+            return SimpleNamespace(data=data[:1000])
+
+    db = FakeDB(existing={"evidence_docs": rows})
+    db.table = lambda name: PagedQuery(db, name)
+    pipeline, _ = make_pipeline(db)
+
+    known = pipeline.load_known_versions("region-1")
+
+    assert len(known) == 1500
+    assert db.filters == [("evidence_docs", "external_id", "p0999")]  # second page starts after the first
@@ -0,0 +1,46 @@
+"""Tests for ResilientFetcher's robots.txt Crawl-delay handling (no network)."""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fetcher as fetcher_module
+from fetcher import ResilientFetcher
+
+
+class DelayParser:
+    def crawl_delay(self, agent):
+        return 2
+
+    def can_fetch(self, agent, url):
+        return True
+
+
+def test_concurrent_requests_get_separate_crawl_delay_slots(monkeypatch):
+    clock = {"now": 1000.0}
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    async def fake_request(method, url, **kwargs):
+        return SimpleNamespace(status_code=200)
+
+    monkeypatch.setattr(fetcher_module.time, "time", lambda: clock["now"])
+    monkeypatch.setattr(fetcher_module.asyncio, "sleep", fake_sleep)
+
+    fetcher = ResilientFetcher()
+    fetcher.robots_parsers["ris.example.de"] = DelayParser()
+    fetcher.robots_checked["ris.example.de"] = clock["now"]
+    fetcher.client.request = fake_request
+
+    async def run():
+        await asyncio.gather(*(fetcher.get(f"https://ris.example.de/vo{i}") for i in range(4)))
+
+    asyncio.run(run())
+
+    # The first request goes immediately, the others are spaced by the delay
+    assert sorted(sleeps) == [2.0, 4.0, 6.0]
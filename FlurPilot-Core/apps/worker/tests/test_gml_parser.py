@@ -0,0 +1,107 @@
+"""Tests for the streaming WFS GML parser."""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gml_parser import GMLFeatureParser, axis_is_lat_lon, parse_gml_features
+from bavarian_bypass import WFSClient
+
+HEADER = b"""<?xml version="1.0" encoding="UTF-8"?>
+<wfs:FeatureCollection xmlns:wfs="http://www.opengis.net/wfs/2.0"
+    xmlns:gml="http://www.opengis.net/gml/3.2" xmlns:fb="urn:feldbloecke">
+"""
+FOOTER = b"</wfs:FeatureCollection>"
+
+FIELD_WITH_HOLE = b"""<wfs:member><fb:Feldblock gml:id="Feldblock.1">
+<fb:FLIK>DEBYLI0000000001</fb:FLIK>
+<fb:geom><gml:Polygon srsName="urn:ogc:def:crs:EPSG::4326">
+<gml:exterior><gml:LinearRing><gml:posList>48.0 11.0 48.0 11.1 48.1 11.1 48.1 11.0 48.0 11.0</gml:posList></gml:LinearRing></gml:exterior>
+<gml:interior><gml:LinearRing><gml:posList>48.01 11.01 48.01 11.02 48.02 11.02 48.01 11.01</gml:posList></gml:LinearRing></gml:interior>
+</gml:Polygon></fb:geom></fb:Feldblock></wfs:member>
+"""
+
+MULTI_SURFACE = b"""<wfs:member><fb:Haus gml:id="Haus.2">
+<fb:geom><gml:MultiSurface srsName="http://www.opengis.net/def/crs/EPSG/0/25832">
+<gml:surfaceMember><gml:Polygon><gml:exterior><gml:LinearRing>
+<gml:posList srsDimension="3">1 2 0 3 2 0 3 4 0 1 2 0</gml:posList></gml:LinearRing></gml:exterior></gml:Polygon></gml:surfaceMember>
+<gml:surfaceMember><gml:Polygon><gml:exterior><gml:LinearRing>
+<gml:posList>5 5 6 5 6 6 5 5</gml:posList></gml:LinearRing></gml:exterior></gml:Polygon></gml:surfaceMember>
+</gml:MultiSurface></fb:geom></fb:Haus></wfs:member>
+"""
+
+
+def test_axis_order_from_srs_name():
+    assert axis_is_lat_lon("urn:ogc:def:crs:EPSG::4326")
+    assert axis_is_lat_lon("http://www.opengis.net/def/crs/EPSG/0/4326")
+    assert not axis_is_lat_lon("EPSG:4326")
+    assert not axis_is_lat_lon("urn:ogc:def:crs:EPSG::25832")
+    assert axis_is_lat_lon(None, default=True)
+
+
+def test_holes_properties_and_multisurface():
+    features = parse_gml_features(HEADER + FIELD_WITH_HOLE + MULTI_SURFACE + FOOTER)
+
+    field, house = features
+    assert field["id"] == "Feldblock.1"
+    assert field["properties"]["FLIK"] == "DEBYLI0000000001"
+    assert field["geometry"]["type"] == "Polygon"
+    exterior, hole = field["geometry"]["coordinates"]
+    assert exterior[1] == [11.1, 48.0]  # swapped to lon/lat
+    assert hole[0] == [11.01, 48.01]
+
+    assert house["geometry"]["type"] == "MultiPolygon"
+    assert house["geometry"]["coordinates"][0][0] == [[1, 2], [3, 2], [3, 4], [1, 2]]  # 3D, no swap
+
+
+def test_incremental_feed_yields_features_early():
+    parser = GMLFeatureParser()
+    body = HEADER + FIELD_WITH_HOLE * 50 + FOOTER
+
+    yielded_before_end = 0
+    for i in range(0, len(body) - len(FOOTER), 97):
+        yielded_before_end += len(list(parser.feed(body[i:i + 97])))
+    rest = list(parser.feed(body[i + 97:])) + list(parser.close())
+
+    assert yielded_before_end + len(rest) == 50
+    assert yielded_before_end >= 49
+    # Consumed features are dropped from the tree
+    assert parser.root_name == "FeatureCollection"
+
+
+class FakeStreamResponse:
+    status_code = 200
+    headers = {"content-type": "application/gml+xml; version=3.2"}
+
+    def __init__(self, body):
+        self.body = body
+
+    async def aiter_bytes(self):
+        for i in range(0, len(self.body), 64):
+            yield self.body[i:i + 64]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeFetcher:
+    def __init__(self, body):
+        self.body = body
+
+    async def stream(self, method, url, **kwargs):
+        return FakeStreamResponse(self.body)
+
+
+def test_wfs_client_streams_gml():
+    client = WFSClient(FakeFetcher(HEADER + FIELD_WITH_HOLE + MULTI_SURFACE + FOOTER), tile_cache=False)
+    features = asyncio.run(client.fetch_buildings([11.0, 48.0, 11.1, 48.1]))
+    assert [f["id"] for f in features] == ["Feldblock.1", "Haus.2"]
+
+    exception = b'<ows:ExceptionReport xmlns:ows="http://www.opengis.net/ows/1.1"/>'
+    client = WFSClient(FakeFetcher(exception), tile_cache=False)
+    assert asyncio.run(client._get_features("http://wfs", "GebaeudeBauwerk", [0, 0, 1, 1])) is None
@@ -0,0 +1,230 @@
+"""Tests for job leases: heartbeats while a job runs, lease loss and the reaper."""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_queue import JobQueue, LeaseLost, PRIORITY_BULK, PRIORITY_NORMAL
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeRPC:
+    def __init__(self, client, name, params):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        self.client.calls.append((self.name, self.params))
+        return FakeResponse(self.client.responses.get(self.name))
+
+
+class FakeClient:
+    def __init__(self, **responses):
+        self.responses = responses
+        self.calls = []
+
+    def rpc(self, name, params):
+        return FakeRPC(self, name, params)
+
+    def called(self, name):
+        return [params for call, params in self.calls if call == name]
+
+
+def test_fetch_next_requests_a_lease():
+    client = FakeClient(fetch_next_job=[{
+        "j_id": "job-1", "j_type": "crawl_profile", "j_payload": {"id": 1},
+        "j_lease_expires_at": "2026-02-12T10:02:00+00:00"
+    }])
+    queue = JobQueue(client, "worker-a", lease_seconds=90, capabilities=["ner", "ocr"], max_memory_mb=4096)
+
+    job = queue.fetch_next()
+
+    assert job["id"] == "job-1"
+    assert job["lease_expires_at"] == "2026-02-12T10:02:00+00:00"
+    assert client.called("fetch_next_job") == [{
+        "p_worker_id": "worker-a", "p_lease_seconds": 90,
+        "p_capabilities": ["ner", "ocr"], "p_max_memory_mb": 4096
+    }]
+
+
+def test_heartbeats_while_job_runs():
+    client = FakeClient(heartbeat_job=True)
+    queue = JobQueue(client, "worker-a", lease_seconds=1, heartbeat_seconds=0.01)
+
+    async def work():
+        await asyncio.sleep(0.1)
+        return "done"
+
+    assert asyncio.run(queue.run_with_heartbeat("job-1", work())) == "done"
+    beats = client.called("heartbeat_job")
+    assert len(beats) >= 2
+    assert beats[0] == {"p_job_id": "job-1", "p_worker_id": "worker-a", "p_lease_seconds": 1}
+
+
+def test_lost_lease_cancels_the_job():
+    client = FakeClient(heartbeat_job=False)
+    queue = JobQueue(client, "worker-a", heartbeat_seconds=0.01)
+    state = {"cancelled": False}
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    with pytest.raises(LeaseLost):
+        asyncio.run(queue.run_with_heartbeat("job-1", work()))
+    assert state["cancelled"]
+
+
+def test_failed_heartbeat_keeps_the_job_running():
+    # Network error on the heartbeat: lease state unknown, don't abort the work
+    client = FakeClient()
+    client.rpc = lambda name, params: (_ for _ in ()).throw(ConnectionError("offline"))
+    queue = JobQueue(client, "worker-a", heartbeat_seconds=0.01)
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return 42
+
+    assert asyncio.run(queue.run_with_heartbeat("job-1", work())) == 42
+
+
+def test_job_errors_propagate():
+    queue = JobQueue(FakeClient(heartbeat_job=True), "worker-a", heartbeat_seconds=0.01)
+
+    async def work():
+        raise ValueError("broken payload")
+
+    with pytest.raises(ValueError):
+        asyncio.run(queue.run_with_heartbeat("job-1", work()))
+
+
+def test_reap_expired_returns_reaped_jobs():
+    client = FakeClient(reap_expired_jobs=[
+        {"j_id": "job-1", "j_status": "pending", "j_worker_id": "worker-b"},
+        {"j_id": "job-2", "j_status": "dead", "j_worker_id": None},
+    ])
+    queue = JobQueue(client, "worker-a")
+
+    reaped = queue.reap_expired(limit=10)
+
+    assert [job["j_id"] for job in reaped] == ["job-1", "job-2"]
+    assert client.called("reap_expired_jobs") == [{"p_limit": 10}]
+
+
+def test_fail_is_one_atomic_call_with_backoff_settings():
+    client = FakeClient(fail_job=[{"j_status": "pending", "j_retries": 1, "j_run_after": "2026-02-13T10:00:41+00:00"}])
+    queue = JobQueue(client, "worker-a", retry_base_seconds=20, retry_max_seconds=600)
+
+    result = queue.fail("job-1", "TimeoutError: ris.example.de")
+
+    assert result == {"status": "pending", "retries": 1, "run_after": "2026-02-13T10:00:41+00:00"}
+    assert client.calls == [("fail_job", {
+        "p_job_id": "job-1", "p_worker_id": "worker-a", "p_error": "TimeoutError: ris.example.de",
+        "p_base_delay_seconds": 20, "p_max_delay_seconds": 600
+    })]
+
+
+def test_fail_of_reaped_job_is_a_noop():
+    queue = JobQueue(FakeClient(fail_job=[]), "worker-a")
+    assert queue.fail("job-1", "boom") is None
+
+
+class FakeTable:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def insert(self, data):
+        self.client.inserts.append((self.name, data))
+        return self
+
+    def execute(self):
+        return FakeResponse([{"id": "job-1"}])
+
+
+def test_push_sets_priority_and_tenant():
+    client = FakeClient()
+    client.inserts = []
+    client.table = lambda name: FakeTable(client, name)
+    queue = JobQueue(client, "worker-a")
+
+    assert queue.push("precompute_region", {"ags": "09274"}, priority=PRIORITY_BULK, tenant="land:09")
+    assert queue.push("crawl_profile", {"id": 1}, domain="ris.example.de")
+
+    (_, bulk), (_, crawl) = client.inserts
+    assert (bulk["priority"], bulk["tenant"]) == (PRIORITY_BULK, "land:09")
+    assert (crawl["priority"], crawl["tenant"], crawl["domain"]) == (PRIORITY_NORMAL, None, "ris.example.de")
+
+
+def test_duplicate_dedup_key_counts_as_queued():
+    client = FakeClient()
+
+    class DuplicateTable:
+        def insert(self, data):
+            return self
+
+        def execute(self):
+            raise Exception("{'code': '23505', 'message': 'duplicate key value violates unique constraint'}")
+
+    client.table = lambda name: DuplicateTable()
+    queue = JobQueue(client, "worker-a")
+
+    assert queue.push("fetch_document", {"paper": {"id": "p1"}}, dedup_key="fetch_document:p1")
+    assert not queue.push("fetch_document", {"paper": {"id": "p1"}})
+
+
+def test_archive_drains_in_batches():
+    class ArchiveClient(FakeClient):
+        def __init__(self, batches):
+            super().__init__()
+            self.batches = iter(batches)
+
+        def rpc(self, name, params):
+            self.responses[name] = next(self.batches)
+            return FakeRPC(self, name, params)
+
+    client = ArchiveClient([100, 100, 42])
+    queue = JobQueue(client, "worker-a")
+
+    assert queue.archive_finished(older_than_days=3, batch=100) == 242
+    assert client.called("archive_crawler_jobs") == [{"p_older_than_days": 3, "p_batch": 100}] * 3
+
+
+def test_complete_reports_lost_ownership():
+    class UpdateTable:
+        def __init__(self, rows):
+            self.rows = rows
+            self.filters = []
+
+        def update(self, data):
+            return self
+
+        def eq(self, column, value):
+            self.filters.append((column, value))
+            return self
+
+        def execute(self):
+            return FakeResponse(self.rows)
+
+    owned, reaped = UpdateTable([{"id": "job-1"}]), UpdateTable([])
+    client = FakeClient()
+    queue = JobQueue(client, "worker-a")
+
+    client.table = lambda name: owned
+    assert queue.complete("job-1") is True
+    assert owned.filters == [("id", "job-1"), ("worker_id", "worker-a")]
+
+    client.table = lambda name: reaped
+    assert queue.complete("job-1") is False
@@ -0,0 +1,90 @@
+"""Tests for the OParl connector's paginated paper listing (no network)."""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connectors.oparl import OParlClient, OParlError
+
+NOW = datetime.now(timezone.utc)
+RECENT = (NOW - timedelta(days=1)).isoformat()
+OLD = (NOW - timedelta(days=60)).isoformat()
+
+
+class FakeResponse:
+    def __init__(self, data=None, status_code=200):
+        self.data = data
+        self.status_code = status_code
+
+    def json(self):
+        return self.data
+
+
+class FakeFetcher:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    async def get(self, url, params=None, **kwargs):
+        self.calls.append((url, params))
+        if url not in self.pages:
+            return FakeResponse(status_code=503)
+        return FakeResponse(self.pages[url])
+
+
+PAGES = {
+    "https://ris.example.de/oparl": {"name": "RIS", "body": ["https://ris.example.de/oparl/body/1"]},
+    "https://ris.example.de/oparl/body/1": {"name": "Stadt", "paper": "https://ris.example.de/oparl/papers"},
+    "https://ris.example.de/oparl/papers": {
+        "data": [
+            {"id": "p1", "name": "Solarpark", "modified": RECENT,
+             "auxiliaryFile": [{"accessUrl": "https://ris.example.de/f/1.docx", "mimeType": "application/msword"},
+                               {"accessUrl": "https://ris.example.de/f/1.pdf", "mimeType": "application/pdf"}]},
+            # Server ignored modified_since: filtered client-side
+            {"id": "p0", "name": "Alt", "modified": OLD},
+        ],
+        "links": {"next": "https://ris.example.de/oparl/papers?page=2"},
+    },
+    "https://ris.example.de/oparl/papers?page=2": {
+        "data": [{"id": "p2", "name": "Photovoltaik", "modified": RECENT,
+                  "mainFile": {"accessUrl": "https://ris.example.de/f/2.pdf"}}],
+        "links": {},
+    },
+}
+
+
+def test_iter_papers_follows_pages_and_filters():
+    fetcher = FakeFetcher(PAGES)
+    client = OParlClient("https://ris.example.de/oparl", fetcher)
+
+    async def collect():
+        assert await client.check_connectivity()
+        return [record async for record in client.iter_papers(days=7)]
+
+    records = asyncio.run(collect())
+
+    assert [r.id for r in records] == ["p1", "p2"]
+    assert records[0].file["accessUrl"] == "https://ris.example.de/f/1.pdf"  # first PDF, not the first file
+    assert records[1].file["accessUrl"] == "https://ris.example.de/f/2.pdf"  # mainFile
+    assert "modified_since" in fetcher.calls[2][1]
+    assert fetcher.calls[3] == ("https://ris.example.de/oparl/papers?page=2", None)
+    assert [url for url, _ in fetcher.calls].count("https://ris.example.de/oparl") == 1  # handshake reused
+
+
+def test_failed_page_raises_instead_of_ending_the_listing():
+    pages = {url: data for url, data in PAGES.items() if not url.endswith("page=2")}
+    client = OParlClient("https://ris.example.de/oparl", FakeFetcher(pages))
+    records = []
+
+    async def collect():
+        async for record in client.iter_papers(days=7):
+            records.append(record)
+
+    with pytest.raises(OParlError):
+        asyncio.run(collect())
+    assert [r.id for r in records] == ["p1"]  # the first page was still yielded
@@ -0,0 +1,95 @@
+"""Tests for virtual parcel input fingerprints (skip recomputation of unchanged inputs)."""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bavarian_bypass
+from bavarian_bypass import BavarianBypass, input_fingerprint
+
+FIELD = {"type": "Polygon", "coordinates": [[[11.0, 48.0], [11.01, 48.0], [11.01, 48.01], [11.0, 48.01], [11.0, 48.0]]]}
+HOUSE = {"type": "Polygon", "coordinates": [[[11.001, 48.001], [11.002, 48.001], [11.002, 48.002], [11.001, 48.001]]]}
+BARN = {"type": "Polygon", "coordinates": [[[11.005, 48.005], [11.006, 48.005], [11.006, 48.006], [11.005, 48.005]]]}
+
+
+def test_fingerprint_ignores_serialization_differences():
+    # Same field starting at another vertex, clockwise, with sub-centimetre noise
+    field_cw = {"type": "Polygon", "coordinates": [[
+        [11.01, 48.01], [11.01, 48.0], [11.0, 48.0], [11.0, 48.0100000001], [11.01, 48.01]
+    ]]}
+    assert input_fingerprint(FIELD, [HOUSE, BARN]) == input_fingerprint(field_cw, [BARN, HOUSE, HOUSE])
+
+
+def test_fingerprint_changes_with_inputs():
+    base = input_fingerprint(FIELD, [HOUSE])
+    assert base != input_fingerprint(FIELD, [HOUSE, BARN])
+    assert base != input_fingerprint(FIELD, [])
+    moved = {"type": "Polygon", "coordinates": [[[x + 0.0001, y] for x, y in HOUSE["coordinates"][0]]]}
+    assert base != input_fingerprint(FIELD, [moved])
+
+
+class FakeWFS:
+    async def fetch_field_block(self, lat, lon):
+        return {"type": "Feature", "properties": {"FLIK": "DEBYLI001"}, "geometry": FIELD}
+
+    async def fetch_buildings(self, bbox):
+        # A building outside the field but inside its bbox query must not matter
+        outside = {"type": "Polygon", "coordinates": [[[11.02, 48.0], [11.03, 48.0], [11.03, 48.01], [11.02, 48.0]]]}
+        return [{"geometry": HOUSE}, {"geometry": outside}]
+
+
+class FakeQuery:
+    def __init__(self, db):
+        self.db = db
+        self.op = None
+
+    def select(self, columns):
+        self.op = "select"
+        return self
+
+    def in_(self, column, values):
+        return self
+
+    def upsert(self, payload, on_conflict=None):
+        self.op = "upsert"
+        self.db.upserts.append(payload)
+        self.db.row = {"id": "vp-1", "source_field_id": payload["source_field_id"],
+                       "input_fingerprint": payload["input_fingerprint"]}
+        return self
+
+    def execute(self):
+        rows = [self.db.row] if self.db.row else []
+        return type("Resp", (), {"data": rows})()
+
+
+class FakeDB:
+    def __init__(self):
+        self.row = None
+        self.upserts = []
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+def test_unchanged_parcel_is_not_recomputed(monkeypatch):
+    monkeypatch.setattr(bavarian_bypass, "RUST_ENGINE_AVAILABLE", False)
+    db = FakeDB()
+    bypass = BavarianBypass(db, fetcher=object())
+    bypass.wfs = FakeWFS()
+    calls = []
+
+    async def fake_rpc(field_geojson, building_geojsons):
+        calls.append(building_geojsons)
+        return {"net_geom": field_geojson, "net_area": 1.0}
+
+    bypass._calculate_with_rpc = fake_rpc
+
+    assert asyncio.run(bypass.compute_virtual_parcel(48.005, 11.005)) == "vp-1"
+    assert asyncio.run(bypass.compute_virtual_parcel(48.005, 11.005)) == "vp-1"
+    assert len(calls) == 1 and calls[0] == [HOUSE]
+    assert len(db.upserts) == 1
+
+    asyncio.run(bypass.compute_virtual_parcel(48.005, 11.005, force=True))
+    assert len(calls) == 2
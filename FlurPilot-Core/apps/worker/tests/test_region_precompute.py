@@ -0,0 +1,133 @@
+"""Tests for the bulk region precompute job (grid cells, spatial join, bulk upsert)."""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import region_precompute
+from region_precompute import RegionPrecompute, grid_cells, join_buildings
+
+
+def square(fid, lon, lat, size, flik=None):
+    return {
+        "type": "Feature",
+        "id": fid,
+        "properties": {"FLIK": flik} if flik else {},
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [[[lon, lat], [lon + size, lat], [lon + size, lat + size], [lon, lat + size], [lon, lat]]]
+        }
+    }
+
+
+def intersects(feature, bbox):
+    xs = [p[0] for p in feature["geometry"]["coordinates"][0]]
+    ys = [p[1] for p in feature["geometry"]["coordinates"][0]]
+    return min(xs) <= bbox[2] and max(xs) >= bbox[0] and min(ys) <= bbox[3] and max(ys) >= bbox[1]
+
+
+class FakeWFS:
+    def __init__(self, layers):
+        self.layers = layers
+        self.calls = []
+
+    async def fetch_layer(self, layer, bbox):
+        self.calls.append((layer, tuple(bbox)))
+        return [f for f in self.layers[layer] if intersects(f, bbox)]
+
+
+class FakeQuery:
+    def __init__(self, db, rows):
+        self.db = db
+        self.rows = rows
+
+    def upsert(self, rows, on_conflict=None):
+        self.db.upserts.append((rows, on_conflict))
+        return self
+
+    def execute(self):
+        return self
+
+
+class FakeDB:
+    def __init__(self):
+        self.upserts = []
+
+    def table(self, name):
+        assert name == "virtual_parcels"
+        return FakeQuery(self, None)
+
+
+class FakeBypass:
+    def __init__(self, wfs):
+        self.db = FakeDB()
+        self.wfs = wfs
+        self.calculated = []
+        self.stored = {}
+
+    def fetch_fingerprints(self, field_ids):
+        return {fid: self.stored[fid] for fid in field_ids if fid in self.stored}
+
+    async def _calculate_with_rpc(self, field_geojson, building_geojsons):
+        self.calculated.append((field_geojson, building_geojsons))
+        return {"net_geom": field_geojson, "net_area": 100.0 - len(building_geojsons)}
+
+
+def test_grid_cells_cover_bbox():
+    cells = grid_cells((11.0, 48.0, 11.12, 48.05), 0.05)
+    assert len(cells) == 3
+    assert cells[0][:2] == (11.0, 48.0)
+    assert abs(cells[-1][2] - 11.12) < 1e-12 and abs(cells[-1][3] - 48.05) < 1e-12
+
+
+def test_join_buildings_per_field():
+    fields = [square("F1", 11.0, 48.0, 0.01), square("F2", 11.02, 48.0, 0.01)]
+    buildings = [square("B1", 11.001, 48.001, 0.001), square("B2", 11.021, 48.001, 0.001),
+                 square("B3", 11.022, 48.002, 0.001), square("B4", 11.5, 48.5, 0.001)]
+
+    joined = join_buildings(fields, buildings)
+
+    assert [len(b) for b in joined] == [1, 2]
+
+
+def test_region_run_computes_each_field_once(monkeypatch):
+    monkeypatch.setattr(region_precompute, "RUST_ENGINE_AVAILABLE", False)
+    # F2 straddles the cell border at lon 11.05 and is returned by both cells' WFS queries
+    fields = [square("F1", 11.01, 48.01, 0.01, "DEBYLI001"),
+              square("F2", 11.045, 48.01, 0.01, "DEBYLI002"),
+              square("F3", 11.07, 48.02, 0.01, "DEBYLI003")]
+    buildings = [square("B1", 11.011, 48.011, 0.001), square("B2", 11.071, 48.021, 0.001)]
+    wfs = FakeWFS({"fields": fields, "buildings": buildings})
+    bypass = FakeBypass(wfs)
+    job = RegionPrecompute(bypass, chunk_size_deg=0.05, upsert_batch=2)
+
+    stats = asyncio.run(job.run({"bbox": [11.0, 48.0, 11.1, 48.05]}))
+
+    assert stats.cells == 2
+    assert stats.field_blocks == 3 and stats.upserted == 3
+    assert len(bypass.calculated) == 3
+    upserted = [row["source_field_id"] for rows, _ in bypass.db.upserts for row in rows]
+    assert sorted(upserted) == ["DEBYLI001", "DEBYLI002", "DEBYLI003"]
+    assert all(conflict == "source_field_id" for _, conflict in bypass.db.upserts)
+    areas = {row["source_field_id"]: row["net_area_m2"] for rows, _ in bypass.db.upserts for row in rows}
+    assert areas["DEBYLI001"] == 99.0 and areas["DEBYLI002"] == 100.0
+
+
+def test_region_run_skips_unchanged_fields(monkeypatch):
+    monkeypatch.setattr(region_precompute, "RUST_ENGINE_AVAILABLE", False)
+    fields = [square("F1", 11.01, 48.01, 0.01, "DEBYLI001"), square("F3", 11.07, 48.02, 0.01, "DEBYLI003")]
+    wfs = FakeWFS({"fields": fields, "buildings": [square("B1", 11.011, 48.011, 0.001)]})
+    bypass = FakeBypass(wfs)
+    job = RegionPrecompute(bypass, chunk_size_deg=0.05)
+    asyncio.run(job.run({"bbox": [11.0, 48.0, 11.1, 48.05]}))
+    bypass.stored = {row["source_field_id"]: row for rows, _ in bypass.db.upserts for row in rows}
+
+    # A building appears in F3, F1 is unchanged
+    wfs.layers["buildings"].append(square("B2", 11.071, 48.021, 0.001))
+    bypass.db.upserts, bypass.calculated = [], []
+    stats = asyncio.run(job.run({"bbox": [11.0, 48.0, 11.1, 48.05]}))
+
+    assert stats.unchanged == 1 and stats.upserted == 1
+    assert [row["source_field_id"] for rows, _ in bypass.db.upserts for row in rows] == ["DEBYLI003"]
@@ -0,0 +1,122 @@
+"""Tests for the SessionNet scraper against HTML fixtures (no network)."""
+
+import asyncio
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connectors.sessionnet import SessionNetClient, parse_german_date
+
+BASE = "https://ris.example.de/bi"
+RECENT = (date.today() - timedelta(days=2)).strftime("%d.%m.%Y")
+OLD = (date.today() - timedelta(days=90)).strftime("%d.%m.%Y")
+
+RESULT_PAGE_1 = f"""
+<html><body>
+<div class="smc-header">Suche</div>
+<table class="smc_table">
+  <tr><th>Betreff</th><th>Art</th><th>Datum</th></tr>
+  <tr><td><a href="vo0050.php?__kvonr=101">Bebauungsplan Solarpark Nord</a></td><td>Vorlage</td><td></td></tr>
+  <tr><td><a href="vo0050.php?__kvonr=102">Photovoltaik Freiflächenanlage Süd</a></td><td>Vorlage</td><td>{OLD}</td></tr>
+</table>
+<a href="si0090.php?__cwpnr=2" title="Nächste Seite">»</a>
+</body></html>
+"""
+
+RESULT_PAGE_2 = """
+<html><body>
+<table class="smc_table">
+  <tr><td><a href="vo0050.php?__kvonr=103">Solarpark Ost</a></td><td>Vorlage</td><td></td></tr>
+  <tr><td><a href="vo0050.php?__kvonr=101">Bebauungsplan Solarpark Nord</a></td><td>Vorlage</td><td></td></tr>
+</table>
+</body></html>
+"""
+
+DETAIL_101 = f"""
+<html><body>
+<table class="risdeco">
+  <tr><th>Betreff:</th><td>Bebauungsplan Solarpark Nord</td></tr>
+  <tr><th>Datum:</th><td>{RECENT}</td></tr>
+</table>
+<a href="getfile.php?id=9001&amp;type=do">Vorlage (PDF, 120 KB)</a>
+<a href="getfile.php?id=9002&amp;type=do">Lageplan.tif</a>
+</body></html>
+"""
+
+DETAIL_103 = f"""
+<html><body>
+<dl><dt>Vorlagendatum</dt><dd>{OLD}</dd></dl>
+</body></html>
+"""
+
+
+class FakeResponse:
+    def __init__(self, url, text, status_code=200):
+        self.url = url
+        self.text = text
+        self.status_code = status_code
+
+
+class FakeFetcher:
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    async def get(self, url, **kwargs):
+        self.requests.append(("GET", url))
+        return FakeResponse(url, self.pages[url])
+
+    async def post(self, url, data=None, **kwargs):
+        self.requests.append(("POST", url))
+        return FakeResponse(url, self.pages[url])
+
+
+PAGES = {
+    f"{BASE}/si0090.php": RESULT_PAGE_1,
+    f"{BASE}/si0090.php?__cwpnr=2": RESULT_PAGE_2,
+    f"{BASE}/vo0050.php?__kvonr=101": DETAIL_101,
+    f"{BASE}/vo0050.php?__kvonr=103": DETAIL_103,
+}
+
+
+def collect(client, **kwargs):
+    async def run():
+        return [record async for record in client.iter_papers(**kwargs)]
+    return asyncio.run(run())
+
+
+def test_iter_papers_pages_and_reads_detail_pages():
+    fetcher = FakeFetcher(PAGES)
+    client = SessionNetClient(BASE, fetcher)
+
+    records = collect(client, days=30, keywords=["Solar"])
+
+    # 102 is dated too old in the result table: its detail page is never fetched,
+    # 103 only on its detail page; 101 is listed twice but fetched once
+    assert [r.id for r in records] == [f"{BASE}/vo0050.php?__kvonr=101"]
+    record = records[0]
+    assert record.date == (date.today() - timedelta(days=2)).isoformat()
+    assert record.file == {"accessUrl": f"{BASE}/getfile.php?id=9001&type=do",
+                           "fileName": "Vorlage (PDF, 120 KB)", "mimeType": "application/pdf"}
+    assert len(record.extra["files"]) == 2
+    assert fetcher.requests.count(("GET", f"{BASE}/vo0050.php?__kvonr=101")) == 1
+    assert ("GET", f"{BASE}/vo0050.php?__kvonr=102") not in fetcher.requests
+    assert fetcher.requests[0] == ("POST", f"{BASE}/si0090.php")
+
+
+def test_search_documents_reads_all_result_pages():
+    client = SessionNetClient(BASE, FakeFetcher(PAGES))
+
+    rows = asyncio.run(client.search_documents(["Solar"]))
+
+    assert [r["name"] for r in rows][:3] == ["Bebauungsplan Solarpark Nord", "Photovoltaik Freiflächenanlage Süd",
+                                            "Solarpark Ost"]
+    assert rows[0]["date"] is None  # no more datetime.now() stamps
+
+
+def test_parse_german_date():
+    assert parse_german_date("Sitzung vom 3.2.2026, 18:00") == "2026-02-03"
+    assert parse_german_date("31.02.2026") is None
+    assert parse_german_date("") is None
@@ -0,0 +1,140 @@
+"""Tests for paged, bbox-split WFS harvesting."""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wfs_harvester import WFSHarvester, split_bbox
+
+
+def building(i, lon, lat, size=0.001):
+    return {
+        "type": "Feature",
+        "id": f"Haus.{i}",
+        "properties": {},
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [[[lon, lat], [lon + size, lat], [lon + size, lat + size], [lon, lat + size], [lon, lat]]]
+        }
+    }
+
+
+class FakeResponse:
+    headers = {"content-type": "application/json"}
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+
+    async def aread(self):
+        return json.dumps(self.body).encode()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeWFS:
+    """Bbox filter (any vertex inside) + count/startIndex paging, like a WFS 2.0 server."""
+
+    def __init__(self, features, fail=False):
+        self.features = features
+        self.fail = fail
+        self.requests = []
+
+    async def stream(self, method, url, params=None, **kwargs):
+        self.requests.append(params)
+        if self.fail:
+            return FakeResponse(503, {})
+        minlat, minlon, maxlat, maxlon = map(float, params["bbox"].split(","))
+        hits = [
+            f for f in self.features
+            if any(minlon <= x <= maxlon and minlat <= y <= maxlat for x, y in f["geometry"]["coordinates"][0])
+        ]
+        start, count = params["startIndex"], params["count"]
+        return FakeResponse(200, {"features": hits[start:start + count], "numberMatched": len(hits)})
+
+
+def test_split_bbox_covers_parent():
+    parts = split_bbox((0.0, 0.0, 2.0, 2.0))
+    assert len(parts) == 4
+    assert min(p[0] for p in parts) == 0.0 and max(p[3] for p in parts) == 2.0
+
+
+def test_paging_with_count_and_start_index():
+    wfs = FakeWFS([building(i, 11.0 + i * 0.002, 48.0) for i in range(25)])
+    harvester = WFSHarvester(wfs, page_size=10, split_threshold=1000)
+
+    features = asyncio.run(harvester.harvest("http://wfs", "GebaeudeBauwerk", (10.9, 47.9, 11.2, 48.1)))
+
+    assert len(features) == 25
+    assert sorted(r["startIndex"] for r in wfs.requests) == [0, 10, 20]
+
+
+def test_adaptive_split_deduplicates_edge_features():
+    # 8x8 grid; buildings straddle the quadrant edges at lon 11.008 / lat 48.008
+    features = [building(i, 11.0 + (i % 8) * 0.002, 48.0 + (i // 8) * 0.002, size=0.0025) for i in range(64)]
+    wfs = FakeWFS(features)
+    harvester = WFSHarvester(wfs, page_size=10, split_threshold=30, max_depth=3)
+
+    result = asyncio.run(harvester.harvest("http://wfs", "GebaeudeBauwerk", (11.0, 48.0, 11.016, 48.016)))
+
+    assert sorted(f["id"] for f in result) == sorted(f["id"] for f in features)
+    assert len(wfs.requests) > 7  # split into sub-tiles instead of paging the whole bbox
+
+
+def test_failed_page_fails_the_harvest():
+    harvester = WFSHarvester(FakeWFS([], fail=True), page_size=10)
+    assert asyncio.run(harvester.harvest("http://wfs", "GebaeudeBauwerk", (0, 0, 1, 1))) is None
+
+
+class SortingWFS(FakeWFS):
+    """Tracks concurrency; optionally rejects sortBy like servers without sorting support."""
+
+    def __init__(self, features, reject_sort=False):
+        super().__init__(features)
+        self.reject_sort = reject_sort
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def stream(self, method, url, params=None, **kwargs):
+        if self.reject_sort and "sortBy" in params:
+            self.requests.append(params)
+            return FakeResponse(400, {})
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        return await super().stream(method, url, params=params, **kwargs)
+
+
+def test_concurrent_pages_only_with_sort_key():
+    features = [building(i, 11.0 + i * 0.002, 48.0) for i in range(35)]
+    bbox = (10.9, 47.9, 11.2, 48.1)
+
+    unsorted = SortingWFS(features)
+    assert len(asyncio.run(WFSHarvester(unsorted, page_size=10, split_threshold=1000)
+                           .harvest("http://wfs", "GebaeudeBauwerk", bbox))) == 35
+    assert unsorted.max_in_flight == 1
+
+    sorted_wfs = SortingWFS(features)
+    harvester = WFSHarvester(sorted_wfs, page_size=10, split_threshold=1000, sort_by="gml:id")
+    assert len(asyncio.run(harvester.harvest("http://wfs", "GebaeudeBauwerk", bbox))) == 35
+    assert all(r["sortBy"] == "gml:id ASC" for r in sorted_wfs.requests)
+    assert sorted_wfs.max_in_flight > 1
+
+
+def test_rejected_sort_falls_back_to_sequential_paging():
+    wfs = SortingWFS([building(i, 11.0 + i * 0.002, 48.0) for i in range(25)], reject_sort=True)
+    harvester = WFSHarvester(wfs, page_size=10, split_threshold=1000, sort_by="gml:id")
+
+    features = asyncio.run(harvester.harvest("http://wfs", "GebaeudeBauwerk", (10.9, 47.9, 11.2, 48.1)))
+
+    assert len(features) == 25
+    assert [r["startIndex"] for r in wfs.requests if "sortBy" not in r] == [0, 10, 20]
+    assert wfs.max_in_flight == 1
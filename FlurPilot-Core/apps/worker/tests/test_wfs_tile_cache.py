@@ -0,0 +1,102 @@
+"""Tests for the WFS tile cache and its use in WFSClient."""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wfs_tile_cache import WFSTileCache, tile_bounds, tiles_for_bbox
+from bavarian_bypass import WFSClient
+
+
+def square(lon, lat, size=0.0002, fid=None):
+    feature = {
+        "type": "Feature",
+        "properties": {},
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [[[lon, lat], [lon + size, lat], [lon + size, lat + size], [lon, lat + size], [lon, lat]]]
+        }
+    }
+    if fid:
+        feature["id"] = fid
+    return feature
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {"content-type": "application/json"}
+
+    def __init__(self, features):
+        self._features = features
+
+    async def aread(self):
+        return json.dumps({"features": self._features}).encode()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeFetcher:
+    """Serves a fixed feature set filtered by the (lat,lon ordered) WFS bbox."""
+
+    def __init__(self, features):
+        self.features = features
+        self.requests = 0
+
+    async def stream(self, method, url, params=None, **kwargs):
+        self.requests += 1
+        minlat, minlon, maxlat, maxlon = map(float, params["bbox"].split(","))
+        hits = [
+            f for f in self.features
+            if any(minlon <= x <= maxlon and minlat <= y <= maxlat for x, y in f["geometry"]["coordinates"][0])
+        ]
+        return FakeResponse(hits)
+
+
+def test_tile_math_round_trips():
+    tiles = tiles_for_bbox((11.50, 48.10, 11.52, 48.11), 16)
+    assert len(tiles) > 1
+    minlon, minlat, maxlon, maxlat = tile_bounds(tiles[0])
+    assert minlon <= 11.50 < maxlon
+    assert minlat < 48.11 <= maxlat
+
+
+def test_ttl_expiry():
+    cache = WFSTileCache(":memory:", zoom=16, ttl_seconds=0)
+    tile = (16, 1, 1)
+    cache.put_many("buildings", {tile: []})
+    assert cache.get_many("buildings", [tile]) == {}
+
+    cache.ttl_seconds = 3600
+    assert cache.get_many("buildings", [tile]) == {tile: []}
+
+
+def test_neighbouring_queries_hit_the_cache():
+    buildings = [square(11.5001 + i * 0.001, 48.1001, fid=f"b{i}") for i in range(10)]
+    fetcher = FakeFetcher(buildings)
+    client = WFSClient(fetcher, tile_cache=WFSTileCache(":memory:", zoom=16))
+
+    first = asyncio.run(client.fetch_buildings([11.500, 48.100, 11.503, 48.101]))
+    assert fetcher.requests == 1
+    assert {f["id"] for f in first} == {"b0", "b1", "b2"}
+
+    # Overlapping bbox inside the already fetched tiles: no new request
+    second = asyncio.run(client.fetch_buildings([11.501, 48.100, 11.502, 48.101]))
+    assert fetcher.requests == 1
+    assert {f["id"] for f in second} == {"b1"}
+
+
+def test_field_block_from_cached_tile():
+    field = square(11.5001, 48.1001, size=0.002, fid="DEBYLI0000000001")
+    fetcher = FakeFetcher([field])
+    client = WFSClient(fetcher, tile_cache=WFSTileCache(":memory:", zoom=16))
+
+    assert asyncio.run(client.fetch_field_block(48.1005, 11.5005))["id"] == "DEBYLI0000000001"
+    assert asyncio.run(client.fetch_field_block(48.1010, 11.5010))["id"] == "DEBYLI0000000001"
+    assert fetcher.requests == 1
@@ -0,0 +1,114 @@
+import io
+import logging
+from typing import Optional
+from pypdf import PdfReader
+
+logger = logging.getLogger("TextExtraction")
+
+# OCR threshold: if extracted text averages fewer than this many chars per page,
+# attempt OCR fallback
+OCR_CHARS_PER_PAGE_THRESHOLD = 50
+
+# Lazy-load OCR capability
+_ocr_available: Optional[bool] = None
+
+
+def ocr_available() -> bool:
+    """Check if OCR dependencies are installed for fallback."""
+    global _ocr_available
+    if _ocr_available is None:
+        try:
+            import pdf2image
+            import pytesseract
+            _ocr_available = True
+            logger.info("OCR fallback available (pdf2image + pytesseract).")
+        except ImportError:
+            _ocr_available = False
+            logger.warning("OCR dependencies not installed. OCR fallback disabled.")
+    return _ocr_available
+
+
+def extract_text(file_bytes: bytes) -> str:
+    """
+    Extracts text from PDF bytes.
+    Uses pypdf first, falls back to pdf2image + pytesseract OCR for scanned documents.
+    Returns raw text (may contain PII - redact before storing it anywhere public).
+    """
+    text = extract_text_pypdf(file_bytes)
+
+    # Check if text extraction yielded meaningful content
+    page_count = max(count_pages(file_bytes), 1)
+    avg_chars = len(text) / page_count
+
+    if avg_chars < OCR_CHARS_PER_PAGE_THRESHOLD:
+        logger.info(f"Low text yield ({avg_chars:.0f} chars/page). Attempting OCR fallback...")
+        ocr_text = extract_text_ocr(file_bytes)
+        if len(ocr_text) > len(text):
+            logger.info(f"OCR extracted {len(ocr_text)} chars (vs {len(text)} from pypdf).")
+            return ocr_text
+
+    return text
+
+
+def extract_text_pypdf(file_bytes: bytes) -> str:
+    """Extract text using pypdf. Handles encrypted PDFs gracefully."""
+    try:
+        reader = PdfReader(io.BytesIO(file_bytes))
+
+        if reader.is_encrypted:
+            try:
+                reader.decrypt("")
+            except Exception:
+                logger.warning("PDF is encrypted and cannot be read.")
+                return ""
+
+        text = ""
+        for page in reader.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text += page_text + "\n"
+
+        return text.strip()
+
+    except Exception as e:
+        logger.error(f"pypdf text extraction failed: {e}")
+        return ""
+
+
+def extract_text_ocr(file_bytes: bytes) -> str:
+    """OCR fallback using pdf2image + pytesseract for scanned PDFs."""
+    if not ocr_available():
+        return ""
+
+    try:
+        from pdf2image import convert_from_bytes
+        import pytesseract
+
+        # Convert PDF pages to images
+        images = convert_from_bytes(file_bytes, dpi=200)
+        text_parts = []
+
+        for i, image in enumerate(images):
+            try:
+                # OCR each page
+                text = pytesseract.image_to_string(image, lang='deu')
+                if text and text.strip():
+                    text_parts.append(text)
+                    logger.debug(f"OCR extracted text from page {i+1}")
+            except Exception as page_e:
+                logger.warning(f"OCR failed for page {i+1}: {page_e}")
+
+        return "\n".join(text_parts).strip()
+
+    except Exception as e:
+        logger.error(f"OCR extraction failed: {e}")
+        return ""
+
+
+def count_pages(file_bytes: bytes) -> int:
+    """Count pages in PDF for threshold calculation."""
+    try:
+        reader = PdfReader(io.BytesIO(file_bytes))
+        return len(reader.pages)
+    except Exception:
+        return 1
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import os
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Any, Tuple
+from xml.sax.saxutils import escape
+
+import httpx
+
+from fetcher import ResilientFetcher
+from gml_parser import GMLFeatureParser
+from wfs_tile_cache import feature_key
+
+logger = logging.getLogger("WFSHarvester")
+
+# --- Config ---
+# GML is parsed while streaming; WFS 2.0 answers EPSG:4326 requests in lat/lon axis order
+WFS_OUTPUT_FORMAT = os.getenv("WFS_OUTPUT_FORMAT", "application/gml+xml; version=3.2")
+WFS_DEFAULT_SRS = "urn:ogc:def:crs:EPSG::4326"
+WFS_PAGE_SIZE = int(os.getenv("WFS_PAGE_SIZE", "1000"))
+# A bbox matching more than this many features is split into 4 sub-tiles
+WFS_SPLIT_THRESHOLD = int(os.getenv("WFS_SPLIT_THRESHOLD", "5000"))
+WFS_MAX_SPLIT_DEPTH = int(os.getenv("WFS_MAX_SPLIT_DEPTH", "4"))
+# Stable sort key for paging (a unique property, e.g. the ALKIS identifier). Without sortBy
+# WFS 2.0 does not guarantee a stable order across requests, so pages are only fetched
+# concurrently when it is set (and accepted by the server), otherwise one after another.
+WFS_SORT_BY = os.getenv("WFS_SORT_BY", "")
+
+BBox = Tuple[float, float, float, float]  # (minlon, minlat, maxlon, maxlat)
+
+
+class WFSRequestError(Exception):
+    """A GetFeature request failed (HTTP error, ExceptionReport, unparsable body)."""
+
+
+@dataclass
+class WFSPage:
+    features: List[Dict[str, Any]]
+    number_matched: Optional[int]  # None if the server reports 'unknown'
+
+
+def split_bbox(bbox: BBox) -> List[BBox]:
+    """Quadrants of a bbox."""
+    minx, miny, maxx, maxy = bbox
+    midx, midy = (minx + maxx) / 2, (miny + maxy) / 2
+    return [
+        (minx, miny, midx, midy), (midx, miny, maxx, midy),
+        (minx, midy, midx, maxy), (midx, midy, maxx, maxy),
+    ]
+
+
+def _parse_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class WFSHarvester:
+    """
+    Fetches all features of a layer within a (possibly large) bbox.
+    - WFS 2.0 paging with count/startIndex. With a stable sortBy key and a known
+      numberMatched the remaining pages are requested concurrently; otherwise
+      sequentially (unsorted concurrent pages may overlap or skip features).
+    - Bboxes matching more than WFS_SPLIT_THRESHOLD features are split into
+      adaptive sub-tiles (quadtree), fetched concurrently.
+    - Concurrency is bounded by the fetcher's per-domain limit.
+    - Features spanning sub-tile edges are returned once (deduplicated by gml:id).
+    """
+
+    def __init__(self, fetcher: ResilientFetcher, page_size: int = WFS_PAGE_SIZE,
+                 split_threshold: int = WFS_SPLIT_THRESHOLD, max_depth: int = WFS_MAX_SPLIT_DEPTH,
+                 sort_by: Optional[str] = WFS_SORT_BY or None):
+        self.fetcher = fetcher
+        self.page_size = page_size
+        self.split_threshold = split_threshold
+        self.max_depth = max_depth
+        self.sort_by = sort_by
+        # Servers that rejected sortBy (per URL): sequential paging without it
+        self.sort_unsupported: set = set()
+        self.requests = 0
+
+    async def fetch_page(self, url: str, type_name: str, bbox: Optional[BBox],
+                         start_index: int = 0, count: Optional[int] = None,
+                         fes_filter: Optional[str] = None, sort_by: Optional[str] = None) -> WFSPage:
+        """
+        One GetFeature request (bbox or FES filter; WFS 2.0 does not allow both).
+        The GML response is parsed incrementally while it streams in (see gml_parser.py).
+        Raises WFSRequestError on failure.
+        """
+        params = {
+            "service": "WFS",
+            "version": "2.0.0",
+            "request": "GetFeature",
+            "typeNames": type_name,
+            "srsName": "EPSG:4326",
+            "outputFormat": WFS_OUTPUT_FORMAT,
+            "count": count or self.page_size,
+            "startIndex": start_index
+        }
+        if bbox is not None:
+            params["bbox"] = f"{bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]}" # WFS 2.0 + EPSG:4326: Lat,Lon order
+        if fes_filter:
+            params["filter"] = fes_filter
+        if sort_by:
+            params["sortBy"] = f"{sort_by} ASC"
+        self.requests += 1
+        try:
+            async with await self.fetcher.stream('GET', url, params=params) as response:
+                if response.status_code != 200:
+                    raise WFSRequestError(f"HTTP {response.status_code}")
+
+                # Some servers ignore outputFormat; JSON has no incremental parser here
+                if "json" in response.headers.get("content-type", ""):
+                    data = json.loads(await response.aread())
+                    return WFSPage(
+                        data.get('features', []),
+                        _parse_int(data.get('numberMatched', data.get('totalFeatures')))
+                    )
+
+                parser = GMLFeatureParser(default_srs=WFS_DEFAULT_SRS)
+                features = []
+                async for chunk in response.aiter_bytes():
+                    features.extend(parser.feed(chunk))
+                features.extend(parser.close())
+
+                if parser.root_name == "ExceptionReport":
+                    raise WFSRequestError("ExceptionReport")
+                return WFSPage(features, _parse_int(parser.root_attrib.get("numberMatched")))
+        except (httpx.HTTPError, ET.ParseError, ValueError) as e:
+            raise WFSRequestError(str(e)) from e
+
+    async def _first_page(self, url: str, type_name: str, bbox: BBox) -> Tuple[WFSPage, Optional[str]]:
+        """First page, sorted if possible. Returns (page, sort key in effect)."""
+        sort_by = self.sort_by if url not in self.sort_unsupported else None
+        if sort_by:
+            try:
+                return await self.fetch_page(url, type_name, bbox, sort_by=sort_by), sort_by
+            except WFSRequestError as e:
+                logger.warning(f"WFS {url} rejected sortBy={sort_by} ({e}), paging sequentially.")
+                self.sort_unsupported.add(url)
+        return await self.fetch_page(url, type_name, bbox), None
+
+    async def _harvest_tile(self, url: str, type_name: str, bbox: BBox, depth: int) -> List[Dict[str, Any]]:
+        first, sort_by = await self._first_page(url, type_name, bbox)
+        if len(first.features) < self.page_size:
+            return first.features
+
+        matched = first.number_matched
+        if matched is not None and matched > self.split_threshold and depth < self.max_depth:
+            logger.info(f"WFS bbox {bbox} matches {matched} {type_name} features, splitting.")
+            parts = await asyncio.gather(*[
+                self._harvest_tile(url, type_name, sub, depth + 1) for sub in split_bbox(bbox)
+            ])
+            return [f for part in parts for f in part]
+
+        features = list(first.features)
+        if matched is not None and sort_by:
+            # Total known and a stable order: fetch the remaining pages concurrently
+            pages = await asyncio.gather(*[
+                self.fetch_page(url, type_name, bbox, start, sort_by=sort_by)
+                for start in range(self.page_size, matched, self.page_size)
+            ])
+            for page in pages:
+                features.extend(page.features)
+            return features
+
+        # No stable order (or numberMatched unknown): page one after another until a
+        # short page comes back or numberMatched is reached
+        start = self.page_size
+        while matched is None or start < matched:
+            page = await self.fetch_page(url, type_name, bbox, start, sort_by=sort_by)
+            features.extend(page.features)
+            if len(page.features) < self.page_size:
+                break
+            start += self.page_size
+        return features
+
+    async def harvest(self, url: str, type_name: str, bbox: BBox) -> Optional[List[Dict[str, Any]]]:
+        """
+        All features within bbox, deduplicated by gml:id.
+        Returns None if any request failed (partial results are never returned,
+        so a truncated result can't be cached as complete).
+        """
+        try:
+            features = await self._harvest_tile(url, type_name, tuple(bbox), 0)
+        except WFSRequestError as e:
+            logger.warning(f"WFS harvest of {type_name} failed: {e}")
+            return None
+
+        result, seen = [], set()
+        for feature in features:
+            key = feature_key(feature)
+            if key not in seen:
+                seen.add(key)
+                result.append(feature)
+        return result
+
+    async def fetch_by_property(self, url: str, type_name: str, property_name: str,
+                                value: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Features whose property equals value (FES 2.0 PropertyIsEqualTo), e.g. a
+        Gemeinde by its AGS. Returns None if the request failed.
+        """
+        fes_filter = (
+            '<fes:Filter xmlns:fes="http://www.opengis.net/fes/2.0">'
+            '<fes:PropertyIsEqualTo>'
+            f'<fes:ValueReference>{escape(property_name)}</fes:ValueReference>'
+            f'<fes:Literal>{escape(value)}</fes:Literal>'
+            '</fes:PropertyIsEqualTo></fes:Filter>'
+        )
+        try:
+            return (await self.fetch_page(url, type_name, None, fes_filter=fes_filter)).features
+        except WFSRequestError as e:
+            logger.warning(f"WFS query {type_name}.{property_name}={value} failed: {e}")
+            return None
@@ -0,0 +1,183 @@
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Dict, Any, Tuple, Iterable
+
+logger = logging.getLogger("WFSTileCache")
+
+# --- Config ---
+# Zoom 16 tiles are ~400m x 600m in Bavaria: a village is a handful of tiles,
+# a field block usually one or two.
+WFS_TILE_CACHE_PATH = os.getenv(
+    "WFS_TILE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "wfs_tiles.sqlite")
+)
+WFS_TILE_ZOOM = int(os.getenv("WFS_TILE_ZOOM", "16"))
+WFS_TILE_TTL_SECONDS = int(os.getenv("WFS_TILE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+Tile = Tuple[int, int, int]  # (z, x, y)
+BBox = Tuple[float, float, float, float]  # (minlon, minlat, maxlon, maxlat)
+
+# --- XYZ Tile Math (Web Mercator tiling scheme, lon/lat in EPSG:4326) ---
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int) -> Tuple[int, int]:
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(tile: Tile) -> BBox:
+    """(z, x, y) -> (minlon, minlat, maxlon, maxlat)"""
+    z, x, y = tile
+    n = 2 ** z
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def tiles_for_bbox(bbox: BBox, zoom: int) -> List[Tile]:
+    """All tiles intersecting the bbox (row-major)."""
+    min_x, max_y = lonlat_to_tile(bbox[0], bbox[1], zoom)
+    max_x, min_y = lonlat_to_tile(bbox[2], bbox[3], zoom)
+    return [(zoom, x, y) for y in range(min_y, max_y + 1) for x in range(min_x, max_x + 1)]
+
+
+def covering_bbox(tiles: Iterable[Tile]) -> BBox:
+    bounds = [tile_bounds(t) for t in tiles]
+    return (
+        min(b[0] for b in bounds), min(b[1] for b in bounds),
+        max(b[2] for b in bounds), max(b[3] for b in bounds)
+    )
+
+
+def bboxes_intersect(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def geometry_bbox(geometry: Dict[str, Any]) -> Optional[BBox]:
+    """Bbox of a GeoJSON geometry without building shapely objects."""
+    xs, ys = [], []
+
+    def walk(coords):
+        if coords and isinstance(coords[0], (int, float)):
+            xs.append(coords[0])
+            ys.append(coords[1])
+        else:
+            for c in coords:
+                walk(c)
+
+    walk(geometry.get("coordinates", []) if geometry else [])
+    if not xs:
+        return None
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def feature_key(feature: Dict[str, Any]) -> str:
+    """Stable identity of a feature (it is stored in every tile it touches)."""
+    if feature.get("id") is not None:
+        return str(feature["id"])
+    return json.dumps(feature.get("geometry"), sort_keys=True)
+
+
+class WFSTileCache:
+    """
+    Local XYZ tile cache for WFS features (SQLite).
+    - One row per (layer, z, x, y) holding all features that intersect the tile.
+    - Rows older than the TTL count as missing and are refetched.
+    - An empty tile is a valid cache entry (no buildings there).
+    """
+
+    def __init__(self, path: str = WFS_TILE_CACHE_PATH, zoom: int = WFS_TILE_ZOOM,
+                 ttl_seconds: int = WFS_TILE_TTL_SECONDS):
+        self.path = path
+        self.zoom = zoom
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS wfs_tiles (
+                layer TEXT NOT NULL,
+                z INTEGER NOT NULL,
+                x INTEGER NOT NULL,
+                y INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                features TEXT NOT NULL,
+                PRIMARY KEY (layer, z, x, y)
+            )
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["WFSTileCache"]:
+        """Default cache, or None if disabled via WFS_TILE_CACHE=0."""
+        if os.getenv("WFS_TILE_CACHE", "1").lower() in ("0", "false", "off"):
+            return None
+        try:
+            return cls()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"WFS tile cache disabled: {e}")
+            return None
+
+    def tiles_for_bbox(self, bbox: BBox) -> List[Tile]:
+        return tiles_for_bbox(bbox, self.zoom)
+
+    def get_many(self, layer: str, tiles: List[Tile]) -> Dict[Tile, List[Dict[str, Any]]]:
+        """Fresh cached tiles among `tiles` -> features. Missing/expired tiles are absent."""
+        min_fetched_at = time.time() - self.ttl_seconds
+        found = {}
+        with self._lock:
+            for z, x, y in tiles:
+                row = self._conn.execute(
+                    "SELECT features FROM wfs_tiles WHERE layer = ? AND z = ? AND x = ? AND y = ? AND fetched_at >= ?",
+                    (layer, z, x, y, min_fetched_at)
+                ).fetchone()
+                if row is not None:
+                    found[(z, x, y)] = json.loads(row[0])
+        return found
+
+    def put_many(self, layer: str, tile_features: Dict[Tile, List[Dict[str, Any]]]):
+        now = time.time()
+        rows = [(layer, z, x, y, now, json.dumps(features)) for (z, x, y), features in tile_features.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO wfs_tiles (layer, z, x, y, fetched_at, features) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def assign_to_tiles(self, features: List[Dict[str, Any]], tiles: List[Tile]) -> Dict[Tile, List[Dict[str, Any]]]:
+        """Distributes features of a covering request to every tile their bbox touches."""
+        tile_features = {tile: [] for tile in tiles}
+        bounds = {tile: tile_bounds(tile) for tile in tiles}
+        for feature in features:
+            fb = geometry_bbox(feature.get("geometry"))
+            if fb is None:
+                continue
+            for tile in tiles:
+                if bboxes_intersect(fb, bounds[tile]):
+                    tile_features[tile].append(feature)
+        return tile_features
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM wfs_tiles WHERE fetched_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,215 @@
+-- Audit Log v2: Concurrency-safe, O(1) Hash Chaining
+-- Replaces the "ORDER BY timestamp DESC LIMIT 1" predecessor lookup.
+-- The chain head (last seq + hash) lives in a single-row table and is read
+-- under a row lock, so concurrent writers are serialized and cannot fork the chain.
+-- Every entry gets a gap-free sequence number (seq), which is the chain order.
+
+-- 1. Sequence Number on audit_logs
+ALTER TABLE public.audit_logs ADD COLUMN IF NOT EXISTS seq BIGINT;
+
+-- Backfill existing rows in the order the old trigger chained them
+WITH ordered AS (
+    SELECT id,
+           (SELECT coalesce(max(seq), 0) FROM public.audit_logs)
+           + row_number() OVER (ORDER BY timestamp ASC, id ASC) AS rn
+    FROM public.audit_logs
+    WHERE seq IS NULL
+)
+UPDATE public.audit_logs a
+SET seq = o.rn
+FROM ordered o
+WHERE a.id = o.id;
+
+ALTER TABLE public.audit_logs ALTER COLUMN seq SET NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_audit_logs_seq ON public.audit_logs (seq);
+
+-- 2. Chain Head (exactly one row)
+CREATE TABLE IF NOT EXISTS public.audit_chain_head (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    seq BIGINT NOT NULL,
+    curr_hash TEXT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+INSERT INTO public.audit_chain_head (id, seq, curr_hash)
+SELECT TRUE,
+       coalesce(max(seq), 0),
+       coalesce(
+           (SELECT curr_hash FROM public.audit_logs ORDER BY seq DESC LIMIT 1),
+           '0000000000000000000000000000000000000000000000000000000000000000'
+       )
+FROM public.audit_logs
+ON CONFLICT (id) DO NOTHING;
+
+-- Service role only (trigger functions run as SECURITY DEFINER)
+ALTER TABLE public.audit_chain_head ENABLE ROW LEVEL SECURITY;
+
+-- 3. Hash Payload (shared by trigger and verifier)
+-- Payload = Timestamp + Actor + Action + Resource + Details + PrevHash (unchanged from v1)
+CREATE OR REPLACE FUNCTION public.audit_entry_hash(
+    p_timestamp TIMESTAMP WITH TIME ZONE,
+    p_actor_id UUID,
+    p_action TEXT,
+    p_resource TEXT,
+    p_details JSONB,
+    p_prev_hash TEXT
+)
+RETURNS TEXT AS $$
+    SELECT encode(digest(
+        coalesce(p_timestamp::text, '') ||
+        coalesce(p_actor_id::text, 'SYSTEM') ||
+        coalesce(p_action, '') ||
+        coalesce(p_resource, '') ||
+        coalesce(p_details::text, '') ||
+        p_prev_hash,
+        'sha256'), 'hex');
+$$ LANGUAGE sql STABLE;
+
+-- 4. Trigger Function: O(1) head lookup under row lock
+CREATE OR REPLACE FUNCTION public.calculate_audit_hash()
+RETURNS TRIGGER AS $$
+DECLARE
+    head_seq BIGINT;
+    last_hash TEXT;
+BEGIN
+    -- Locks the head row until commit. Concurrent writers queue here
+    -- instead of reading the same predecessor.
+    SELECT seq, curr_hash INTO head_seq, last_hash
+    FROM public.audit_chain_head
+    WHERE id
+    FOR UPDATE;
+
+    NEW.seq := head_seq + 1;
+    NEW.prev_hash := last_hash;
+    NEW.curr_hash := public.audit_entry_hash(
+        NEW.timestamp, NEW.actor_id, NEW.action, NEW.resource, NEW.details, last_hash
+    );
+
+    UPDATE public.audit_chain_head
+    SET seq = NEW.seq,
+        curr_hash = NEW.curr_hash,
+        updated_at = now()
+    WHERE id;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER
+SET search_path = public, extensions;
+
+-- Trigger (unchanged, re-created for clarity)
+DROP TRIGGER IF EXISTS trigger_audit_log_insert ON public.audit_logs;
+CREATE TRIGGER trigger_audit_log_insert
+BEFORE INSERT ON public.audit_logs
+FOR EACH ROW
+EXECUTE FUNCTION public.calculate_audit_hash();
+
+-- 5. Set-based Batch Insert
+-- Input: JSON array of {timestamp?, actor_id?, action, resource, details?}
+-- Rows are chained in array order within one statement (one lock acquisition).
+CREATE OR REPLACE FUNCTION public.append_audit_logs(p_entries JSONB)
+RETURNS TABLE (log_id UUID, log_seq BIGINT, log_hash TEXT) AS $$
+BEGIN
+    -- Take the chain lock once up front; the per-row trigger re-acquires it for free.
+    PERFORM 1 FROM public.audit_chain_head WHERE id FOR UPDATE;
+
+    RETURN QUERY
+    INSERT INTO public.audit_logs (timestamp, actor_id, action, resource, details)
+    SELECT coalesce((e.entry->>'timestamp')::timestamptz, timezone('utc'::text, now())),
+           (e.entry->>'actor_id')::uuid,
+           e.entry->>'action',
+           e.entry->>'resource',
+           coalesce(e.entry->'details', '{}'::jsonb)
+    FROM jsonb_array_elements(p_entries) WITH ORDINALITY AS e(entry, ord)
+    ORDER BY e.ord
+    RETURNING audit_logs.id, audit_logs.seq, audit_logs.curr_hash;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER
+SET search_path = public, extensions;
+
+-- 6. Incremental Verification
+-- Checkpoints store the last verified position per verifier.
+CREATE TABLE IF NOT EXISTS public.audit_chain_checkpoints (
+    name TEXT PRIMARY KEY,
+    seq BIGINT NOT NULL,
+    curr_hash TEXT NOT NULL,
+    verified_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+ALTER TABLE public.audit_chain_checkpoints ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Enable all for service_role only"
+ON public.audit_chain_checkpoints
+FOR ALL
+TO service_role
+USING (true)
+WITH CHECK (true);
+
+-- Verifies up to p_limit entries after the checkpoint (index range scan on seq).
+-- Advances the checkpoint only if every checked entry is valid.
+CREATE OR REPLACE FUNCTION public.verify_audit_chain(
+    p_checkpoint TEXT DEFAULT 'default',
+    p_limit INT DEFAULT 100000
+)
+RETURNS TABLE (
+    checked BIGINT,
+    last_seq BIGINT,
+    last_hash TEXT,
+    broken_seq BIGINT
+) AS $$
+DECLARE
+    v_seq BIGINT := 0;
+    v_hash TEXT := '0000000000000000000000000000000000000000000000000000000000000000';
+    v_checked BIGINT := 0;
+    r RECORD;
+BEGIN
+    SELECT c.seq, c.curr_hash INTO v_seq, v_hash
+    FROM public.audit_chain_checkpoints c
+    WHERE c.name = p_checkpoint;
+
+    IF NOT FOUND THEN
+        v_seq := 0;
+        v_hash := '0000000000000000000000000000000000000000000000000000000000000000';
+    END IF;
+
+    FOR r IN
+        SELECT l.seq, l.timestamp, l.actor_id, l.action, l.resource, l.details, l.prev_hash, l.curr_hash
+        FROM public.audit_logs l
+        WHERE l.seq > v_seq
+        ORDER BY l.seq ASC
+        LIMIT p_limit
+    LOOP
+        IF r.seq <> v_seq + 1
+           OR r.prev_hash IS DISTINCT FROM v_hash
+           OR r.curr_hash IS DISTINCT FROM public.audit_entry_hash(
+                  r.timestamp, r.actor_id, r.action, r.resource, r.details, r.prev_hash) THEN
+            RETURN QUERY SELECT v_checked, v_seq, v_hash, r.seq;
+            RETURN;
+        END IF;
+
+        v_seq := r.seq;
+        v_hash := r.curr_hash;
+        v_checked := v_checked + 1;
+    END LOOP;
+
+    IF v_checked > 0 THEN
+        INSERT INTO public.audit_chain_checkpoints (name, seq, curr_hash, verified_at)
+        VALUES (p_checkpoint, v_seq, v_hash, now())
+        ON CONFLICT (name) DO UPDATE
+        SET seq = EXCLUDED.seq, curr_hash = EXCLUDED.curr_hash, verified_at = EXCLUDED.verified_at;
+    END IF;
+
+    RETURN QUERY SELECT v_checked, v_seq, v_hash, NULL::BIGINT;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER
+SET search_path = public, extensions;
+
+-- 7. Privileges
+-- SECURITY DEFINER functions bypass RLS: only the service role (worker / server)
+-- may append or verify. PostgREST would otherwise expose them to anon/authenticated.
+REVOKE EXECUTE ON FUNCTION public.calculate_audit_hash() FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.append_audit_logs(JSONB) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.verify_audit_chain(TEXT, INT) FROM PUBLIC, anon, authenticated;
+
+GRANT EXECUTE ON FUNCTION public.calculate_audit_hash() TO service_role;
+GRANT EXECUTE ON FUNCTION public.append_audit_logs(JSONB) TO service_role;
+GRANT EXECUTE ON FUNCTION public.verify_audit_chain(TEXT, INT) TO service_role;
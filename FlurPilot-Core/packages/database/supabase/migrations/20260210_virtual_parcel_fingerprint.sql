@@ -0,0 +1,12 @@
+-- F-02: Input Fingerprints for Virtual Parcels
+-- SHA-256 over the normalized field block + building geometries the parcel was
+-- calculated from (see input_fingerprint() in apps/worker/bavarian_bypass.py).
+-- The worker skips the geometry engine and the upsert when the fingerprint of
+-- freshly fetched WFS data matches, so periodic refreshes only touch changed parcels.
+-- Existing rows have no fingerprint and are recomputed once.
+
+alter table public.virtual_parcels
+add column if not exists input_fingerprint text;
+
+comment on column public.virtual_parcels.input_fingerprint is
+    'SHA-256 of the normalized input geometries (field block + intersecting buildings)';
@@ -0,0 +1,337 @@
+-- Spatial link between evidence (F-01) and virtual parcels (F-02)
+-- evidence_docs.extracted_locations (JSONB) -> location_geom (MultiPoint, 4326), kept in
+-- sync by a trigger.
+-- GiST indexes on the geometries and on their geography casts, so distance queries in
+-- metres (ST_DWithin / <-> on geography) are index-assisted.
+-- Queries must use the exact expressions `location_geom::geography` and
+-- `geometry::geography` to hit the expression indexes.
+
+create extension if not exists postgis;
+
+-- 1. Location Parsing
+-- Accepted entries of extracted_locations (an array, or a single object):
+--   {"lat": 48.1, "lon": 11.5}          (also "lng", "latitude", "longitude")
+--   {"type": "Point", "coordinates": [11.5, 48.1]}   (GeoJSON geometry, any type)
+--   {"geometry": {...}, ...}            (GeoJSON Feature / object with a geometry)
+-- Lines and polygons (e.g. geoparsed parcels) contribute ST_PointOnSurface.
+-- Malformed entries and coordinates outside lon/lat range are skipped.
+create or replace function public.locations_to_multipoint(p_locations jsonb)
+returns geometry(MultiPoint, 4326)
+language plpgsql
+immutable
+as $$
+declare
+    v_entry jsonb;
+    v_geom geometry;
+    v_part geometry;
+    v_points geometry[] := '{}';
+begin
+    if p_locations is null then
+        return null;
+    end if;
+
+    for v_entry in
+        select e
+        from jsonb_array_elements(
+            case jsonb_typeof(p_locations)
+                when 'array' then p_locations
+                else jsonb_build_array(p_locations)
+            end
+        ) as e
+    loop
+        v_geom := null;
+        if jsonb_typeof(v_entry) = 'object' then
+            begin
+                if jsonb_typeof(v_entry->'geometry') = 'object' then
+                    v_geom := ST_GeomFromGeoJSON(v_entry->'geometry');
+                elsif v_entry ? 'type' and v_entry ? 'coordinates' then
+                    v_geom := ST_GeomFromGeoJSON(v_entry);
+                elsif coalesce(v_entry->>'lat', v_entry->>'latitude') is not null
+                      and coalesce(v_entry->>'lon', v_entry->>'lng', v_entry->>'longitude') is not null then
+                    v_geom := ST_MakePoint(
+                        coalesce(v_entry->>'lon', v_entry->>'lng', v_entry->>'longitude')::float8,
+                        coalesce(v_entry->>'lat', v_entry->>'latitude')::float8
+                    );
+                end if;
+            exception when others then
+                -- Bad GeoJSON / non-numeric coordinates: skip the entry
+                v_geom := null;
+            end;
+        end if;
+
+        if v_geom is not null and not ST_IsEmpty(v_geom) then
+            for v_part in
+                select case when GeometryType(d.geom) = 'POINT' then d.geom else ST_PointOnSurface(d.geom) end
+                from ST_Dump(v_geom) d
+            loop
+                -- Out-of-range coordinates would break the geography cast (and its index)
+                if ST_X(v_part) between -180 and 180 and ST_Y(v_part) between -90 and 90 then
+                    v_points := array_append(v_points, ST_SetSRID(v_part, 4326));
+                end if;
+            end loop;
+        end if;
+    end loop;
+
+    if cardinality(v_points) = 0 then
+        return null;
+    end if;
+    return ST_Multi(ST_Collect(v_points));
+end;
+$$;
+
+-- 2. Evidence Locations
+alter table public.evidence_docs
+add column if not exists extracted_locations jsonb default '[]';
+
+alter table public.evidence_docs
+add column if not exists location_geom geometry(MultiPoint, 4326);
+
+create or replace function public.evidence_docs_set_location()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.location_geom := public.locations_to_multipoint(new.extracted_locations);
+    return new;
+end;
+$$;
+
+drop trigger if exists trigger_evidence_docs_location on public.evidence_docs;
+create trigger trigger_evidence_docs_location
+before insert or update of extracted_locations on public.evidence_docs
+for each row
+execute function public.evidence_docs_set_location();
+
+-- Backfill (sets location_geom directly, the trigger only fires on extracted_locations)
+update public.evidence_docs
+set location_geom = public.locations_to_multipoint(extracted_locations)
+where location_geom is null
+and extracted_locations is not null
+and extracted_locations <> '[]'::jsonb;
+
+-- 3. Indexes
+-- Geometry GiST: bbox filters (&&) for the map
+create index if not exists idx_evidence_docs_location_geom
+on public.evidence_docs using gist (location_geom);
+
+-- Geography GiST: ST_DWithin in metres and kNN (<->) in metres
+create index if not exists idx_evidence_docs_location_geog
+on public.evidence_docs using gist ((location_geom::geography));
+
+create index if not exists idx_virtual_parcels_geog
+on public.virtual_parcels using gist ((geometry::geography));
+
+-- "Recent" filters
+create index if not exists idx_evidence_docs_published_date
+on public.evidence_docs (published_date desc);
+
+
+-- FUNCTION: Parcels near Evidence
+-- "Parcels within 2 km of an Aufstellungsbeschluss since 2025-01-01":
+--   select * from parcels_near_evidence(2000, '2025-01-01', array['Beschluss'])
+-- One row per parcel with its nearest matching evidence and the number of matches.
+create or replace function public.parcels_near_evidence(
+    p_radius_m float8 default 2000,
+    p_since date default null,
+    p_doc_types text[] default null,
+    p_relevant_only boolean default false,
+    p_limit int default 1000
+)
+returns table (
+    parcel_id uuid,
+    source_field_id text,
+    net_area_m2 float8,
+    evidence_id uuid,
+    evidence_title text,
+    doc_type text,
+    published_date date,
+    distance_m float8,
+    evidence_count bigint
+)
+language sql
+stable
+as $$
+    with pairs as (
+        select vp.id as parcel_id,
+               vp.source_field_id,
+               vp.net_area_m2,
+               e.id as evidence_id,
+               e.title,
+               e.doc_type,
+               e.published_date,
+               ST_Distance(vp.geometry::geography, e.location_geom::geography) as distance_m
+        from public.evidence_docs e
+        join public.virtual_parcels vp
+          on ST_DWithin(vp.geometry::geography, e.location_geom::geography, p_radius_m)
+        where e.location_geom is not null
+          and (p_since is null or e.published_date >= p_since)
+          and (p_doc_types is null or e.doc_type = any(p_doc_types))
+          and (not p_relevant_only or coalesce(e.relevant, false))
+    ),
+    nearest as (
+        select distinct on (p.parcel_id)
+               p.parcel_id, p.source_field_id, p.net_area_m2::float8,
+               p.evidence_id, p.title, p.doc_type, p.published_date, p.distance_m,
+               count(*) over (partition by p.parcel_id) as evidence_count
+        from pairs p
+        order by p.parcel_id, p.distance_m
+    )
+    select * from nearest
+    order by distance_m
+    limit p_limit;
+$$;
+
+-- FUNCTION: k Nearest Evidence to a Point (index-ordered kNN on geography)
+create or replace function public.nearest_evidence(
+    p_lon float8,
+    p_lat float8,
+    p_k int default 10,
+    p_max_distance_m float8 default null,
+    p_since date default null
+)
+returns table (
+    evidence_id uuid,
+    title text,
+    doc_type text,
+    published_date date,
+    url text,
+    distance_m float8
+)
+language sql
+stable
+as $$
+    select e.id,
+           e.title,
+           e.doc_type,
+           e.published_date,
+           e.url,
+           ST_Distance(e.location_geom::geography, ST_SetSRID(ST_MakePoint(p_lon, p_lat), 4326)::geography)
+    from public.evidence_docs e
+    where e.location_geom is not null
+      and (p_since is null or e.published_date >= p_since)
+      and (p_max_distance_m is null or ST_DWithin(
+            e.location_geom::geography, ST_SetSRID(ST_MakePoint(p_lon, p_lat), 4326)::geography, p_max_distance_m))
+    order by e.location_geom::geography <-> ST_SetSRID(ST_MakePoint(p_lon, p_lat), 4326)::geography
+    limit p_k;
+$$;
+
+-- FUNCTION: Evidence near one Parcel (parcel detail panel)
+create or replace function public.evidence_near_parcel(
+    p_parcel_id uuid,
+    p_radius_m float8 default 2000,
+    p_k int default 20
+)
+returns table (
+    evidence_id uuid,
+    title text,
+    doc_type text,
+    published_date date,
+    url text,
+    distance_m float8
+)
+language sql
+stable
+as $$
+    select e.id,
+           e.title,
+           e.doc_type,
+           e.published_date,
+           e.url,
+           ST_Distance(e.location_geom::geography, vp.geometry::geography) as distance_m
+    from public.virtual_parcels vp
+    join public.evidence_docs e
+      on ST_DWithin(e.location_geom::geography, vp.geometry::geography, p_radius_m)
+    where vp.id = p_parcel_id
+    order by distance_m
+    limit p_k;
+$$;
+
+-- FUNCTION: Map Overlay
+-- One call for the map viewport: virtual parcels in the bbox (annotated with nearby
+-- evidence) plus the evidence points within p_radius_m of the bbox, as a GeoJSON
+-- FeatureCollection (properties.type = 'virtual' | 'evidence'). Each layer is capped at
+-- p_limit features.
+create or replace function public.map_overlay(
+    p_min_lon float8,
+    p_min_lat float8,
+    p_max_lon float8,
+    p_max_lat float8,
+    p_radius_m float8 default 2000,
+    p_since date default null,
+    p_limit int default 2000
+)
+returns jsonb
+language sql
+stable
+as $$
+    with bbox as (
+        select ST_MakeEnvelope(p_min_lon, p_min_lat, p_max_lon, p_max_lat, 4326) as env
+    ),
+    parcels as (
+        select vp.id, vp.source_field_id, vp.net_area_m2, vp.geometry
+        from public.virtual_parcels vp, bbox
+        where vp.geometry && bbox.env
+        -- Deterministic truncation: largest parcels first
+        order by vp.net_area_m2 desc nulls last, vp.id
+        limit p_limit
+    ),
+    parcel_features as (
+        select jsonb_build_object(
+            'type', 'Feature',
+            'geometry', ST_AsGeoJSON(p.geometry)::jsonb,
+            'properties', jsonb_build_object(
+                'id', p.id,
+                'type', 'virtual',
+                'source', p.source_field_id,
+                'area', p.net_area_m2,
+                'evidence_count', n.evidence_count,
+                'nearest_evidence_id', n.nearest_id,
+                'nearest_evidence_m', n.nearest_m
+            )
+        ) as feature
+        from parcels p
+        left join lateral (
+            -- Per parcel: geography index scan on evidence_docs
+            select count(*) as evidence_count,
+                   (array_agg(d.id order by d.distance_m))[1] as nearest_id,
+                   min(d.distance_m) as nearest_m
+            from (
+                select e.id, ST_Distance(e.location_geom::geography, p.geometry::geography) as distance_m
+                from public.evidence_docs e
+                where ST_DWithin(e.location_geom::geography, p.geometry::geography, p_radius_m)
+                  and (p_since is null or e.published_date >= p_since)
+            ) d
+        ) n on true
+    ),
+    evidence_features as (
+        select jsonb_build_object(
+            'type', 'Feature',
+            'geometry', ST_AsGeoJSON(e.location_geom)::jsonb,
+            'properties', jsonb_build_object(
+                'id', e.id,
+                'type', 'evidence',
+                'title', e.title,
+                'doc_type', e.doc_type,
+                'published_date', e.published_date,
+                'url', e.url,
+                'risk_score', e.risk_score
+            )
+        ) as feature
+        from (
+            select e.*
+            from public.evidence_docs e, bbox
+            where e.location_geom is not null
+              and ST_DWithin(e.location_geom::geography, bbox.env::geography, p_radius_m)
+              and (p_since is null or e.published_date >= p_since)
+            -- Deterministic truncation: highest risk first
+            order by e.risk_score desc nulls last, e.id
+            limit p_limit
+        ) e
+    )
+    select jsonb_build_object(
+        'type', 'FeatureCollection',
+        'features',
+        coalesce((select jsonb_agg(feature) from parcel_features), '[]'::jsonb)
+        || coalesce((select jsonb_agg(feature) from evidence_features), '[]'::jsonb)
+    );
+$$;
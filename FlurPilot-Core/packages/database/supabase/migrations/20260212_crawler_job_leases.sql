@@ -0,0 +1,145 @@
+-- Protocol F-01: Job Leases for crawler_jobs
+-- A claimed job holds a lease (lease_expires_at) that the worker extends with heartbeats.
+-- The domain lock only counts live leases; jobs whose lease expired (crashed or hung
+-- worker) are put back to 'pending' (or 'dead' after max_retries) by reap_expired_jobs.
+-- Replaces the fixed 1-hour started_at window of fetch_next_job.
+
+alter table public.crawler_jobs
+add column if not exists lease_expires_at timestamptz;
+
+alter table public.crawler_jobs
+add column if not exists heartbeat_at timestamptz;
+
+-- Jobs that are already running keep the old 1-hour window
+update public.crawler_jobs
+set lease_expires_at = coalesce(started_at, now()) + interval '1 hour'
+where status = 'processing'
+and lease_expires_at is null;
+
+-- Indexes: domain lock lookup and reaper scan only touch running jobs
+create index if not exists idx_crawler_jobs_processing_domain
+on public.crawler_jobs (domain, lease_expires_at)
+where status = 'processing';
+
+create index if not exists idx_crawler_jobs_processing_lease
+on public.crawler_jobs (lease_expires_at)
+where status = 'processing';
+
+create index if not exists idx_crawler_jobs_pending_created
+on public.crawler_jobs (created_at)
+where status = 'pending';
+
+-- FUNCTION: Atomic Fetch with Lease
+-- "Give me the next job, BUT only if no other worker holds a live lease on this domain"
+drop function if exists public.fetch_next_job(text);
+
+create or replace function public.fetch_next_job(p_worker_id text, p_lease_seconds int default 120)
+returns table (
+    j_id uuid,
+    j_type text,
+    j_payload jsonb,
+    j_lease_expires_at timestamptz
+)
+language plpgsql
+as $$
+declare
+    v_job_id uuid;
+begin
+    -- 1. Identify a candidate job
+    --   a) Status is pending
+    --   b) Its domain is NOT leased by another worker (expired leases don't count)
+    select id into v_job_id
+    from public.crawler_jobs j
+    where status = 'pending'
+    and (
+        domain is null
+        or
+        not exists (
+            select 1
+            from public.crawler_jobs p
+            where p.status = 'processing'
+            and p.domain = j.domain
+            and p.lease_expires_at > now()
+        )
+    )
+    order by created_at asc
+    limit 1
+    for update skip locked; -- Atomic Lock!
+
+    -- 2. Claim the job
+    if v_job_id is not null then
+        update public.crawler_jobs
+        set
+            status = 'processing',
+            worker_id = p_worker_id,
+            started_at = now(),
+            heartbeat_at = now(),
+            lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+        where id = v_job_id;
+
+        return query
+        select id, type, payload, lease_expires_at
+        from public.crawler_jobs
+        where id = v_job_id;
+    end if;
+
+    return;
+end;
+$$;
+
+-- FUNCTION: Heartbeat
+-- Extends the lease of a running job. Returns false if the worker no longer owns the job
+-- (lease expired and reaped, possibly claimed by another worker): the caller must stop.
+create or replace function public.heartbeat_job(p_job_id uuid, p_worker_id text, p_lease_seconds int default 120)
+returns boolean
+language plpgsql
+as $$
+begin
+    update public.crawler_jobs
+    set
+        heartbeat_at = now(),
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+    where id = p_job_id
+    and worker_id = p_worker_id
+    and status = 'processing';
+
+    return found;
+end;
+$$;
+
+-- FUNCTION: Reaper
+-- Re-queues running jobs whose lease expired. Counts as a retry, so a job that keeps
+-- killing its worker ends up in the DLQ. Safe to call from every worker concurrently.
+create or replace function public.reap_expired_jobs(p_limit int default 100)
+returns table (
+    j_id uuid,
+    j_status job_status,
+    j_worker_id text
+)
+language sql
+as $$
+    with expired as (
+        select id, worker_id
+        from public.crawler_jobs
+        where status = 'processing'
+        and coalesce(lease_expires_at, started_at + interval '1 hour', created_at) < now()
+        order by lease_expires_at nulls first
+        limit p_limit
+        for update skip locked
+    )
+    update public.crawler_jobs j
+    set
+        status = case when j.retries + 1 >= j.max_retries then 'dead'::job_status else 'pending'::job_status end,
+        retries = j.retries + 1,
+        error_log = trim(both E'\n' from
+            coalesce(j.error_log, '')
+            || E'\n[Retry ' || (j.retries + 1) || '] Lease expired (worker ' || coalesce(e.worker_id, '?') || ')'),
+        completed_at = case when j.retries + 1 >= j.max_retries then now() end,
+        worker_id = null,
+        started_at = null,
+        heartbeat_at = null,
+        lease_expires_at = null
+    from expired e
+    where j.id = e.id
+    returning j.id, j.status, e.worker_id;
+$$;
@@ -0,0 +1,164 @@
+-- Protocol F-01: Delayed Retries for crawler_jobs
+-- A failed job is not retried immediately but after an exponential backoff with jitter
+-- (run_after). fail_job does the retry/DLQ transition in one atomic statement,
+-- replacing the read-then-write of JobQueue.fail. The reaper uses the same backoff.
+
+alter table public.crawler_jobs
+add column if not exists run_after timestamptz; -- null = runnable immediately
+
+create index if not exists idx_crawler_jobs_pending_run_after
+on public.crawler_jobs (run_after)
+where status = 'pending';
+
+-- FUNCTION: Retry Delay
+-- base * 2^retries, capped at p_max_seconds, with "equal jitter" (50-100% of the delay)
+-- so jobs of one flaky server don't come back in lockstep.
+create or replace function public.job_retry_delay(
+    p_retries int,
+    p_base_seconds int default 30,
+    p_max_seconds int default 3600
+)
+returns interval
+language sql
+volatile
+as $$
+    select make_interval(secs =>
+        least(p_max_seconds::float8, p_base_seconds * power(2::float8, greatest(p_retries, 0)))
+        * (0.5 + random() * 0.5)
+    );
+$$;
+
+-- FUNCTION: Atomic Fetch with Lease (now honors run_after)
+create or replace function public.fetch_next_job(p_worker_id text, p_lease_seconds int default 120)
+returns table (
+    j_id uuid,
+    j_type text,
+    j_payload jsonb,
+    j_lease_expires_at timestamptz
+)
+language plpgsql
+as $$
+declare
+    v_job_id uuid;
+begin
+    -- 1. Identify a candidate job
+    --   a) Status is pending and its backoff (run_after) has passed
+    --   b) Its domain is NOT leased by another worker (expired leases don't count)
+    select id into v_job_id
+    from public.crawler_jobs j
+    where status = 'pending'
+    and (run_after is null or run_after <= now())
+    and (
+        domain is null
+        or
+        not exists (
+            select 1
+            from public.crawler_jobs p
+            where p.status = 'processing'
+            and p.domain = j.domain
+            and p.lease_expires_at > now()
+        )
+    )
+    order by created_at asc
+    limit 1
+    for update skip locked; -- Atomic Lock!
+
+    -- 2. Claim the job
+    if v_job_id is not null then
+        update public.crawler_jobs
+        set
+            status = 'processing',
+            worker_id = p_worker_id,
+            started_at = now(),
+            heartbeat_at = now(),
+            lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+        where id = v_job_id;
+
+        return query
+        select id, type, payload, lease_expires_at
+        from public.crawler_jobs
+        where id = v_job_id;
+    end if;
+
+    return;
+end;
+$$;
+
+-- FUNCTION: Atomic Fail
+-- retries + 1 < max_retries: back to 'pending' with run_after = now() + backoff
+-- otherwise:                 'dead' (DLQ)
+-- Only applies while p_worker_id owns the running job (a reaped job is left alone).
+-- Returns no row if nothing was updated.
+create or replace function public.fail_job(
+    p_job_id uuid,
+    p_worker_id text,
+    p_error text,
+    p_base_delay_seconds int default 30,
+    p_max_delay_seconds int default 3600
+)
+returns table (
+    j_status job_status,
+    j_retries int,
+    j_run_after timestamptz
+)
+language sql
+as $$
+    update public.crawler_jobs j
+    set
+        status = case when j.retries + 1 >= j.max_retries then 'dead'::job_status else 'pending'::job_status end,
+        retries = j.retries + 1,
+        error_log = trim(both E'\n' from
+            coalesce(j.error_log, '') || E'\n[Retry ' || (j.retries + 1) || '] ' || coalesce(p_error, '')),
+        run_after = case
+            when j.retries + 1 >= j.max_retries then null
+            else now() + public.job_retry_delay(j.retries, p_base_delay_seconds, p_max_delay_seconds)
+        end,
+        completed_at = case when j.retries + 1 >= j.max_retries then now() end,
+        worker_id = null,
+        started_at = null,
+        heartbeat_at = null,
+        lease_expires_at = null
+    where j.id = p_job_id
+    and j.status = 'processing'
+    and (p_worker_id is null or j.worker_id = p_worker_id)
+    returning j.status, j.retries, j.run_after;
+$$;
+
+-- FUNCTION: Reaper (expired leases are retried with the same backoff)
+create or replace function public.reap_expired_jobs(p_limit int default 100)
+returns table (
+    j_id uuid,
+    j_status job_status,
+    j_worker_id text
+)
+language sql
+as $$
+    with expired as (
+        select id, worker_id
+        from public.crawler_jobs
+        where status = 'processing'
+        and coalesce(lease_expires_at, started_at + interval '1 hour', created_at) < now()
+        order by lease_expires_at nulls first
+        limit p_limit
+        for update skip locked
+    )
+    update public.crawler_jobs j
+    set
+        status = case when j.retries + 1 >= j.max_retries then 'dead'::job_status else 'pending'::job_status end,
+        retries = j.retries + 1,
+        error_log = trim(both E'\n' from
+            coalesce(j.error_log, '')
+            || E'\n[Retry ' || (j.retries + 1) || '] Lease expired (worker ' || coalesce(e.worker_id, '?') || ')'),
+        run_after = case
+            when j.retries + 1 >= j.max_retries then null
+            else now() + public.job_retry_delay(j.retries)
+        end,
+        completed_at = case when j.retries + 1 >= j.max_retries then now() end,
+        worker_id = null,
+        started_at = null,
+        heartbeat_at = null,
+        lease_expires_at = null
+    from expired e
+    where j.id = e.id
+    returning j.id, j.status, e.worker_id;
+$$;
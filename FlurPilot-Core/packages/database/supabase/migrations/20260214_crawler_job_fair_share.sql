@@ -0,0 +1,195 @@
+-- Protocol F-01: Priority Classes and Fair-Share Scheduling for crawler_jobs
+-- Replaces strict FIFO in fetch_next_job:
+--   1. Priority classes (lower = more urgent):
+--        0 interactive (dashboard parcel requests), 1 normal (crawls), 2 bulk (seeding, regions)
+--      Jobs waiting longer than p_aging_seconds move up one class per interval, but never
+--      into the interactive class, so bulk work still progresses under a steady crawl load.
+--   2. Within a class: weighted fair share between groups (job type x tenant) by stride
+--      scheduling. Each claim advances the group's pass by 1 / weight; the group with the
+--      lowest pass goes next. weight = type weight * tenant weight (job_share_weights).
+--   3. Within a group: FIFO by created_at.
+-- tenant: customer or region key (e.g. 'land:09' for Bavarian crawls); null = shared group.
+
+alter table public.crawler_jobs
+add column if not exists priority smallint not null default 1;
+
+alter table public.crawler_jobs
+add column if not exists tenant text;
+
+-- Group discovery is an index-only scan over pending jobs
+create index if not exists idx_crawler_jobs_pending_groups
+on public.crawler_jobs (priority, type, (coalesce(tenant, '')), created_at)
+where status = 'pending';
+
+-- Weights (default 1 when missing)
+create table if not exists public.job_share_weights (
+    kind text not null check (kind in ('type', 'tenant')),
+    key text not null,
+    weight float8 not null default 1 check (weight > 0),
+    updated_at timestamptz not null default now(),
+    constraint job_share_weights_pkey primary key (kind, key)
+);
+
+insert into public.job_share_weights (kind, key, weight) values
+    ('type', 'calculate_parcel', 4),
+    ('type', 'crawl_profile', 2),
+    ('type', 'precompute_region', 1)
+on conflict (kind, key) do nothing;
+
+-- Stride state per group
+create table if not exists public.job_fair_share (
+    type text not null,
+    tenant text not null default '',
+    pass float8 not null default 0,
+    claimed bigint not null default 0,
+    last_claim_at timestamptz,
+    constraint job_fair_share_pkey primary key (type, tenant)
+);
+
+alter table public.job_share_weights enable row level security;
+create policy "Workers can access share weights" on public.job_share_weights for all using (true);
+
+alter table public.job_fair_share enable row level security;
+create policy "Workers can access fair share state" on public.job_fair_share for all using (true);
+
+-- FUNCTION: Atomic Fetch with Lease, Priority and Fair Share
+drop function if exists public.fetch_next_job(text, int);
+
+create or replace function public.fetch_next_job(
+    p_worker_id text,
+    p_lease_seconds int default 120,
+    p_aging_seconds int default 900
+)
+returns table (
+    j_id uuid,
+    j_type text,
+    j_payload jsonb,
+    j_lease_expires_at timestamptz
+)
+language plpgsql
+as $$
+declare
+    v_group record;
+    v_job_id uuid;
+begin
+    -- 1. Candidate groups, best first. Groups idle for 10+ minutes re-enter at the
+    --    lowest pass of the active groups instead of cashing in their old credit.
+    for v_group in
+        with groups as (
+            select j.priority, j.type, coalesce(j.tenant, '') as tenant, min(j.created_at) as oldest
+            from public.crawler_jobs j
+            where j.status = 'pending'
+            group by j.priority, j.type, coalesce(j.tenant, '')
+        ),
+        scored as (
+            select g.priority,
+                   g.type,
+                   g.tenant,
+                   g.oldest,
+                   least(
+                       g.priority,
+                       greatest(1, g.priority - floor(extract(epoch from now() - g.oldest) / greatest(p_aging_seconds, 1))::int)
+                   ) as effective_priority,
+                   s.pass,
+                   s.last_claim_at,
+                   coalesce(wt.weight, 1) * coalesce(wn.weight, 1) as weight
+            from groups g
+            left join public.job_fair_share s on s.type = g.type and s.tenant = g.tenant
+            left join public.job_share_weights wt on wt.kind = 'type' and wt.key = g.type
+            left join public.job_share_weights wn on wn.kind = 'tenant' and wn.key = g.tenant
+        ),
+        floor_pass as (
+            select coalesce(
+                min(pass) filter (where last_claim_at > now() - interval '10 minutes'),
+                min(pass),
+                0
+            ) as value
+            from scored
+        )
+        select sc.priority,
+               sc.type,
+               sc.tenant,
+               sc.weight,
+               greatest(coalesce(sc.pass, f.value), f.value) as effective_pass
+        from scored sc
+        cross join floor_pass f
+        order by sc.effective_priority, effective_pass, sc.oldest
+    loop
+        -- 2. Oldest runnable job of the group (backoff passed, domain not leased)
+        select j.id into v_job_id
+        from public.crawler_jobs j
+        where j.status = 'pending'
+        and j.priority = v_group.priority
+        and j.type = v_group.type
+        and coalesce(j.tenant, '') = v_group.tenant
+        and (j.run_after is null or j.run_after <= now())
+        and (
+            j.domain is null
+            or
+            not exists (
+                select 1
+                from public.crawler_jobs p
+                where p.status = 'processing'
+                and p.domain = j.domain
+                and p.lease_expires_at > now()
+            )
+        )
+        order by j.created_at asc
+        limit 1
+        for update skip locked; -- Atomic Lock!
+
+        exit when v_job_id is not null;
+    end loop;
+
+    if v_job_id is null then
+        return;
+    end if;
+
+    -- 3. Claim the job
+    update public.crawler_jobs
+    set
+        status = 'processing',
+        worker_id = p_worker_id,
+        started_at = now(),
+        heartbeat_at = now(),
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+    where id = v_job_id;
+
+    -- 4. Advance the group's pass
+    insert into public.job_fair_share as s (type, tenant, pass, claimed, last_claim_at)
+    values (v_group.type, v_group.tenant, v_group.effective_pass + 1.0 / v_group.weight, 1, now())
+    on conflict (type, tenant) do update
+    set
+        pass = excluded.pass,
+        claimed = s.claimed + 1,
+        last_claim_at = now();
+
+    return query
+    select id, type, payload, lease_expires_at
+    from public.crawler_jobs
+    where id = v_job_id;
+end;
+$$;
+
+-- VIEW: Queue Overview (per priority class and group)
+create or replace view public.crawler_queue_overview as
+select
+    j.priority,
+    j.type,
+    coalesce(j.tenant, '') as tenant,
+    count(*) filter (where j.status = 'pending') as pending,
+    count(*) filter (where j.status = 'pending' and j.run_after > now()) as backing_off,
+    count(*) filter (where j.status = 'processing') as processing,
+    count(*) filter (where j.status = 'dead') as dead,
+    min(j.created_at) filter (where j.status = 'pending') as oldest_pending,
+    coalesce(wt.weight, 1) * coalesce(wn.weight, 1) as weight,
+    s.pass,
+    s.claimed,
+    s.last_claim_at
+from public.crawler_jobs j
+left join public.job_fair_share s on s.type = j.type and s.tenant = coalesce(j.tenant, '')
+left join public.job_share_weights wt on wt.kind = 'type' and wt.key = j.type
+left join public.job_share_weights wn on wn.kind = 'tenant' and wn.key = coalesce(j.tenant, '')
+where j.status in ('pending', 'processing', 'dead')
+group by j.priority, j.type, coalesce(j.tenant, ''), wt.weight, wn.weight, s.pass, s.claimed, s.last_claim_at
+order by j.priority, j.type, coalesce(j.tenant, '');
@@ -0,0 +1,224 @@
+-- Protocol F-01: Capability-based Job Routing
+-- Workers advertise what they can run (worker_registry); job types declare what they need
+-- (job_type_requirements). fetch_next_job only hands out job types whose required
+-- capabilities and memory the claiming worker has. This allows cheap IO-only pollers
+-- next to a few large OCR/NER workers.
+-- Capabilities: 'ocr', 'ner', 'rust_engine' (see apps/worker/capabilities.py).
+-- Workers that pass no capabilities (p_capabilities null) claim every job type.
+
+create table if not exists public.worker_registry (
+    worker_id text not null,
+    capabilities text[] not null default '{}',
+    max_memory_mb int,
+    hostname text,
+    started_at timestamptz not null default now(),
+    last_seen_at timestamptz not null default now(),
+    constraint worker_registry_pkey primary key (worker_id)
+);
+
+create table if not exists public.job_type_requirements (
+    type text not null,
+    capabilities text[] not null default '{}',
+    min_memory_mb int not null default 0,
+    updated_at timestamptz not null default now(),
+    constraint job_type_requirements_pkey primary key (type)
+);
+
+-- Types without a row have no requirements
+insert into public.job_type_requirements (type, capabilities, min_memory_mb) values
+    ('crawl_profile', '{ner}', 1024),           -- redacts titles/summaries (spaCy de_core_news_lg)
+    ('calculate_parcel', '{}', 0),              -- falls back to PostGIS without the Rust engine
+    ('precompute_region', '{rust_engine}', 2048)
+on conflict (type) do nothing;
+
+alter table public.worker_registry enable row level security;
+create policy "Workers can access worker registry" on public.worker_registry for all using (true);
+
+alter table public.job_type_requirements enable row level security;
+create policy "Workers can access job type requirements" on public.job_type_requirements for all using (true);
+
+-- FUNCTION: Register / Keep-alive
+create or replace function public.register_worker(
+    p_worker_id text,
+    p_capabilities text[] default null,
+    p_max_memory_mb int default null,
+    p_hostname text default null
+)
+returns void
+language sql
+as $$
+    insert into public.worker_registry (worker_id, capabilities, max_memory_mb, hostname)
+    values (p_worker_id, coalesce(p_capabilities, '{}'), p_max_memory_mb, p_hostname)
+    on conflict (worker_id) do update
+    set
+        capabilities = excluded.capabilities,
+        max_memory_mb = excluded.max_memory_mb,
+        hostname = excluded.hostname,
+        last_seen_at = now();
+$$;
+
+-- FUNCTION: Atomic Fetch with Lease, Priority, Fair Share and Capability Routing
+drop function if exists public.fetch_next_job(text, int, int);
+
+create or replace function public.fetch_next_job(
+    p_worker_id text,
+    p_lease_seconds int default 120,
+    p_aging_seconds int default 900,
+    p_capabilities text[] default null,
+    p_max_memory_mb int default null
+)
+returns table (
+    j_id uuid,
+    j_type text,
+    j_payload jsonb,
+    j_lease_expires_at timestamptz
+)
+language plpgsql
+as $$
+declare
+    v_group record;
+    v_job_id uuid;
+begin
+    -- 1. Candidate groups this worker may run, best first. Groups idle for 10+ minutes
+    --    re-enter at the lowest pass of the active groups.
+    for v_group in
+        with groups as (
+            select j.priority, j.type, coalesce(j.tenant, '') as tenant, min(j.created_at) as oldest
+            from public.crawler_jobs j
+            where j.status = 'pending'
+            group by j.priority, j.type, coalesce(j.tenant, '')
+        ),
+        routable as (
+            select g.*
+            from groups g
+            where not exists (
+                select 1
+                from public.job_type_requirements r
+                where r.type = g.type
+                and (
+                    (p_capabilities is not null and not (r.capabilities <@ p_capabilities))
+                    or (p_max_memory_mb is not null and r.min_memory_mb > p_max_memory_mb)
+                )
+            )
+        ),
+        scored as (
+            select g.priority,
+                   g.type,
+                   g.tenant,
+                   g.oldest,
+                   least(
+                       g.priority,
+                       greatest(1, g.priority - floor(extract(epoch from now() - g.oldest) / greatest(p_aging_seconds, 1))::int)
+                   ) as effective_priority,
+                   s.pass,
+                   s.last_claim_at,
+                   coalesce(wt.weight, 1) * coalesce(wn.weight, 1) as weight
+            from routable g
+            left join public.job_fair_share s on s.type = g.type and s.tenant = g.tenant
+            left join public.job_share_weights wt on wt.kind = 'type' and wt.key = g.type
+            left join public.job_share_weights wn on wn.kind = 'tenant' and wn.key = g.tenant
+        ),
+        floor_pass as (
+            select coalesce(
+                min(pass) filter (where last_claim_at > now() - interval '10 minutes'),
+                min(pass),
+                0
+            ) as value
+            from scored
+        )
+        select sc.priority,
+               sc.type,
+               sc.tenant,
+               sc.weight,
+               greatest(coalesce(sc.pass, f.value), f.value) as effective_pass
+        from scored sc
+        cross join floor_pass f
+        order by sc.effective_priority, effective_pass, sc.oldest
+    loop
+        -- 2. Oldest runnable job of the group (backoff passed, domain not leased)
+        select j.id into v_job_id
+        from public.crawler_jobs j
+        where j.status = 'pending'
+        and j.priority = v_group.priority
+        and j.type = v_group.type
+        and coalesce(j.tenant, '') = v_group.tenant
+        and (j.run_after is null or j.run_after <= now())
+        and (
+            j.domain is null
+            or
+            not exists (
+                select 1
+                from public.crawler_jobs p
+                where p.status = 'processing'
+                and p.domain = j.domain
+                and p.lease_expires_at > now()
+            )
+        )
+        order by j.created_at asc
+        limit 1
+        for update skip locked; -- Atomic Lock!
+
+        exit when v_job_id is not null;
+    end loop;
+
+    if v_job_id is null then
+        return;
+    end if;
+
+    -- 3. Claim the job
+    update public.crawler_jobs
+    set
+        status = 'processing',
+        worker_id = p_worker_id,
+        started_at = now(),
+        heartbeat_at = now(),
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+    where id = v_job_id;
+
+    -- 4. Advance the group's pass
+    insert into public.job_fair_share as s (type, tenant, pass, claimed, last_claim_at)
+    values (v_group.type, v_group.tenant, v_group.effective_pass + 1.0 / v_group.weight, 1, now())
+    on conflict (type, tenant) do update
+    set
+        pass = excluded.pass,
+        claimed = s.claimed + 1,
+        last_claim_at = now();
+
+    return query
+    select id, type, payload, lease_expires_at
+    from public.crawler_jobs
+    where id = v_job_id;
+end;
+$$;
+
+-- VIEW: Routing Overview
+-- Per job type with pending work: requirements and how many live workers (seen within
+-- 5 minutes) can run it. capable_workers = 0 means the backlog is stuck.
+create or replace view public.crawler_job_routing as
+with pending as (
+    select type, count(*) as pending
+    from public.crawler_jobs
+    where status = 'pending'
+    group by type
+),
+types as (
+    select type from pending
+    union
+    select type from public.job_type_requirements
+)
+select
+    t.type,
+    coalesce(r.capabilities, '{}') as required_capabilities,
+    coalesce(r.min_memory_mb, 0) as min_memory_mb,
+    coalesce(p.pending, 0) as pending,
+    (
+        select count(*)
+        from public.worker_registry w
+        where w.last_seen_at > now() - interval '5 minutes'
+        and coalesce(r.capabilities, '{}') <@ w.capabilities
+        and (w.max_memory_mb is null or coalesce(r.min_memory_mb, 0) <= w.max_memory_mb)
+    ) as capable_workers
+from types t
+left join public.job_type_requirements r on r.type = t.type
+left join pending p on p.type = t.type
+order by t.type;
@@ -0,0 +1,47 @@
+-- Protocol F-01: Crawl Pipeline Jobs
+-- crawl_profile is split into chained job types, each with its own payload and retries:
+--   list_papers -> fetch_document -> extract_text -> redact_document -> index_document
+-- (see apps/worker/crawl_pipeline.py). Legacy 'crawl_profile' jobs run as list_papers.
+
+-- 1. Idempotent enqueueing: at most one live job per dedup_key (e.g. 'fetch_document:<paper>'),
+--    so a retried list_papers step does not fan out the same papers twice.
+alter table public.crawler_jobs
+add column if not exists dedup_key text;
+
+create unique index if not exists idx_crawler_jobs_dedup_key_live
+on public.crawler_jobs (dedup_key)
+where dedup_key is not null
+and status in ('pending', 'processing');
+
+-- 2. Private bucket for intermediate artifacts (raw PDFs, unredacted text).
+--    Only the service role (worker) reads/writes it; files are removed by the next step.
+insert into storage.buckets (id, name, public)
+values ('crawler-documents', 'crawler-documents', false)
+on conflict (id) do nothing;
+
+-- 3. Routing: IO-only pollers list and download, OCR workers extract, NER workers redact
+insert into public.job_type_requirements (type, capabilities, min_memory_mb) values
+    ('list_papers', '{}', 0),
+    ('fetch_document', '{}', 0),
+    ('extract_text', '{ocr}', 1024),
+    ('redact_document', '{ner}', 1024),
+    ('index_document', '{}', 0)
+on conflict (type) do update
+set
+    capabilities = excluded.capabilities,
+    min_memory_mb = excluded.min_memory_mb,
+    updated_at = now();
+
+-- Legacy crawl_profile jobs now only list papers
+update public.job_type_requirements
+set capabilities = '{}', min_memory_mb = 0, updated_at = now()
+where type = 'crawl_profile';
+
+-- 4. Fair share: later steps weigh more, so started documents drain before new listings
+insert into public.job_share_weights (kind, key, weight) values
+    ('type', 'list_papers', 2),
+    ('type', 'fetch_document', 3),
+    ('type', 'extract_text', 3),
+    ('type', 'redact_document', 4),
+    ('type', 'index_document', 6)
+on conflict (kind, key) do nothing;
@@ -0,0 +1,259 @@
+-- Protocol F-01: Archival of finished crawler_jobs
+-- The hot queue table only holds live work: completed/dead jobs are moved after N days
+-- to crawler_jobs_history (monthly range partitions, compact rows) and counted into
+-- crawler_jobs_daily (rollups, kept forever). Old history partitions can be dropped
+-- without losing the statistics.
+
+-- 1. History (partitioned by finish time)
+create table if not exists public.crawler_jobs_history (
+    id uuid not null,
+    type text not null,
+    status job_status not null,
+    domain text,
+    tenant text,
+    priority smallint,
+    retries int not null default 0,
+    worker_id text,
+    dedup_key text,
+    created_at timestamptz not null,
+    started_at timestamptz,
+    finished_at timestamptz not null,
+    duration_ms bigint,
+    -- Kept for dead jobs only (debugging the DLQ); completed jobs stay compact
+    payload jsonb,
+    error_log text,
+    archived_at timestamptz not null default now(),
+    constraint crawler_jobs_history_pkey primary key (id, finished_at)
+) partition by range (finished_at);
+
+-- Safety net for rows outside the monthly partitions
+create table if not exists public.crawler_jobs_history_default
+partition of public.crawler_jobs_history default;
+
+create index if not exists idx_crawler_jobs_history_type_finished
+on public.crawler_jobs_history (type, finished_at);
+
+alter table public.crawler_jobs_history enable row level security;
+create policy "Workers can access job history" on public.crawler_jobs_history for all using (true);
+
+-- 2. Daily rollups
+create table if not exists public.crawler_jobs_daily (
+    day date not null,
+    type text not null,
+    tenant text not null default '',
+    status job_status not null,
+    jobs bigint not null default 0,
+    retries bigint not null default 0,
+    total_duration_ms bigint not null default 0,
+    max_duration_ms bigint not null default 0,
+    constraint crawler_jobs_daily_pkey primary key (day, type, tenant, status)
+);
+
+alter table public.crawler_jobs_daily enable row level security;
+create policy "Workers can access job rollups" on public.crawler_jobs_daily for all using (true);
+
+-- FUNCTION: Monthly Partition
+-- CREATE TABLE ... PARTITION OF requires owning the parent table, which the service role
+-- (PostgREST) does not: runs as the migration owner, callable by service_role only.
+create or replace function public.ensure_crawler_jobs_history_partition(p_month date)
+returns text
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_start date := date_trunc('month', p_month)::date;
+    v_name text := 'crawler_jobs_history_' || to_char(p_month, 'YYYY_MM');
+begin
+    if to_regclass('public.' || v_name) is null then
+        begin
+            execute format(
+                'create table public.%I partition of public.crawler_jobs_history for values from (%L) to (%L)',
+                v_name, v_start, (v_start + interval '1 month')::date
+            );
+        exception when duplicate_table then
+            -- Another worker created it concurrently
+            null;
+        end;
+    end if;
+    return v_name;
+end;
+$$;
+
+revoke execute on function public.ensure_crawler_jobs_history_partition(date) from public, anon, authenticated;
+grant execute on function public.ensure_crawler_jobs_history_partition(date) to service_role;
+
+-- Partitions for the months already in the queue and the next one, created up front
+do $$
+declare
+    v_month date;
+begin
+    for v_month in
+        select generate_series(
+            date_trunc('month', coalesce((select min(created_at) from public.crawler_jobs), now())),
+            date_trunc('month', now() + interval '1 month'),
+            interval '1 month'
+        )::date
+    loop
+        perform public.ensure_crawler_jobs_history_partition(v_month);
+    end loop;
+end;
+$$;
+
+-- FUNCTION: Archive
+-- Moves up to p_batch finished jobs older than p_older_than_days into the history and
+-- the rollups, in one transaction. Returns the number of archived jobs; call repeatedly
+-- until 0 to drain a large backlog. Safe to run concurrently (SKIP LOCKED).
+create or replace function public.archive_crawler_jobs(
+    p_older_than_days int default 7,
+    p_batch int default 5000
+)
+returns int
+language plpgsql
+as $$
+declare
+    v_month date;
+    v_count int;
+begin
+    -- Partitions for the months about to be archived (avoids filling the default partition)
+    for v_month in
+        select distinct date_trunc('month', coalesce(completed_at, created_at))::date
+        from public.crawler_jobs
+        where status in ('completed', 'dead', 'failed')
+        and coalesce(completed_at, created_at) < now() - make_interval(days => p_older_than_days)
+    loop
+        perform public.ensure_crawler_jobs_history_partition(v_month);
+    end loop;
+
+    with candidates as (
+        select id
+        from public.crawler_jobs
+        where status in ('completed', 'dead', 'failed')
+        and coalesce(completed_at, created_at) < now() - make_interval(days => p_older_than_days)
+        order by coalesce(completed_at, created_at)
+        limit p_batch
+        for update skip locked
+    ),
+    moved as (
+        delete from public.crawler_jobs j
+        using candidates c
+        where j.id = c.id
+        returning j.*
+    ),
+    history as (
+        insert into public.crawler_jobs_history (
+            id, type, status, domain, tenant, priority, retries, worker_id, dedup_key,
+            created_at, started_at, finished_at, duration_ms, payload, error_log
+        )
+        select
+            m.id, m.type, m.status, m.domain, m.tenant, m.priority, m.retries, m.worker_id, m.dedup_key,
+            m.created_at, m.started_at, coalesce(m.completed_at, m.created_at),
+            (extract(epoch from m.completed_at - m.started_at) * 1000)::bigint,
+            case when m.status = 'completed' then null else m.payload end,
+            case when m.status = 'completed' then null else m.error_log end
+        from moved m
+        returning 1
+    ),
+    rollup as (
+        insert into public.crawler_jobs_daily as d (
+            day, type, tenant, status, jobs, retries, total_duration_ms, max_duration_ms
+        )
+        select
+            coalesce(m.completed_at, m.created_at)::date,
+            m.type,
+            coalesce(m.tenant, ''),
+            m.status,
+            count(*),
+            sum(m.retries),
+            coalesce(sum((extract(epoch from m.completed_at - m.started_at) * 1000)::bigint), 0),
+            coalesce(max((extract(epoch from m.completed_at - m.started_at) * 1000)::bigint), 0)
+        from moved m
+        group by 1, 2, 3, 4
+        on conflict (day, type, tenant, status) do update
+        set
+            jobs = d.jobs + excluded.jobs,
+            retries = d.retries + excluded.retries,
+            total_duration_ms = d.total_duration_ms + excluded.total_duration_ms,
+            max_duration_ms = greatest(d.max_duration_ms, excluded.max_duration_ms)
+        returning 1
+    )
+    select count(*) into v_count from history;
+
+    return v_count;
+end;
+$$;
+
+-- FUNCTION: History Retention (rollups are kept)
+-- Dropping partitions also needs table ownership: same privileges as the partition helper.
+create or replace function public.drop_crawler_jobs_history_partitions(p_keep_months int default 12)
+returns int
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_partition record;
+    v_dropped int := 0;
+begin
+    for v_partition in
+        select c.relname
+        from pg_inherits i
+        join pg_class c on c.oid = i.inhrelid
+        where i.inhparent = 'public.crawler_jobs_history'::regclass
+        and c.relname ~ '^crawler_jobs_history_\d{4}_\d{2}$'
+        and to_date(substring(c.relname from '\d{4}_\d{2}$'), 'YYYY_MM')
+            < date_trunc('month', now() - make_interval(months => p_keep_months))
+    loop
+        execute format('drop table public.%I', v_partition.relname);
+        v_dropped := v_dropped + 1;
+    end loop;
+    return v_dropped;
+end;
+$$;
+
+revoke execute on function public.drop_crawler_jobs_history_partitions(int) from public, anon, authenticated;
+grant execute on function public.drop_crawler_jobs_history_partitions(int) to service_role;
+
+-- 3. Hot table indexes: only live rows are indexed
+-- The full status/domain indexes grew with every finished job; the claim path uses the
+-- partial indexes of the lease / fair-share migrations.
+drop index if exists public.idx_crawler_jobs_status;
+drop index if exists public.idx_crawler_jobs_domain;
+
+create index if not exists idx_crawler_jobs_live_status
+on public.crawler_jobs (status, type)
+where status in ('pending', 'processing');
+
+-- Producer dedup check: payload @> {"id": ...} on live jobs
+create index if not exists idx_crawler_jobs_live_payload
+on public.crawler_jobs using gin (payload jsonb_path_ops)
+where status in ('pending', 'processing');
+
+-- Archival scan
+create index if not exists idx_crawler_jobs_finished
+on public.crawler_jobs ((coalesce(completed_at, created_at)))
+where status in ('completed', 'dead', 'failed');
+
+-- Queue rows are updated several times each (claim, heartbeats, completion): vacuum early
+-- and leave room for HOT updates so the table stays small enough to stay cached.
+alter table public.crawler_jobs set (
+    fillfactor = 80,
+    autovacuum_vacuum_scale_factor = 0.02,
+    autovacuum_analyze_scale_factor = 0.02
+);
+
+-- 4. Scheduling: pg_cron if available, otherwise the workers call archive_crawler_jobs
+--    periodically (JOB_ARCHIVE_INTERVAL_SECONDS).
+do $$
+begin
+    if exists (select 1 from pg_available_extensions where name = 'pg_cron') then
+        create extension if not exists pg_cron;
+        perform cron.schedule('archive-crawler-jobs', '17 * * * *',
+            $cron$select public.archive_crawler_jobs()$cron$);
+        perform cron.schedule('drop-crawler-jobs-history', '42 3 1 * *',
+            $cron$select public.drop_crawler_jobs_history_partitions()$cron$);
+    end if;
+exception when others then
+    raise notice 'pg_cron scheduling skipped: %', sqlerrm;
+end;
+$$;
@@ -0,0 +1,39 @@
+-- Protocol F-01: Source Versions of Evidence
+-- Change markers published by OParl, stored with each indexed paper. list_papers bulk-loads
+-- them per profile and skips papers whose Paper.modified / File.sha1Checksum / File.size
+-- are unchanged, before downloading anything (see crawl_pipeline.is_unchanged).
+
+alter table public.evidence_docs
+add column if not exists source_modified timestamptz;
+
+alter table public.evidence_docs
+add column if not exists file_sha1 text;
+
+alter table public.evidence_docs
+add column if not exists file_size bigint;
+
+-- Per-profile bulk load: index-only scan
+create index if not exists idx_evidence_docs_region_versions
+on public.evidence_docs (region_id)
+include (external_id, source_modified, file_sha1, file_size);
+
+-- Papers skipped as duplicates (same content_hash already indexed under another paper,
+-- e.g. shared Anlagen) have no evidence_docs row. Their versions are kept here and merged
+-- into the bulk load, so steady-state crawls skip them before downloading as well.
+create table if not exists public.evidence_skipped_versions (
+    external_id text not null,
+    region_id uuid,
+    content_hash text,
+    source_modified timestamptz,
+    file_sha1 text,
+    file_size bigint,
+    updated_at timestamptz not null default now(),
+    constraint evidence_skipped_versions_pkey primary key (external_id)
+);
+
+create index if not exists idx_evidence_skipped_versions_region
+on public.evidence_skipped_versions (region_id)
+include (external_id, source_modified, file_sha1, file_size);
+
+alter table public.evidence_skipped_versions enable row level security;
+create policy "Workers can access skipped versions" on public.evidence_skipped_versions for all using (true);
@@ -0,0 +1,22 @@
+-- Protocol F-01: File-level Extraction Cache
+-- OParl bodies attach the same Anlagen (File objects) to many papers. The pipeline keys
+-- each processed file by its published metadata (connectors/oparl.py file_cache_key):
+--   'sha1:<sha1Checksum>'  or  'url:<accessUrl>|<modified>|<size>'
+-- and reuses the result for every other paper with the same key: no download, no OCR.
+-- Only REDACTED output is stored here (F-03); raw text never leaves the private bucket.
+
+create table if not exists public.document_file_cache (
+    cache_key text not null,
+    content_hash text not null,          -- sha256 of the downloaded bytes (evidence_docs.content_hash)
+    summary text,                        -- redacted summary, null if the file had no text
+    file_url text,
+    file_size bigint,
+    created_at timestamptz not null default now(),
+    constraint document_file_cache_pkey primary key (cache_key)
+);
+
+create index if not exists idx_document_file_cache_content_hash
+on public.document_file_cache (content_hash);
+
+alter table public.document_file_cache enable row level security;
+create policy "Workers can access document file cache" on public.document_file_cache for all using (true);
@@ -7,10 +7,27 @@ offering significant performance improvements over pure Python solutions.
 
 from .geometry_engine import (
     calculate_virtual_parcel,
+    calculate_virtual_parcels_batch,
+    calculate_usable_area,
+    calculate_usable_area_batch,
     __version__
 )
+from .arrays import (
+    calculate_virtual_parcel_arrays,
+    pack_polygons,
+    unpack_multipolygon,
+)
 
-__all__ = ['calculate_virtual_parcel', '__version__']
+__all__ = [
+    'calculate_virtual_parcel',
+    'calculate_virtual_parcels_batch',
+    'calculate_usable_area',
+    'calculate_usable_area_batch',
+    'calculate_virtual_parcel_arrays',
+    'pack_polygons',
+    'unpack_multipolygon',
+    '__version__',
+]
 
 # Version is set by Rust
 VERSION = __version__
@@ -0,0 +1,93 @@
+"""
+Coordinate-array interface for the geometry engine.
+
+Polygons are passed as flat NumPy buffers instead of GeoJSON text:
+- coords: float64 [x0, y0, x1, y1, ...]
+- ring_offsets: int64, n_rings + 1 vertex indices
+- polygon_offsets: int64, n_polygons + 1 ring indices (first ring = exterior)
+"""
+
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from .geometry_engine import calculate_virtual_parcel_arrays_raw
+
+PolygonArrays = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def pack_polygons(geometries: Iterable[dict]) -> PolygonArrays:
+    """
+    Packs GeoJSON Polygon/MultiPolygon geometries into flat arrays.
+    Coordinates are copied straight from the nested lists, no JSON involved.
+    """
+    coords = []
+    ring_offsets = [0]
+    polygon_offsets = [0]
+    n_vertices = 0
+
+    for geometry in geometries:
+        if geometry["type"] == "Polygon":
+            polygons = [geometry["coordinates"]]
+        elif geometry["type"] == "MultiPolygon":
+            polygons = geometry["coordinates"]
+        else:
+            raise ValueError(f"Unsupported geometry type: {geometry['type']}")
+
+        for rings in polygons:
+            for ring in rings:
+                for x, y, *_ in ring:
+                    coords.append(x)
+                    coords.append(y)
+                n_vertices += len(ring)
+                ring_offsets.append(n_vertices)
+            polygon_offsets.append(len(ring_offsets) - 1)
+
+    return (
+        np.asarray(coords, dtype=np.float64),
+        np.asarray(ring_offsets, dtype=np.int64),
+        np.asarray(polygon_offsets, dtype=np.int64),
+    )
+
+
+def unpack_multipolygon(coords: np.ndarray, ring_offsets: np.ndarray, polygon_offsets: np.ndarray) -> dict:
+    """Flat arrays -> GeoJSON MultiPolygon geometry."""
+    xy = coords.reshape(-1, 2).tolist()
+    rings = [xy[ring_offsets[i]:ring_offsets[i + 1]] for i in range(len(ring_offsets) - 1)]
+    polygons = [rings[polygon_offsets[i]:polygon_offsets[i + 1]] for i in range(len(polygon_offsets) - 1)]
+    return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+def calculate_virtual_parcel_arrays(field: PolygonArrays, buildings: PolygonArrays, crs: Optional[str] = None):
+    """
+    Field block minus buildings on flat arrays.
+
+    Args:
+        field: (coords, ring_offsets, polygon_offsets) of the field block
+        buildings: (coords, ring_offsets, polygon_offsets); every polygon is one building
+        crs: e.g. "EPSG:4326" for lon/lat input (area in m²); None = planar metres
+
+    Returns:
+        ((coords, ring_offsets, polygon_offsets), net_area)
+    """
+    field_coords, field_rings, field_polygons = field
+    building_coords, building_rings, building_polygons = buildings
+
+    coords, rings, polygons, net_area = calculate_virtual_parcel_arrays_raw(
+        np.ascontiguousarray(field_coords, dtype=np.float64),
+        np.ascontiguousarray(field_rings, dtype=np.int64),
+        np.ascontiguousarray(field_polygons, dtype=np.int64),
+        np.ascontiguousarray(building_coords, dtype=np.float64),
+        np.ascontiguousarray(building_rings, dtype=np.int64),
+        np.ascontiguousarray(building_polygons, dtype=np.int64),
+        crs,
+    )
+
+    return (
+        (
+            np.frombuffer(coords, dtype=np.float64),
+            np.frombuffer(rings, dtype=np.int64),
+            np.frombuffer(polygons, dtype=np.int64),
+        ),
+        net_area,
+    )
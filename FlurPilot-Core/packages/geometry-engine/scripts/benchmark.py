@@ -76,6 +76,30 @@ def create_test_polygons(complexity="simple"):
                 ]]
             })
     
+    elif complexity.startswith("village_"):
+        # Dense village: N touching/overlapping buildings in a grid, a quarter of them
+        # outside the field block (the WFS bbox query returns those too)
+        n = int(complexity.split("_")[1])
+        field = {
+            "type": "Polygon",
+            "coordinates": [[
+                [0, 0], [3000, 0], [3000, 3000], [0, 3000], [0, 0]
+            ]]
+        }
+        side = int(n ** 0.5) + 1
+        pitch = 4000 / side
+        buildings = []
+        for i in range(n):
+            x = (i % side) * pitch
+            y = (i // side) * pitch
+            size = pitch * (1.1 if i % 4 == 0 else 0.8)  # every 4th touches its neighbour
+            buildings.append({
+                "type": "Polygon",
+                "coordinates": [[
+                    [x, y], [x+size, y], [x+size, y+size], [x, y+size], [x, y]
+                ]]
+            })
+
     else:
         raise ValueError(f"Unknown complexity: {complexity}")
     
@@ -193,6 +217,10 @@ def main():
     results.append(run_benchmark("simple", iterations=1000))
     results.append(run_benchmark("medium", iterations=500))
     results.append(run_benchmark("complex", iterations=100))
+
+    # Scaling with building count (R-tree filter + cascaded union)
+    for n in (100, 500, 1000, 2500, 5000):
+        results.append(run_benchmark(f"village_{n}", iterations=10 if n <= 1000 else 3))
     
     # Summary
     print("\n" + "="*60)
@@ -201,7 +229,7 @@ def main():
     
     for r in results:
         status = "✅" if r['speedup'] >= 10 else "⚠️" if r['speedup'] >= 5 else "❌"
-        print(f"{r['complexity']:10} | {r['speedup']:6.1f}x {status}")
+        print(f"{r['complexity']:12} | {r['rust']['mean_ms']:9.2f} ms | {r['speedup']:6.1f}x {status}")
     
     avg_speedup = statistics.mean([r['speedup'] for r in results])
     print(f"\nAverage speedup: {avg_speedup:.1f}x")
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite: Geometry Engine on realistic fixtures, end-to-end.
+
+Measures, per fixture (1 to 5000 buildings, see fixtures.py):
+- end_to_end: BavarianBypass._calculate_with_rust as the worker calls it
+  (GeoJSON -> coordinate arrays -> Rust -> GeoJSON, EPSG:4326 with UTM projection)
+- core_json:  the JSON API calculate_virtual_parcel (incl. request serialization)
+- shapely:    unary_union + difference baseline (--with-shapely)
+
+Results are written as JSON (--output) and can be compared against a previous
+run (--compare baseline.json); the exit code is 1 if a median got slower than
+--threshold or a net area changed.
+
+    python scripts/benchmark_suite.py --output bench.json
+    python scripts/benchmark_suite.py --compare bench.json --threshold 0.15
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, List, Dict, Any, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fixtures import SCALE_STEPS, synthetic_fixture, load_fixture_dir, dump_fixture
+
+WORKER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "apps", "worker"))
+
+# Medians below this are dominated by timer noise, never flag them
+NOISE_FLOOR_MS = 0.05
+AREA_TOLERANCE = 1e-6  # relative
+
+
+def time_call(fn: Callable[[], float], min_time: float, min_iterations: int = 3,
+              max_iterations: int = 1000) -> Tuple[Dict[str, float], float]:
+    """Runs fn (returns the net area) until min_time seconds or max_iterations are reached."""
+    area = fn()  # warmup
+    times = []
+    started = time.perf_counter()
+    while len(times) < max_iterations and (len(times) < min_iterations or time.perf_counter() - started < min_time):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return {
+        "iterations": len(times),
+        "median_ms": statistics.median(times),
+        "p95_ms": times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))],
+        "min_ms": times[0],
+        "mean_ms": statistics.mean(times),
+        "stdev_ms": statistics.stdev(times) if len(times) > 1 else 0.0,
+    }, area
+
+
+def make_paths(selected: List[str]) -> Dict[str, Callable[[dict, List[dict]], Callable[[], float]]]:
+    """path name -> factory(field, buildings) returning a zero-arg callable."""
+    paths = {}
+
+    if "end_to_end" in selected:
+        sys.path.insert(0, WORKER_DIR)
+        try:
+            import bavarian_bypass
+        except ImportError as e:
+            sys.exit(f"end_to_end needs the worker dependencies (apps/worker/requirements.txt): {e}")
+        if not bavarian_bypass.RUST_ENGINE_AVAILABLE:
+            sys.exit("end_to_end: geometry_engine not importable by the worker (run `make develop`)")
+        # _calculate_with_rust uses no instance state; skip __init__ (DB client, fetcher, tile cache)
+        bypass = object.__new__(bavarian_bypass.BavarianBypass)
+
+        def end_to_end(field, buildings):
+            def run():
+                result = bypass._calculate_with_rust(field, buildings)
+                if result is None:
+                    raise RuntimeError("engine returned no result")
+                return result['net_area']
+            return run
+        paths["end_to_end"] = end_to_end
+
+    if "core_json" in selected:
+        from geometry_engine import calculate_virtual_parcel
+
+        def core_json(field, buildings):
+            def run():
+                request = json.dumps({
+                    "field_block_geojson": json.dumps(field),
+                    "building_geojsons": [json.dumps(b) for b in buildings],
+                    "crs": "EPSG:4326"
+                })
+                return json.loads(calculate_virtual_parcel(request))['net_area_sqm']
+            return run
+        paths["core_json"] = core_json
+
+    if "shapely" in selected:
+        from shapely.geometry import shape
+        from shapely.ops import unary_union
+
+        def shapely_baseline(field, buildings):
+            field_shape = shape(field)
+            building_shapes = [shape(b) for b in buildings]
+
+            def run():
+                # Planar area in degrees², only the runtime is comparable
+                return field_shape.difference(unary_union(building_shapes)).area
+            return run
+        paths["shapely"] = shapely_baseline
+
+    return paths
+
+
+def vertex_count(geometry: Dict[str, Any]) -> int:
+    return sum(len(ring) for ring in geometry["coordinates"])
+
+
+def run_suite(fixtures: List[Tuple[str, dict, List[dict]]], paths: Dict[str, Callable],
+              min_time: float) -> List[Dict[str, Any]]:
+    results = []
+    for name, field, houses in fixtures:
+        print(f"\n{name}: {len(houses)} buildings, field {vertex_count(field)} vertices "
+              f"({len(field['coordinates']) - 1} holes), "
+              f"{sum(vertex_count(b) for b in houses)} building vertices")
+        for path, factory in paths.items():
+            stats, area = time_call(factory(field, houses), min_time)
+            print(f"  {path:11} median {stats['median_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+                  f"({stats['iterations']} runs)")
+            results.append({
+                "scenario": name,
+                "path": path,
+                "buildings": len(houses),
+                "field_vertices": vertex_count(field),
+                "net_area_m2": None if path == "shapely" else area,
+                **stats
+            })
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def metadata() -> Dict[str, Any]:
+    try:
+        from geometry_engine import __version__ as engine_version
+    except ImportError:
+        engine_version = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "engine_version": engine_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare_results(baseline: List[Dict[str, Any]], current: List[Dict[str, Any]],
+                    threshold: float) -> List[Dict[str, Any]]:
+    """
+    Matches results by (scenario, path). A row regresses if its median is more than
+    `threshold` (relative) slower than the baseline, or its net area changed.
+    """
+    base = {(r["scenario"], r["path"]): r for r in baseline}
+    rows = []
+    for r in current:
+        b = base.get((r["scenario"], r["path"]))
+        if b is None:
+            continue
+        ratio = r["median_ms"] / b["median_ms"] if b["median_ms"] > 0 else 1.0
+        slower = ratio > 1 + threshold and r["median_ms"] - b["median_ms"] > NOISE_FLOOR_MS
+        area_changed = (
+            r.get("net_area_m2") is not None and b.get("net_area_m2") is not None
+            and abs(r["net_area_m2"] - b["net_area_m2"]) > AREA_TOLERANCE * max(1.0, abs(b["net_area_m2"]))
+        )
+        rows.append({
+            "scenario": r["scenario"],
+            "path": r["path"],
+            "baseline_ms": b["median_ms"],
+            "current_ms": r["median_ms"],
+            "ratio": ratio,
+            "regression": slower,
+            "area_changed": area_changed,
+        })
+    return rows
+
+
+def print_comparison(rows: List[Dict[str, Any]], threshold: float) -> None:
+    print(f"\n{'=' * 72}\nCOMPARISON (threshold +{threshold:.0%})\n{'=' * 72}")
+    for row in rows:
+        status = "❌ slower" if row["regression"] else "✅"
+        if row["area_changed"]:
+            status += " ❌ area changed"
+        print(f"{row['scenario']:14} {row['path']:11} {row['baseline_ms']:9.3f} -> "
+              f"{row['current_ms']:9.3f} ms ({row['ratio']:5.2f}x) {status}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Geometry engine benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SCALE_STEPS),
+                        help="building counts of the synthetic fixtures")
+    parser.add_argument("--fixture-dir", action="append", default=[],
+                        help="real fixture (field.geojson + buildings.geojson), repeatable")
+    parser.add_argument("--paths", nargs="+", default=["end_to_end", "core_json"],
+                        choices=["end_to_end", "core_json", "shapely"])
+    parser.add_argument("--with-shapely", action="store_true", help="add the Shapely baseline")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds per measurement")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON of a previous run")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--dump-fixtures", help="write the synthetic fixtures as GeoJSON and exit")
+    args = parser.parse_args(argv)
+
+    fixtures = [(f"synthetic_{n}", *synthetic_fixture(n)) for n in args.sizes]
+    if args.dump_fixtures:
+        for name, field, houses in fixtures:
+            dump_fixture(os.path.join(args.dump_fixtures, name), field, houses)
+        print(f"Wrote {len(fixtures)} fixtures to {args.dump_fixtures}")
+        return 0
+    for path in args.fixture_dir:
+        fixtures.append((os.path.basename(os.path.normpath(path)), *load_fixture_dir(path)))
+
+    selected = args.paths + (["shapely"] if args.with_shapely and "shapely" not in args.paths else [])
+    results = run_suite(fixtures, make_paths(selected), args.min_time)
+    report = {"meta": metadata(), "results": results}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare_results(baseline["results"], results, args.threshold)
+        print_comparison(rows, args.threshold)
+        if any(row["regression"] or row["area_changed"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
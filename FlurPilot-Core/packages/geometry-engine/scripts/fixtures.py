@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Benchmark fixtures: Bavarian field blocks (Feldstücke) and building footprints (Hausumringe).
+
+The generated fixtures mimic what the WFS layers deliver around a Bavarian village,
+in EPSG:4326 (lon/lat):
+- Field blocks with several hundred vertices (digitized along hedges and roads)
+  and holes (Feldgehölze, ponds)
+- Terraced houses sharing walls (touching polygons), rotated detached houses,
+  L-shaped farm buildings and courtyard buildings with holes
+- Buildings straddling the field boundary and buildings outside the field
+  but inside its bbox (the WFS bbox query returns those too)
+
+Generation is deterministic (seeded), so results are comparable between runs.
+Exported real WFS data can be used instead, see load_fixture_dir().
+"""
+
+import json
+import math
+import os
+import random
+from typing import List, Dict, Any, Tuple
+
+# Landshut area, Niederbayern
+ORIGIN_LON = 12.15
+ORIGIN_LAT = 48.54
+# Metres per degree at ORIGIN_LAT
+M_PER_DEG_LAT = 111_200.0
+M_PER_DEG_LON = 111_320.0 * math.cos(math.radians(ORIGIN_LAT))
+
+FIELD_VERTICES = 400
+SCALE_STEPS = (1, 10, 100, 500, 1000, 2500, 5000)
+
+Ring = List[List[float]]
+
+
+def to_lonlat(x: float, y: float) -> List[float]:
+    """Local metres (relative to ORIGIN) -> [lon, lat]."""
+    return [round(ORIGIN_LON + x / M_PER_DEG_LON, 9), round(ORIGIN_LAT + y / M_PER_DEG_LAT, 9)]
+
+
+def _ring(points: List[Tuple[float, float]]) -> Ring:
+    ring = [to_lonlat(x, y) for x, y in points]
+    ring.append(ring[0])
+    return ring
+
+
+def _rotated(points: List[Tuple[float, float]], cx: float, cy: float, angle: float) -> List[Tuple[float, float]]:
+    c, s = math.cos(angle), math.sin(angle)
+    return [(cx + x * c - y * s, cy + x * s + y * c) for x, y in points]
+
+
+def _blob(rng: random.Random, cx: float, cy: float, radius: float, vertices: int,
+          jitter: float) -> List[Tuple[float, float]]:
+    """Star-shaped polygon with a smoothly varying radius (always simple)."""
+    phases = [rng.uniform(0, 2 * math.pi) for _ in range(3)]
+    points = []
+    for i in range(vertices):
+        a = 2 * math.pi * i / vertices
+        wobble = (0.5 * math.sin(3 * a + phases[0]) + 0.3 * math.sin(7 * a + phases[1])
+                  + 0.2 * math.sin(13 * a + phases[2]))
+        r = radius * (1 - jitter * (0.5 + 0.5 * wobble)) * (1 - 0.01 * rng.random())
+        points.append((cx + r * math.cos(a), cy + r * math.sin(a)))
+    return points
+
+
+def field_block(rng: random.Random, radius: float) -> Dict[str, Any]:
+    """Irregular field block of FIELD_VERTICES vertices with 2-3 holes near the centre."""
+    exterior = _ring(_blob(rng, 0.0, 0.0, radius, FIELD_VERTICES, jitter=0.25))
+    holes = []
+    for _ in range(rng.randint(2, 3)):
+        a = rng.uniform(0, 2 * math.pi)
+        d = rng.uniform(0.1, 0.4) * radius
+        points = _blob(rng, d * math.cos(a), d * math.sin(a), radius * 0.05, 24, jitter=0.3)
+        holes.append(_ring(list(reversed(points))))  # holes clockwise
+    return {"type": "Polygon", "coordinates": [exterior] + holes}
+
+
+def _house(rng: random.Random, cx: float, cy: float, angle: float) -> Dict[str, Any]:
+    w, h = rng.uniform(9, 14), rng.uniform(8, 12)
+    pts = [(-w / 2, -h / 2), (w / 2, -h / 2), (w / 2, h / 2), (-w / 2, h / 2)]
+    return {"type": "Polygon", "coordinates": [_ring(_rotated(pts, cx, cy, angle))]}
+
+
+def _l_shape(rng: random.Random, cx: float, cy: float, angle: float) -> Dict[str, Any]:
+    w, h = rng.uniform(25, 40), rng.uniform(20, 35)
+    t = rng.uniform(8, 12)
+    pts = [(0, 0), (w, 0), (w, t), (t, t), (t, h), (0, h)]
+    pts = [(x - w / 2, y - h / 2) for x, y in pts]
+    return {"type": "Polygon", "coordinates": [_ring(_rotated(pts, cx, cy, angle))]}
+
+
+def _courtyard(rng: random.Random, cx: float, cy: float, angle: float) -> Dict[str, Any]:
+    s = rng.uniform(30, 40)
+    t = rng.uniform(8, 10)
+    outer = [(-s / 2, -s / 2), (s / 2, -s / 2), (s / 2, s / 2), (-s / 2, s / 2)]
+    inner = [(-s / 2 + t, -s / 2 + t), (-s / 2 + t, s / 2 - t), (s / 2 - t, s / 2 - t), (s / 2 - t, -s / 2 + t)]
+    return {
+        "type": "Polygon",
+        "coordinates": [_ring(_rotated(outer, cx, cy, angle)), _ring(_rotated(inner, cx, cy, angle))]
+    }
+
+
+def _terrace(rng: random.Random, cx: float, cy: float, angle: float, count: int) -> List[Dict[str, Any]]:
+    """Row of houses sharing their side walls (exactly touching)."""
+    w, h = rng.uniform(6, 8), rng.uniform(9, 11)
+    x0 = -count * w / 2
+    houses = []
+    for i in range(count):
+        pts = [(x0 + i * w, -h / 2), (x0 + (i + 1) * w, -h / 2), (x0 + (i + 1) * w, h / 2), (x0 + i * w, h / 2)]
+        houses.append({"type": "Polygon", "coordinates": [_ring(_rotated(pts, cx, cy, angle))]})
+    return houses
+
+
+def buildings(rng: random.Random, n: int, radius: float) -> List[Dict[str, Any]]:
+    """n building footprints on a jittered lot grid covering the field block's bbox."""
+    extent = 2 * radius
+    lots_per_side = max(1, math.ceil(math.sqrt(n)))
+    pitch = extent / lots_per_side
+    result: List[Dict[str, Any]] = []
+    lot = 0
+    while len(result) < n:
+        i, j = lot % lots_per_side, (lot // lots_per_side) % lots_per_side
+        lot += 1
+        cx = -radius + (i + 0.5) * pitch + rng.uniform(-0.2, 0.2) * pitch
+        cy = -radius + (j + 0.5) * pitch + rng.uniform(-0.2, 0.2) * pitch
+        angle = rng.uniform(0, math.pi)
+        kind = rng.random()
+        if kind < 0.15 and n - len(result) >= 3:
+            result.extend(_terrace(rng, cx, cy, angle, min(rng.randint(3, 5), n - len(result))))
+        elif kind < 0.25:
+            result.append(_l_shape(rng, cx, cy, angle))
+        elif kind < 0.30:
+            result.append(_courtyard(rng, cx, cy, angle))
+        else:
+            result.append(_house(rng, cx, cy, angle))
+    return result[:n]
+
+
+def synthetic_fixture(n: int, seed: int = 42) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Field block + n buildings. The field grows with n (~40 m lot pitch), like a
+    village's field blocks get more buildings at the edge of settlement areas.
+    """
+    rng = random.Random(seed * 100_003 + n)
+    radius = max(300.0, 20.0 * math.sqrt(n))
+    return field_block(rng, radius), buildings(rng, n, radius)
+
+
+def _polygons(geojson: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Polygon geometries of a FeatureCollection / Feature / geometry (MultiPolygons are split)."""
+    if geojson.get("type") == "FeatureCollection":
+        return [g for f in geojson.get("features", []) for g in _polygons(f)]
+    if geojson.get("type") == "Feature":
+        return _polygons(geojson.get("geometry") or {})
+    if geojson.get("type") == "Polygon":
+        return [geojson]
+    if geojson.get("type") == "MultiPolygon":
+        return [{"type": "Polygon", "coordinates": c} for c in geojson["coordinates"]]
+    return []
+
+
+def load_fixture_dir(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Real fixture exported from the WFS layers (EPSG:4326 GeoJSON):
+    <path>/field.geojson (first polygon is used) and <path>/buildings.geojson.
+    """
+    with open(os.path.join(path, "field.geojson")) as f:
+        fields = _polygons(json.load(f))
+    with open(os.path.join(path, "buildings.geojson")) as f:
+        houses = _polygons(json.load(f))
+    if not fields:
+        raise ValueError(f"No field polygon in {path}/field.geojson")
+    return fields[0], houses
+
+
+def dump_fixture(path: str, field: Dict[str, Any], houses: List[Dict[str, Any]]) -> None:
+    """Writes a fixture in the load_fixture_dir() layout (e.g. to inspect it in QGIS)."""
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "field.geojson"), "w") as f:
+        json.dump({"type": "Feature", "properties": {}, "geometry": field}, f)
+    with open(os.path.join(path, "buildings.geojson"), "w") as f:
+        json.dump({
+            "type": "FeatureCollection",
+            "features": [{"type": "Feature", "properties": {}, "geometry": g} for g in houses]
+        }, f)
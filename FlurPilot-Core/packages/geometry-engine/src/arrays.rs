@@ -0,0 +1,134 @@
+//! Flat coordinate-array encoding of polygons (GeoArrow-style).
+//!
+//! - `coords`: interleaved x/y values `[x0, y0, x1, y1, ...]`
+//! - `ring_offsets`: `n_rings + 1` vertex indices; ring `i` is vertices `ring_offsets[i]..ring_offsets[i + 1]`
+//! - `polygon_offsets`: `n_polygons + 1` ring indices; the first ring of a polygon is its exterior
+//!
+//! This lets callers pass NumPy buffers straight through without any GeoJSON text.
+
+use geo::{Coord, LineString, MultiPolygon, Polygon};
+
+/// Flat arrays describing a set of polygons.
+#[derive(Debug, Default, Clone, PartialEq)]
+pub struct PolygonArrays {
+    pub coords: Vec<f64>,
+    pub ring_offsets: Vec<i64>,
+    pub polygon_offsets: Vec<i64>,
+}
+
+fn check_offsets(offsets: &[i64], upper: usize, name: &str) -> Result<(), String> {
+    if offsets.is_empty() {
+        return Err(format!("{} must contain at least one entry", name));
+    }
+    if offsets[0] != 0 {
+        return Err(format!("{} must start at 0", name));
+    }
+    for pair in offsets.windows(2) {
+        if pair[1] < pair[0] {
+            return Err(format!("{} must be non-decreasing", name));
+        }
+    }
+    if offsets[offsets.len() - 1] as usize != upper {
+        return Err(format!(
+            "{} must end at {} (got {})",
+            name,
+            upper,
+            offsets[offsets.len() - 1]
+        ));
+    }
+    Ok(())
+}
+
+/// Decodes flat arrays into polygons.
+pub fn multipolygon_from_arrays(
+    coords: &[f64],
+    ring_offsets: &[i64],
+    polygon_offsets: &[i64],
+) -> Result<MultiPolygon<f64>, String> {
+    if !coords.len().is_multiple_of(2) {
+        return Err("coords must contain an even number of values (x, y pairs)".to_string());
+    }
+    check_offsets(ring_offsets, coords.len() / 2, "ring_offsets")?;
+    check_offsets(polygon_offsets, ring_offsets.len() - 1, "polygon_offsets")?;
+
+    let ring = |i: usize| -> LineString<f64> {
+        let start = ring_offsets[i] as usize;
+        let end = ring_offsets[i + 1] as usize;
+        LineString(
+            (start..end)
+                .map(|v| Coord {
+                    x: coords[2 * v],
+                    y: coords[2 * v + 1],
+                })
+                .collect(),
+        )
+    };
+
+    let mut polygons = Vec::with_capacity(polygon_offsets.len() - 1);
+    for pair in polygon_offsets.windows(2) {
+        let (first, last) = (pair[0] as usize, pair[1] as usize);
+        if first == last {
+            return Err("polygon without rings".to_string());
+        }
+        let exterior = ring(first);
+        let interiors = (first + 1..last).map(ring).collect();
+        polygons.push(Polygon::new(exterior, interiors));
+    }
+
+    Ok(MultiPolygon(polygons))
+}
+
+/// Encodes polygons as flat arrays (exterior ring first, then holes).
+pub fn multipolygon_to_arrays(multipolygon: &MultiPolygon<f64>) -> PolygonArrays {
+    let mut out = PolygonArrays {
+        coords: Vec::new(),
+        ring_offsets: vec![0],
+        polygon_offsets: vec![0],
+    };
+
+    for polygon in &multipolygon.0 {
+        for ring in std::iter::once(polygon.exterior()).chain(polygon.interiors()) {
+            for c in &ring.0 {
+                out.coords.push(c.x);
+                out.coords.push(c.y);
+            }
+            out.ring_offsets.push((out.coords.len() / 2) as i64);
+        }
+        out.polygon_offsets
+            .push((out.ring_offsets.len() - 1) as i64);
+    }
+
+    out
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn round_trip_with_hole() {
+        let exterior = [0.0, 0.0, 10.0, 0.0, 10.0, 10.0, 0.0, 10.0, 0.0, 0.0];
+        let hole = [2.0, 2.0, 4.0, 2.0, 4.0, 4.0, 2.0, 2.0];
+        let second = [20.0, 20.0, 21.0, 20.0, 21.0, 21.0, 20.0, 20.0];
+        let coords: Vec<f64> = [&exterior[..], &hole[..], &second[..]].concat();
+        let ring_offsets = vec![0, 5, 9, 13];
+        let polygon_offsets = vec![0, 2, 3];
+
+        let mp = multipolygon_from_arrays(&coords, &ring_offsets, &polygon_offsets).unwrap();
+        assert_eq!(mp.0.len(), 2);
+        assert_eq!(mp.0[0].interiors().len(), 1);
+
+        let arrays = multipolygon_to_arrays(&mp);
+        assert_eq!(arrays.coords, coords);
+        assert_eq!(arrays.ring_offsets, ring_offsets);
+        assert_eq!(arrays.polygon_offsets, polygon_offsets);
+    }
+
+    #[test]
+    fn rejects_bad_offsets() {
+        let coords = vec![0.0, 0.0, 1.0, 0.0, 1.0, 1.0, 0.0, 0.0];
+        assert!(multipolygon_from_arrays(&coords, &[0, 5], &[0, 1]).is_err());
+        assert!(multipolygon_from_arrays(&coords, &[0, 4], &[0, 2]).is_err());
+        assert!(multipolygon_from_arrays(&coords[..3], &[0, 1], &[0, 1]).is_err());
+    }
+}
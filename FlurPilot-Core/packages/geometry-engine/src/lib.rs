@@ -1,11 +1,21 @@
-use geo::{Area, BooleanOps, MultiPolygon};
+use geo::{Area, BooleanOps, GeodesicArea, MultiPolygon};
+use projection::{Crs, Utm};
+#[cfg(feature = "python")]
+use pyo3::buffer::PyBuffer;
 #[cfg(feature = "python")]
 use pyo3::prelude::*;
+#[cfg(feature = "python")]
+use pyo3::types::PyBytes;
 use serde::{Deserialize, Serialize};
 use std::str::FromStr;
 #[cfg(feature = "wasm")]
 use wasm_bindgen::prelude::*;
 
+pub mod arrays;
+pub mod overlay;
+pub mod projection;
+pub mod usable;
+
 // --- Version ---
 pub const VERSION: &str = env!("CARGO_PKG_VERSION");
 
@@ -15,6 +25,9 @@ pub const VERSION: &str = env!("CARGO_PKG_VERSION");
 pub struct VirtualParcelRequest {
     pub field_block_geojson: String,
     pub building_geojsons: Vec<String>,
+    /// CRS of the input, e.g. "EPSG:4326". Omitted = planar coordinates in metres.
+    #[serde(default)]
+    pub crs: Option<String>,
 }
 
 #[derive(Serialize, Deserialize)]
@@ -23,12 +36,87 @@ pub struct VirtualParcelResult {
     pub virtual_parcel_geojson: String,
 }
 
+/// One field block with its buildings, as plain GeoJSON objects (no nested strings).
+#[derive(Serialize, Deserialize)]
+pub struct BatchItem {
+    #[serde(default)]
+    pub id: Option<String>,
+    pub field_block: geojson::GeoJson,
+    #[serde(default)]
+    pub buildings: Vec<geojson::GeoJson>,
+    #[serde(default)]
+    pub crs: Option<String>,
+}
+
+/// Per-item result. A failing item carries `error` instead of failing the whole batch.
+#[derive(Serialize, Deserialize)]
+pub struct BatchResult {
+    pub id: Option<String>,
+    pub net_area_sqm: Option<f64>,
+    pub virtual_parcel: Option<geojson::Geometry>,
+    pub error: Option<String>,
+}
+
+/// Setback layer of a usable-area request, e.g. roads with 10 m.
+#[derive(Serialize, Deserialize)]
+pub struct SetbackLayerRequest {
+    #[serde(default)]
+    pub name: Option<String>,
+    pub distance_m: f64,
+    /// Geometries, Features or FeatureCollections (points, lines and polygons).
+    #[serde(default)]
+    pub geometries: Vec<geojson::GeoJson>,
+}
+
+/// Usable area for PV: field block minus setbacks, small patches dropped.
+#[derive(Serialize, Deserialize)]
+pub struct UsableAreaRequest {
+    #[serde(default)]
+    pub id: Option<String>,
+    pub field_block: geojson::GeoJson,
+    #[serde(default)]
+    pub layers: Vec<SetbackLayerRequest>,
+    #[serde(default)]
+    pub field_edge_setback_m: f64,
+    #[serde(default)]
+    pub min_patch_sqm: f64,
+    /// Raster cell size for the largest inscribed rectangle. Omitted = not computed.
+    #[serde(default)]
+    pub rect_resolution_m: Option<f64>,
+    #[serde(default)]
+    pub crs: Option<String>,
+}
+
+#[derive(Serialize, Deserialize)]
+pub struct InscribedRectangle {
+    pub geometry: geojson::Geometry,
+    pub width_m: f64,
+    pub height_m: f64,
+    pub area_sqm: f64,
+}
+
+/// Per-item result. A failing item carries `error` (batch) instead of failing everything.
+#[derive(Serialize, Deserialize)]
+pub struct UsableAreaResult {
+    pub id: Option<String>,
+    pub usable_area_sqm: Option<f64>,
+    pub usable_area: Option<geojson::Geometry>,
+    pub patch_count: Option<usize>,
+    pub removed_patch_count: Option<usize>,
+    pub largest_rectangle: Option<InscribedRectangle>,
+    pub error: Option<String>,
+}
+
 // --- Logic ---
 
 fn parse_multipolygon(geojson_str: &str) -> Result<MultiPolygon<f64>, String> {
     let geo_json =
         geojson::GeoJson::from_str(geojson_str).map_err(|e| format!("Invalid GeoJSON: {}", e))?;
 
+    to_multipolygon(geo_json)
+}
+
+fn to_multipolygon(geo_json: geojson::GeoJson) -> Result<MultiPolygon<f64>, String> {
     let value = match geo_json {
         geojson::GeoJson::Geometry(g) => g.value,
         geojson::GeoJson::Feature(f) => f.geometry.ok_or("Feature has no geometry")?.value,
@@ -51,6 +139,188 @@ fn parse_multipolygon(geojson_str: &str) -> Result<MultiPolygon<f64>, String> {
     }
 }
 
+/// All geometries of a GeoJSON object (any geometry type; Features without geometry are skipped).
+fn to_geometries(geo_json: geojson::GeoJson) -> Result<Vec<geo_types::Geometry<f64>>, String> {
+    let values = match geo_json {
+        geojson::GeoJson::Geometry(g) => vec![g.value],
+        geojson::GeoJson::Feature(f) => f.geometry.map(|g| g.value).into_iter().collect(),
+        geojson::GeoJson::FeatureCollection(fc) => fc
+            .features
+            .into_iter()
+            .filter_map(|f| f.geometry.map(|g| g.value))
+            .collect(),
+    };
+    values
+        .into_iter()
+        .map(|v| {
+            v.try_into()
+                .map_err(|e| format!("Failed to convert GeoJSON Value to Geometry: {}", e))
+        })
+        .collect()
+}
+
+/// Field block minus the union of all buildings, in planar coordinates.
+/// Returns the net geometry and its planar area.
+fn compute_virtual_parcel(
+    field_block: &MultiPolygon<f64>,
+    buildings: &[MultiPolygon<f64>],
+) -> (MultiPolygon<f64>, f64) {
+    // 1. Union Buildings
+    // Only buildings touching the field envelope (R-tree), clipped to it, tree-reduced union.
+    let candidates = overlay::candidate_buildings(field_block, buildings);
+    if candidates.is_empty() {
+        return (field_block.clone(), field_block.unsigned_area());
+    }
+    let buildings_union = overlay::cascaded_union(candidates);
+
+    // 2. Difference: Field - Buildings
+    let virtual_parcel = field_block.difference(&buildings_union);
+
+    // 3. Planar area (only meaningful for metric input, see compute_virtual_parcel_in)
+    let net_area = virtual_parcel.unsigned_area();
+
+    (virtual_parcel, net_area)
+}
+
+/// Field block minus buildings for input in the given CRS.
+/// Geographic input (lon/lat) is projected to the UTM zone of the field block, the
+/// overlay runs in metres and the result is projected back. The area is then taken
+/// on the ellipsoid, like ST_Area(geography) in the calculate_net_parcel RPC.
+fn compute_virtual_parcel_in(
+    field_block: &MultiPolygon<f64>,
+    buildings: &[MultiPolygon<f64>],
+    crs: Crs,
+) -> (MultiPolygon<f64>, f64) {
+    match crs {
+        Crs::Planar => compute_virtual_parcel(field_block, buildings),
+        Crs::Geographic => {
+            let utm = Utm::for_geometry(field_block);
+            let projected_buildings: Vec<MultiPolygon<f64>> =
+                buildings.iter().map(|b| utm.project(b)).collect();
+            let (projected, _) =
+                compute_virtual_parcel(&utm.project(field_block), &projected_buildings);
+
+            let virtual_parcel = utm.unproject(&projected);
+            let net_area = virtual_parcel.geodesic_area_unsigned();
+            (virtual_parcel, net_area)
+        }
+    }
+}
+
+/// Usable area in the request's CRS. Geographic input runs in the UTM zone of the
+/// field block (setbacks and patch sizes in metres); the reported usable area is
+/// geodesic, the rectangle dimensions are in UTM metres.
+fn compute_usable_area(request: UsableAreaRequest) -> Result<UsableAreaResult, String> {
+    let crs = Crs::parse(request.crs.as_deref())?;
+    let field_block = to_multipolygon(request.field_block)?;
+    let options = usable::UsableAreaOptions {
+        field_edge_setback: request.field_edge_setback_m,
+        min_patch_area: request.min_patch_sqm,
+        rect_resolution: request.rect_resolution_m,
+    };
+
+    let utm = match crs {
+        Crs::Planar => None,
+        Crs::Geographic => Some(Utm::for_geometry(&field_block)),
+    };
+    let mut layers = Vec::with_capacity(request.layers.len());
+    for layer in request.layers {
+        let mut geometries = Vec::new();
+        for g in layer.geometries {
+            let parsed = to_geometries(g).map_err(|e| match &layer.name {
+                Some(name) => format!("Layer {}: {}", name, e),
+                None => e,
+            })?;
+            geometries.extend(parsed);
+        }
+        if let Some(utm) = &utm {
+            geometries = geometries.iter().map(|g| utm.project_geometry(g)).collect();
+        }
+        layers.push(usable::SetbackLayer {
+            distance: layer.distance_m,
+            geometries,
+        });
+    }
+
+    let field_block = match &utm {
+        Some(utm) => utm.project(&field_block),
+        None => field_block,
+    };
+    let result = usable::usable_area(&field_block, &layers, &options);
+
+    let (geometry, area) = match &utm {
+        Some(utm) => {
+            let geometry = utm.unproject(&result.geometry);
+            let area = geometry.geodesic_area_unsigned();
+            (geometry, area)
+        }
+        None => (result.geometry, result.area),
+    };
+    let largest_rectangle = result.largest_rectangle.map(|rect| {
+        let polygon = MultiPolygon(vec![rect.to_polygon()]);
+        let polygon = match &utm {
+            Some(utm) => utm.unproject(&polygon),
+            None => polygon,
+        };
+        InscribedRectangle {
+            geometry: geojson::Geometry::from(&polygon),
+            width_m: rect.width(),
+            height_m: rect.height(),
+            area_sqm: rect.width() * rect.height(),
+        }
+    });
+
+    Ok(UsableAreaResult {
+        id: request.id,
+        usable_area_sqm: Some(area),
+        patch_count: Some(geometry.0.len()),
+        usable_area: Some(geojson::Geometry::from(&geometry)),
+        removed_patch_count: Some(result.removed_patches),
+        largest_rectangle,
+        error: None,
+    })
+}
+
+fn internal_calculate_usable_area(request_json: &str) -> Result<String, String> {
+    let request: UsableAreaRequest = serde_json::from_str(request_json)
+        .map_err(|e| format!("Failed to parse request JSON: {}", e))?;
+    let result = compute_usable_area(request)?;
+    serde_json::to_string(&result).map_err(|e| format!("Failed to serialize result: {}", e))
+}
+
+fn calculate_usable_area_item(request: UsableAreaRequest) -> UsableAreaResult {
+    let id = request.id.clone();
+    compute_usable_area(request).unwrap_or_else(|e| UsableAreaResult {
+        id,
+        usable_area_sqm: None,
+        usable_area: None,
+        patch_count: None,
+        removed_patch_count: None,
+        largest_rectangle: None,
+        error: Some(e),
+    })
+}
+
+/// Usable area for many field blocks, in parallel like the virtual parcel batch.
+fn internal_calculate_usable_area_batch(requests_json: &str) -> Result<String, String> {
+    let items: Vec<UsableAreaRequest> = serde_json::from_str(requests_json)
+        .map_err(|e| format!("Failed to parse batch JSON: {}", e))?;
+
+    #[cfg(feature = "rayon")]
+    let results: Vec<UsableAreaResult> = {
+        use rayon::prelude::*;
+        items
+            .into_par_iter()
+            .map(calculate_usable_area_item)
+            .collect()
+    };
+    #[cfg(not(feature = "rayon"))]
+    let results: Vec<UsableAreaResult> =
+        items.into_iter().map(calculate_usable_area_item).collect();
+
+    serde_json::to_string(&results).map_err(|e| format!("Failed to serialize results: {}", e))
+}
+
 fn internal_calculate_virtual_parcel(request_json: &str) -> Result<String, String> {
     let request: VirtualParcelRequest = serde_json::from_str(request_json)
         .map_err(|e| format!("Failed to parse request JSON: {}", e))?;
@@ -58,34 +328,73 @@ fn internal_calculate_virtual_parcel(request_json: &str) -> Result<String, Strin
     // 1. Parse Field Block (Base)
     let field_block = parse_multipolygon(&request.field_block_geojson)?;
 
-    // 2. Parse Buildings (Subtract) and Union them
-    let mut buildings_union: MultiPolygon<f64> = MultiPolygon(vec![]);
-
-    for building_geojson in request.building_geojsons {
-        let building = parse_multipolygon(&building_geojson)?;
-        buildings_union = buildings_union.union(&building);
-    }
+    // 2. Parse Buildings (Subtract)
+    let buildings = request
+        .building_geojsons
+        .iter()
+        .map(|b| parse_multipolygon(b.as_str()))
+        .collect::<Result<Vec<_>, _>>()?;
 
-    // 3. Difference: Field - Buildings
-    // Note: boolean_ops logic handles the geometric subtraction
-    let virtual_parcel = field_block.difference(&buildings_union);
+    // 3. Field - Buildings
+    let crs = Crs::parse(request.crs.as_deref())?;
+    let (virtual_parcel, net_area) = compute_virtual_parcel_in(&field_block, &buildings, crs);
 
-    // 4. Calculate Net Area (EPSG:25832 or similar metric projection assumed for now,
-    // or we assume input is already projected. Geo-types Area is planar.)
-    // TODO: Ensure input is projected (UTM) before calling this, otherwise area is invalid deg^2.
-    let net_area = virtual_parcel.unsigned_area();
-
-    // 5. Serialize Result
+    // 4. Serialize Result
     let result_geojson = geojson::Geometry::from(&virtual_parcel).to_string();
 
     let result = VirtualParcelResult {
-        net_area_sqm: net_area, // Warning: Checks regarding projection needed in caller!
+        net_area_sqm: net_area,
         virtual_parcel_geojson: result_geojson,
     };
 
     serde_json::to_string(&result).map_err(|e| format!("Failed to serialize result: {}", e))
 }
 
+fn calculate_batch_item(item: BatchItem) -> BatchResult {
+    let id = item.id;
+    let computed = Crs::parse(item.crs.as_deref()).and_then(|crs| {
+        let field_block = to_multipolygon(item.field_block)?;
+        let buildings = item
+            .buildings
+            .into_iter()
+            .map(to_multipolygon)
+            .collect::<Result<Vec<_>, _>>()?;
+        Ok(compute_virtual_parcel_in(&field_block, &buildings, crs))
+    });
+
+    match computed {
+        Ok((virtual_parcel, net_area)) => BatchResult {
+            id,
+            net_area_sqm: Some(net_area),
+            virtual_parcel: Some(geojson::Geometry::from(&virtual_parcel)),
+            error: None,
+        },
+        Err(e) => BatchResult {
+            id,
+            net_area_sqm: None,
+            virtual_parcel: None,
+            error: Some(e),
+        },
+    }
+}
+
+/// Computes many field blocks at once. Items are independent, so they run in
+/// parallel (rayon) when built with the Python feature; WASM stays sequential.
+fn internal_calculate_virtual_parcels_batch(requests_json: &str) -> Result<String, String> {
+    let items: Vec<BatchItem> = serde_json::from_str(requests_json)
+        .map_err(|e| format!("Failed to parse batch JSON: {}", e))?;
+
+    #[cfg(feature = "rayon")]
+    let results: Vec<BatchResult> = {
+        use rayon::prelude::*;
+        items.into_par_iter().map(calculate_batch_item).collect()
+    };
+    #[cfg(not(feature = "rayon"))]
+    let results: Vec<BatchResult> = items.into_iter().map(calculate_batch_item).collect();
+
+    serde_json::to_string(&results).map_err(|e| format!("Failed to serialize results: {}", e))
+}
+
 // --- Python Interface ---
 
 #[cfg(feature = "python")]
@@ -95,6 +404,109 @@ fn calculate_virtual_parcel(request_json: String) -> PyResult<String> {
         .map_err(PyErr::new::<pyo3::exceptions::PyValueError, _>)
 }
 
+/// Batch entry point. Releases the GIL for the whole computation.
+#[cfg(feature = "python")]
+#[pyfunction]
+fn calculate_virtual_parcels_batch(py: Python<'_>, requests_json: String) -> PyResult<String> {
+    py.allow_threads(|| internal_calculate_virtual_parcels_batch(&requests_json))
+        .map_err(PyErr::new::<pyo3::exceptions::PyValueError, _>)
+}
+
+/// Field block minus setback buffers (per layer), field-edge inset and small patches;
+/// optionally the largest inscribed rectangle. See `UsableAreaRequest`.
+#[cfg(feature = "python")]
+#[pyfunction]
+fn calculate_usable_area(py: Python<'_>, request_json: String) -> PyResult<String> {
+    py.allow_threads(|| internal_calculate_usable_area(&request_json))
+        .map_err(PyErr::new::<pyo3::exceptions::PyValueError, _>)
+}
+
+/// Batch of usable-area requests (parallel, GIL released).
+#[cfg(feature = "python")]
+#[pyfunction]
+fn calculate_usable_area_batch(py: Python<'_>, requests_json: String) -> PyResult<String> {
+    py.allow_threads(|| internal_calculate_usable_area_batch(&requests_json))
+        .map_err(PyErr::new::<pyo3::exceptions::PyValueError, _>)
+}
+
+#[cfg(feature = "python")]
+fn f64_bytes(py: Python<'_>, values: &[f64]) -> PyObject {
+    let bytes: Vec<u8> = values.iter().flat_map(|v| v.to_ne_bytes()).collect();
+    PyBytes::new(py, &bytes).into()
+}
+
+#[cfg(feature = "python")]
+fn i64_bytes(py: Python<'_>, values: &[i64]) -> PyObject {
+    let bytes: Vec<u8> = values.iter().flat_map(|v| v.to_ne_bytes()).collect();
+    PyBytes::new(py, &bytes).into()
+}
+
+/// Zero-JSON entry point on flat coordinate arrays (see `arrays`).
+/// Accepts any buffer-protocol object (NumPy float64 / int64 arrays).
+/// Each building polygon in the building arrays is subtracted.
+/// Returns (coords, ring_offsets, polygon_offsets, net_area) with the arrays as
+/// native-endian bytes; the Python package wraps them with `numpy.frombuffer`.
+#[cfg(feature = "python")]
+#[pyfunction]
+#[pyo3(signature = (
+    field_coords,
+    field_ring_offsets,
+    field_polygon_offsets,
+    building_coords,
+    building_ring_offsets,
+    building_polygon_offsets,
+    crs = None
+))]
+#[allow(clippy::too_many_arguments)]
+fn calculate_virtual_parcel_arrays_raw(
+    py: Python<'_>,
+    field_coords: PyBuffer<f64>,
+    field_ring_offsets: PyBuffer<i64>,
+    field_polygon_offsets: PyBuffer<i64>,
+    building_coords: PyBuffer<f64>,
+    building_ring_offsets: PyBuffer<i64>,
+    building_polygon_offsets: PyBuffer<i64>,
+    crs: Option<&str>,
+) -> PyResult<(PyObject, PyObject, PyObject, f64)> {
+    let crs = Crs::parse(crs).map_err(PyErr::new::<pyo3::exceptions::PyValueError, _>)?;
+    let field_coords = field_coords.to_vec(py)?;
+    let field_ring_offsets = field_ring_offsets.to_vec(py)?;
+    let field_polygon_offsets = field_polygon_offsets.to_vec(py)?;
+    let building_coords = building_coords.to_vec(py)?;
+    let building_ring_offsets = building_ring_offsets.to_vec(py)?;
+    let building_polygon_offsets = building_polygon_offsets.to_vec(py)?;
+
+    let (result, net_area) = py
+        .allow_threads(|| {
+            let field_block = arrays::multipolygon_from_arrays(
+                &field_coords,
+                &field_ring_offsets,
+                &field_polygon_offsets,
+            )?;
+            let buildings: Vec<MultiPolygon<f64>> = arrays::multipolygon_from_arrays(
+                &building_coords,
+                &building_ring_offsets,
+                &building_polygon_offsets,
+            )?
+            .0
+            .into_iter()
+            .map(|p| MultiPolygon(vec![p]))
+            .collect();
+
+            let (virtual_parcel, net_area) =
+                compute_virtual_parcel_in(&field_block, &buildings, crs);
+            Ok::<_, String>((arrays::multipolygon_to_arrays(&virtual_parcel), net_area))
+        })
+        .map_err(PyErr::new::<pyo3::exceptions::PyValueError, _>)?;
+
+    Ok((
+        f64_bytes(py, &result.coords),
+        i64_bytes(py, &result.ring_offsets),
+        i64_bytes(py, &result.polygon_offsets),
+        net_area,
+    ))
+}
+
 #[cfg(feature = "python")]
 #[pyfunction]
 fn get_version() -> &'static str {
@@ -105,6 +517,10 @@ fn get_version() -> &'static str {
 #[pymodule]
 fn geometry_engine(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_function(wrap_pyfunction!(calculate_virtual_parcel, m)?)?;
+    m.add_function(wrap_pyfunction!(calculate_virtual_parcels_batch, m)?)?;
+    m.add_function(wrap_pyfunction!(calculate_virtual_parcel_arrays_raw, m)?)?;
+    m.add_function(wrap_pyfunction!(calculate_usable_area, m)?)?;
+    m.add_function(wrap_pyfunction!(calculate_usable_area_batch, m)?)?;
     m.add_function(wrap_pyfunction!(get_version, m)?)?;
     m.add("__version__", VERSION)?;
     Ok(())
@@ -120,6 +536,22 @@ pub fn calculate_virtual_parcel_wasm(request_json: String) -> Result<String, Str
     internal_calculate_virtual_parcel(&request_json)
 }
 
+#[cfg(feature = "wasm")]
+#[wasm_bindgen]
+pub fn calculate_virtual_parcels_batch_wasm(requests_json: String) -> Result<String, String> {
+    #[cfg(feature = "wasm")]
+    console_error_panic_hook::set_once();
+    internal_calculate_virtual_parcels_batch(&requests_json)
+}
+
+#[cfg(feature = "wasm")]
+#[wasm_bindgen]
+pub fn calculate_usable_area_wasm(request_json: String) -> Result<String, String> {
+    #[cfg(feature = "wasm")]
+    console_error_panic_hook::set_once();
+    internal_calculate_usable_area(&request_json)
+}
+
 #[cfg(feature = "wasm")]
 #[wasm_bindgen]
 pub fn get_version_wasm() -> String {
@@ -0,0 +1,151 @@
+//! Building overlay helpers for the field block difference.
+//!
+//! - `candidate_buildings`: R-tree filter of buildings against the field block envelopes,
+//!   with candidates reaching outside the field envelope clipped to it.
+//! - `cascaded_union`: pairwise (tree-reduced) union of spatially sorted polygons.
+//!
+//! Folding buildings into one growing union is quadratic: every step re-processes all
+//! vertices unioned so far. The tree reduction only ever unions neighbours of similar size.
+
+use geo::{BooleanOps, BoundingRect, Coord, MultiPolygon, Rect};
+use rstar::primitives::{GeomWithData, Rectangle};
+use rstar::{RTree, AABB};
+
+type IndexedEnvelope = GeomWithData<Rectangle<[f64; 2]>, usize>;
+
+fn corners(rect: &Rect<f64>) -> ([f64; 2], [f64; 2]) {
+    let (min, max) = (rect.min(), rect.max());
+    ([min.x, min.y], [max.x, max.y])
+}
+
+fn contains_rect(outer: &Rect<f64>, inner: &Rect<f64>) -> bool {
+    outer.min().x <= inner.min().x
+        && outer.min().y <= inner.min().y
+        && outer.max().x >= inner.max().x
+        && outer.max().y >= inner.max().y
+}
+
+/// Buildings whose envelope intersects the envelope of any field block polygon.
+/// Buildings sticking out of the field envelope are clipped to it, so the union
+/// never carries vertices that cannot affect the result.
+pub fn candidate_buildings(
+    field_block: &MultiPolygon<f64>,
+    buildings: &[MultiPolygon<f64>],
+) -> Vec<MultiPolygon<f64>> {
+    let field_rect = match field_block.bounding_rect() {
+        Some(rect) => rect,
+        None => return Vec::new(),
+    };
+
+    let envelopes: Vec<IndexedEnvelope> = buildings
+        .iter()
+        .enumerate()
+        .filter_map(|(i, b)| {
+            let (min, max) = corners(&b.bounding_rect()?);
+            Some(GeomWithData::new(Rectangle::from_corners(min, max), i))
+        })
+        .collect();
+    let tree = RTree::bulk_load(envelopes);
+
+    // Query per field polygon: for multi-part field blocks the overall envelope
+    // would pull in everything lying between the parts.
+    let mut hits: Vec<usize> = Vec::new();
+    for polygon in &field_block.0 {
+        if let Some(rect) = polygon.bounding_rect() {
+            let (min, max) = corners(&rect);
+            let envelope = AABB::from_corners(min, max);
+            hits.extend(
+                tree.locate_in_envelope_intersecting(&envelope)
+                    .map(|e| e.data),
+            );
+        }
+    }
+    hits.sort_unstable();
+    hits.dedup();
+
+    let clip = MultiPolygon(vec![field_rect.to_polygon()]);
+    hits.into_iter()
+        .map(|i| &buildings[i])
+        .map(|b| match b.bounding_rect() {
+            Some(rect) if contains_rect(&field_rect, &rect) => b.clone(),
+            _ => b.intersection(&clip),
+        })
+        .filter(|b| !b.0.is_empty())
+        .collect()
+}
+
+fn center(polygons: &MultiPolygon<f64>) -> Coord<f64> {
+    polygons
+        .bounding_rect()
+        .map(|r| r.center())
+        .unwrap_or(Coord { x: 0.0, y: 0.0 })
+}
+
+/// Cascaded union: sorts polygons by envelope center so that neighbours end up
+/// next to each other, then unions adjacent pairs level by level.
+pub fn cascaded_union(mut polygons: Vec<MultiPolygon<f64>>) -> MultiPolygon<f64> {
+    polygons.sort_by(|a, b| {
+        let (ca, cb) = (center(a), center(b));
+        ca.x.total_cmp(&cb.x).then(ca.y.total_cmp(&cb.y))
+    });
+
+    while polygons.len() > 1 {
+        let mut next = Vec::with_capacity(polygons.len() / 2 + 1);
+        let mut iter = polygons.into_iter();
+        while let Some(a) = iter.next() {
+            match iter.next() {
+                Some(b) => next.push(a.union(&b)),
+                None => next.push(a),
+            }
+        }
+        polygons = next;
+    }
+
+    polygons.pop().unwrap_or_else(|| MultiPolygon(vec![]))
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use geo::{polygon, Area};
+
+    fn square(x: f64, y: f64, size: f64) -> MultiPolygon<f64> {
+        MultiPolygon(vec![polygon![
+            (x: x, y: y),
+            (x: x + size, y: y),
+            (x: x + size, y: y + size),
+            (x: x, y: y + size),
+            (x: x, y: y),
+        ]])
+    }
+
+    #[test]
+    fn filters_and_clips_buildings() {
+        let field = square(0.0, 0.0, 100.0);
+        let buildings = vec![
+            square(10.0, 10.0, 10.0),   // inside
+            square(95.0, 50.0, 10.0),   // crosses the edge
+            square(500.0, 500.0, 10.0), // far away
+        ];
+
+        let candidates = candidate_buildings(&field, &buildings);
+        assert_eq!(candidates.len(), 2);
+        let area: f64 = candidates.iter().map(|c| c.unsigned_area()).sum();
+        assert!((area - 150.0).abs() < 1e-6);
+    }
+
+    #[test]
+    fn cascaded_union_matches_fold() {
+        let buildings: Vec<MultiPolygon<f64>> = (0..37)
+            .map(|i| square((i % 6) as f64 * 8.0, (i / 6) as f64 * 8.0, 10.0))
+            .collect();
+
+        let folded = buildings
+            .iter()
+            .fold(MultiPolygon(vec![]), |acc, b| acc.union(b));
+        let cascaded = cascaded_union(buildings);
+
+        assert!((folded.unsigned_area() - cascaded.unsigned_area()).abs() < 1e-6);
+        assert!(cascaded_union(Vec::new()).0.is_empty());
+    }
+}
@@ -0,0 +1,195 @@
+//! On-the-fly UTM projection (ETRS89 / GRS80) for metric geometry operations.
+//!
+//! Transverse Mercator via the Krüger series (3rd order in n), which is accurate to
+//! well below a centimetre within a zone. Bavaria spans UTM 32N and 33N; the zone is
+//! chosen from the longitude of the field block, so all operations of one field
+//! block run in the same metric plane.
+
+use geo::{BoundingRect, Coord, Geometry, MapCoords, MultiPolygon};
+
+// GRS80 (ETRS89), practically identical to WGS84 at this scale
+const A: f64 = 6_378_137.0;
+const F: f64 = 1.0 / 298.257_222_101;
+const K0: f64 = 0.9996;
+const FALSE_EASTING: f64 = 500_000.0;
+
+/// Coordinate reference system of request geometries.
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum Crs {
+    /// Already metric (e.g. EPSG:25832). Operations and area are planar.
+    Planar,
+    /// Longitude/latitude (EPSG:4326). Operations run in UTM, area is geodesic.
+    Geographic,
+}
+
+impl Crs {
+    /// Parses the optional `crs` of a request. `None` keeps the legacy planar behaviour.
+    pub fn parse(crs: Option<&str>) -> Result<Crs, String> {
+        let Some(crs) = crs else {
+            return Ok(Crs::Planar);
+        };
+        let code = crs
+            .trim()
+            .to_ascii_uppercase()
+            .replace("URN:OGC:DEF:CRS:EPSG::", "EPSG:");
+        match code.as_str() {
+            "EPSG:4326" | "EPSG:4258" | "OGC:CRS84" | "CRS84" | "WGS84" => Ok(Crs::Geographic),
+            c if c.starts_with("EPSG:258") || c.starts_with("EPSG:326") => Ok(Crs::Planar),
+            _ => Err(format!("Unsupported CRS: {}", crs)),
+        }
+    }
+}
+
+/// Transverse Mercator for one UTM zone (northern hemisphere formulas; southern
+/// latitudes simply yield negative northings, which is fine for round trips).
+#[derive(Debug, Clone, Copy)]
+pub struct Utm {
+    pub zone: u8,
+    lon0: f64,
+    scale: f64, // k0 * A (rectifying radius)
+    alpha: [f64; 3],
+    beta: [f64; 3],
+    delta: [f64; 3],
+    e2n: f64, // 2 * sqrt(n) / (1 + n)
+}
+
+impl Utm {
+    pub fn new(zone: u8) -> Utm {
+        let n = F / (2.0 - F);
+        let (n2, n3) = (n * n, n * n * n);
+        Utm {
+            zone,
+            lon0: (zone as f64 * 6.0 - 183.0).to_radians(),
+            scale: K0 * A / (1.0 + n) * (1.0 + n2 / 4.0 + n2 * n2 / 64.0),
+            alpha: [
+                n / 2.0 - 2.0 * n2 / 3.0 + 5.0 * n3 / 16.0,
+                13.0 * n2 / 48.0 - 3.0 * n3 / 5.0,
+                61.0 * n3 / 240.0,
+            ],
+            beta: [
+                n / 2.0 - 2.0 * n2 / 3.0 + 37.0 * n3 / 96.0,
+                n2 / 48.0 + n3 / 15.0,
+                17.0 * n3 / 480.0,
+            ],
+            delta: [
+                2.0 * n - 2.0 * n2 / 3.0 - 2.0 * n3,
+                7.0 * n2 / 3.0 - 8.0 * n3 / 5.0,
+                56.0 * n3 / 15.0,
+            ],
+            e2n: 2.0 * n.sqrt() / (1.0 + n),
+        }
+    }
+
+    /// Zone containing the given longitude (32 for 6°-12°E, 33 for 12°-18°E).
+    pub fn for_lon(lon: f64) -> Utm {
+        let zone = ((lon + 180.0) / 6.0).floor().clamp(0.0, 59.0) as u8 + 1;
+        Utm::new(zone)
+    }
+
+    /// Zone for the centre of a geometry's envelope.
+    pub fn for_geometry(geometry: &MultiPolygon<f64>) -> Utm {
+        let lon = geometry
+            .bounding_rect()
+            .map(|r| r.center().x)
+            .unwrap_or(9.0);
+        Utm::for_lon(lon)
+    }
+
+    /// Lon/lat (degrees) -> easting/northing (metres).
+    pub fn forward(&self, c: Coord<f64>) -> Coord<f64> {
+        let phi = c.y.to_radians();
+        let lam = c.x.to_radians() - self.lon0;
+
+        let t = (phi.sin().atanh() - self.e2n * (self.e2n * phi.sin()).atanh()).sinh();
+        let xi = (t / lam.cos()).atan();
+        let eta = (lam.sin() / (1.0 + t * t).sqrt()).atanh();
+
+        let (mut e, mut n) = (eta, xi);
+        for (j, a) in self.alpha.iter().enumerate() {
+            let k = 2.0 * (j + 1) as f64;
+            e += a * (k * xi).cos() * (k * eta).sinh();
+            n += a * (k * xi).sin() * (k * eta).cosh();
+        }
+
+        Coord {
+            x: FALSE_EASTING + self.scale * e,
+            y: self.scale * n,
+        }
+    }
+
+    /// Easting/northing (metres) -> lon/lat (degrees).
+    pub fn inverse(&self, c: Coord<f64>) -> Coord<f64> {
+        let xi = c.y / self.scale;
+        let eta = (c.x - FALSE_EASTING) / self.scale;
+
+        let (mut xi_p, mut eta_p) = (xi, eta);
+        for (j, b) in self.beta.iter().enumerate() {
+            let k = 2.0 * (j + 1) as f64;
+            xi_p -= b * (k * xi).sin() * (k * eta).cosh();
+            eta_p -= b * (k * xi).cos() * (k * eta).sinh();
+        }
+
+        let chi = (xi_p.sin() / eta_p.cosh()).asin();
+        let mut phi = chi;
+        for (j, d) in self.delta.iter().enumerate() {
+            phi += d * (2.0 * (j + 1) as f64 * chi).sin();
+        }
+        let lam = self.lon0 + (eta_p.sinh() / xi_p.cos()).atan();
+
+        Coord {
+            x: lam.to_degrees(),
+            y: phi.to_degrees(),
+        }
+    }
+
+    pub fn project(&self, geometry: &MultiPolygon<f64>) -> MultiPolygon<f64> {
+        geometry.map_coords(|c| self.forward(c))
+    }
+
+    pub fn unproject(&self, geometry: &MultiPolygon<f64>) -> MultiPolygon<f64> {
+        geometry.map_coords(|c| self.inverse(c))
+    }
+
+    /// Any geometry type (setback layers may be points or lines).
+    pub fn project_geometry(&self, geometry: &Geometry<f64>) -> Geometry<f64> {
+        geometry.map_coords(|c| self.forward(c))
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn forward_matches_reference_point() {
+        // Munich, Marienplatz: 11.5755 E, 48.1374 N -> UTM 32N (EPSG:25832)
+        let utm = Utm::for_lon(11.5755);
+        assert_eq!(utm.zone, 32);
+        let p = utm.forward(Coord {
+            x: 11.5755,
+            y: 48.1374,
+        });
+        assert!((p.x - 691_603.03).abs() < 0.01, "easting {}", p.x);
+        assert!((p.y - 5_334_780.03).abs() < 0.01, "northing {}", p.y);
+    }
+
+    #[test]
+    fn round_trip_is_sub_centimetre() {
+        let utm = Utm::new(33);
+        for (lon, lat) in [(12.1, 47.3), (13.8, 48.9), (15.0, 50.5)] {
+            let c = utm.inverse(utm.forward(Coord { x: lon, y: lat }));
+            assert!((c.x - lon).abs() < 1e-7 && (c.y - lat).abs() < 1e-7);
+        }
+    }
+
+    #[test]
+    fn parses_crs() {
+        assert_eq!(Crs::parse(None), Ok(Crs::Planar));
+        assert_eq!(Crs::parse(Some("epsg:4326")), Ok(Crs::Geographic));
+        assert_eq!(
+            Crs::parse(Some("urn:ogc:def:crs:EPSG::25832")),
+            Ok(Crs::Planar)
+        );
+        assert!(Crs::parse(Some("EPSG:3857")).is_err());
+    }
+}
@@ -0,0 +1,473 @@
+//! Setbacks and usable area for PV screening, in projected metres.
+//!
+//! - `buffer`: Minkowski buffer as the union of the geometry, one rectangle per segment
+//!   and one disc per convex vertex. Discs are circumscribed polygons, so a buffer
+//!   never undercuts the (legal) setback distance.
+//! - `usable_area`: field block minus the per-layer setback buffers and a field-edge
+//!   inset; patches below a minimum size are dropped.
+//! - `largest_inscribed_rectangle`: largest axis-aligned rectangle inside the usable
+//!   area, found as the maximal all-inside rectangle of a raster (panel rows run E-W).
+
+use crate::overlay;
+use geo::{
+    Area, BooleanOps, BoundingRect, Coord, Geometry, LineString, MultiPolygon, Polygon, Rect,
+};
+use std::f64::consts::PI;
+
+/// Vertices of a full disc.
+const DISC_SEGMENTS: usize = 32;
+/// Upper bound for the raster of `largest_inscribed_rectangle`; beyond it the
+/// cell size is doubled until the raster fits.
+pub const MAX_RASTER_CELLS: usize = 4_000_000;
+
+/// Geometries of one layer (buildings, roads, forest, ...) and their setback distance.
+pub struct SetbackLayer {
+    pub distance: f64,
+    pub geometries: Vec<Geometry<f64>>,
+}
+
+#[derive(Debug, Clone, Copy, Default)]
+pub struct UsableAreaOptions {
+    /// Inset from the field block boundary (including its holes).
+    pub field_edge_setback: f64,
+    /// Remaining patches smaller than this are dropped.
+    pub min_patch_area: f64,
+    /// Raster cell size for the inscribed rectangle; `None` skips it.
+    pub rect_resolution: Option<f64>,
+}
+
+pub struct UsableArea {
+    pub geometry: MultiPolygon<f64>,
+    pub area: f64,
+    pub removed_patches: usize,
+    pub largest_rectangle: Option<Rect<f64>>,
+}
+
+fn disc(center: Coord<f64>, radius: f64) -> Polygon<f64> {
+    // Circumscribed: the edge midpoints lie on the circle
+    let r = radius / (PI / DISC_SEGMENTS as f64).cos();
+    let ring: Vec<Coord<f64>> = (0..=DISC_SEGMENTS)
+        .map(|i| {
+            let a = 2.0 * PI * (i % DISC_SEGMENTS) as f64 / DISC_SEGMENTS as f64;
+            Coord {
+                x: center.x + r * a.cos(),
+                y: center.y + r * a.sin(),
+            }
+        })
+        .collect();
+    Polygon::new(LineString(ring), vec![])
+}
+
+fn segment_rect(a: Coord<f64>, b: Coord<f64>, distance: f64) -> Option<Polygon<f64>> {
+    let (dx, dy) = (b.x - a.x, b.y - a.y);
+    let len = dx.hypot(dy);
+    if len == 0.0 {
+        return None;
+    }
+    // Left normal; right side first keeps the ring counter-clockwise
+    let n = Coord {
+        x: -dy / len * distance,
+        y: dx / len * distance,
+    };
+    Some(Polygon::new(
+        LineString(vec![a - n, b - n, b + n, a + n, a - n]),
+        vec![],
+    ))
+}
+
+fn twice_signed_area(coords: &[Coord<f64>]) -> f64 {
+    (0..coords.len())
+        .map(|i| {
+            let (a, b) = (coords[i], coords[(i + 1) % coords.len()]);
+            a.x * b.y - b.x * a.y
+        })
+        .sum()
+}
+
+fn open_coords(ring: &LineString<f64>) -> &[Coord<f64>] {
+    let coords = &ring.0[..];
+    if coords.len() > 1 && ring.is_closed() {
+        &coords[..coords.len() - 1]
+    } else {
+        coords
+    }
+}
+
+/// +1.0 if the polygon interior lies left of the ring's direction, else -1.0.
+fn interior_side(ring: &LineString<f64>, is_hole: bool) -> f64 {
+    let ccw = twice_signed_area(open_coords(ring)) > 0.0;
+    if ccw != is_hole {
+        1.0
+    } else {
+        -1.0
+    }
+}
+
+/// Segment rectangles of a closed ring plus discs at the vertices turning towards
+/// `disc_side` (+1.0 left turns, -1.0 right turns). At all other vertices the
+/// rectangles of the two adjacent edges already cover the wedge.
+fn ring_pieces(
+    ring: &LineString<f64>,
+    distance: f64,
+    disc_side: f64,
+    pieces: &mut Vec<MultiPolygon<f64>>,
+) {
+    let coords = open_coords(ring);
+    let n = coords.len();
+    if n < 3 {
+        return line_pieces(coords, distance, pieces);
+    }
+    for i in 0..n {
+        let (a, b, c) = (coords[(i + n - 1) % n], coords[i], coords[(i + 1) % n]);
+        let cross = (b.x - a.x) * (c.y - b.y) - (b.y - a.y) * (c.x - b.x);
+        if cross * disc_side > 0.0 {
+            pieces.push(MultiPolygon(vec![disc(b, distance)]));
+        }
+        if let Some(rect) = segment_rect(b, c, distance) {
+            pieces.push(MultiPolygon(vec![rect]));
+        }
+    }
+}
+
+/// Open line: rectangles for all segments, discs at all vertices.
+fn line_pieces(coords: &[Coord<f64>], distance: f64, pieces: &mut Vec<MultiPolygon<f64>>) {
+    for pair in coords.windows(2) {
+        if let Some(rect) = segment_rect(pair[0], pair[1], distance) {
+            pieces.push(MultiPolygon(vec![rect]));
+        }
+    }
+    for c in coords {
+        pieces.push(MultiPolygon(vec![disc(*c, distance)]));
+    }
+}
+
+fn polygon_pieces(polygon: &Polygon<f64>, distance: f64, pieces: &mut Vec<MultiPolygon<f64>>) {
+    pieces.push(MultiPolygon(vec![polygon.clone()]));
+    if distance <= 0.0 {
+        return;
+    }
+    let exterior = polygon.exterior();
+    ring_pieces(exterior, distance, interior_side(exterior, false), pieces);
+    for hole in polygon.interiors() {
+        ring_pieces(hole, distance, interior_side(hole, true), pieces);
+    }
+}
+
+/// Pieces whose union is the buffer of `geometry`. With a distance <= 0 only the
+/// polygonal parts remain (plain exclusion zones).
+pub fn buffer_pieces(geometry: &Geometry<f64>, distance: f64, pieces: &mut Vec<MultiPolygon<f64>>) {
+    let lines = distance > 0.0;
+    match geometry {
+        Geometry::Point(p) if lines => pieces.push(MultiPolygon(vec![disc(p.0, distance)])),
+        Geometry::MultiPoint(mp) if lines => {
+            pieces.extend(mp.0.iter().map(|p| MultiPolygon(vec![disc(p.0, distance)])))
+        }
+        Geometry::Line(l) if lines => line_pieces(&[l.start, l.end], distance, pieces),
+        Geometry::LineString(ls) if lines => line_pieces(&ls.0, distance, pieces),
+        Geometry::MultiLineString(mls) if lines => {
+            for ls in &mls.0 {
+                line_pieces(&ls.0, distance, pieces);
+            }
+        }
+        Geometry::Polygon(p) => polygon_pieces(p, distance, pieces),
+        Geometry::MultiPolygon(mp) => {
+            for p in &mp.0 {
+                polygon_pieces(p, distance, pieces);
+            }
+        }
+        Geometry::Rect(r) => polygon_pieces(&r.to_polygon(), distance, pieces),
+        Geometry::Triangle(t) => polygon_pieces(&t.to_polygon(), distance, pieces),
+        Geometry::GeometryCollection(gc) => {
+            for g in &gc.0 {
+                buffer_pieces(g, distance, pieces);
+            }
+        }
+        _ => {}
+    }
+}
+
+/// Buffer of a geometry by `distance` (metres in a projected CRS).
+pub fn buffer(geometry: &Geometry<f64>, distance: f64) -> MultiPolygon<f64> {
+    let mut pieces = Vec::new();
+    buffer_pieces(geometry, distance, &mut pieces);
+    overlay::cascaded_union(pieces)
+}
+
+/// Field block minus all setback buffers and the field-edge inset, without
+/// patches below `min_patch_area`. Areas are planar (projected metres).
+pub fn usable_area(
+    field_block: &MultiPolygon<f64>,
+    layers: &[SetbackLayer],
+    options: &UsableAreaOptions,
+) -> UsableArea {
+    let mut pieces = Vec::new();
+    if options.field_edge_setback > 0.0 {
+        // Inset: discs are only needed at vertices bending away from the interior
+        for polygon in &field_block.0 {
+            let exterior = polygon.exterior();
+            let side = -interior_side(exterior, false);
+            ring_pieces(exterior, options.field_edge_setback, side, &mut pieces);
+            for hole in polygon.interiors() {
+                let side = -interior_side(hole, true);
+                ring_pieces(hole, options.field_edge_setback, side, &mut pieces);
+            }
+        }
+    }
+    for layer in layers {
+        for geometry in &layer.geometries {
+            buffer_pieces(geometry, layer.distance, &mut pieces);
+        }
+    }
+
+    // Same filter + cascaded union as the building overlay
+    let candidates = overlay::candidate_buildings(field_block, &pieces);
+    let net = if candidates.is_empty() {
+        field_block.clone()
+    } else {
+        field_block.difference(&overlay::cascaded_union(candidates))
+    };
+
+    let total = net.0.len();
+    let kept: Vec<Polygon<f64>> = net
+        .0
+        .into_iter()
+        .filter(|p| p.unsigned_area() >= options.min_patch_area)
+        .collect();
+    let removed_patches = total - kept.len();
+    let geometry = MultiPolygon(kept);
+
+    let largest_rectangle = options
+        .rect_resolution
+        .and_then(|resolution| largest_inscribed_rectangle(&geometry, resolution));
+
+    UsableArea {
+        area: geometry.unsigned_area(),
+        geometry,
+        removed_patches,
+        largest_rectangle,
+    }
+}
+
+fn x_at(a: Coord<f64>, b: Coord<f64>, y: f64) -> f64 {
+    if b.y == a.y {
+        a.x
+    } else {
+        a.x + (b.x - a.x) * (y - a.y) / (b.y - a.y)
+    }
+}
+
+/// Cell index range `first..=last` whose open interval intersects `[lo, hi]`.
+fn cell_range(lo: f64, hi: f64, origin: f64, cell: f64, count: usize) -> Option<(usize, usize)> {
+    let first = ((lo - origin) / cell).floor().max(0.0);
+    let last = (((hi - origin) / cell).ceil() - 1.0).min(count as f64 - 1.0);
+    if last < first {
+        return None;
+    }
+    Some((first as usize, last as usize))
+}
+
+/// Largest axis-aligned rectangle fully inside `geometry`, on a raster of `resolution`
+/// (coarsened to at most MAX_RASTER_CELLS cells). A cell counts as inside if no edge
+/// passes through it and its centre is inside (even-odd), so the result is conservative.
+pub fn largest_inscribed_rectangle(
+    geometry: &MultiPolygon<f64>,
+    resolution: f64,
+) -> Option<Rect<f64>> {
+    let bounds = geometry.bounding_rect()?;
+    if resolution.is_nan() || resolution <= 0.0 {
+        return None;
+    }
+    let (width, height) = (bounds.width(), bounds.height());
+    let mut cell = resolution;
+    while (width / cell).ceil() * (height / cell).ceil() > MAX_RASTER_CELLS as f64 {
+        cell *= 2.0;
+    }
+    let cols = ((width / cell).ceil() as usize).max(1);
+    let rows = ((height / cell).ceil() as usize).max(1);
+    let origin = bounds.min();
+
+    // 1. Rasterize edges: blocked cells and centre-line crossings per row
+    let mut blocked = vec![false; rows * cols];
+    let mut crossings: Vec<Vec<f64>> = vec![Vec::new(); rows];
+    let rings = geometry
+        .0
+        .iter()
+        .flat_map(|p| std::iter::once(p.exterior()).chain(p.interiors()));
+    for ring in rings {
+        for line in ring.lines() {
+            let (a, b) = (line.start, line.end);
+            let (ylo, yhi) = (a.y.min(b.y), a.y.max(b.y));
+            let Some((r0, r1)) = cell_range(ylo, yhi, origin.y, cell, rows) else {
+                continue;
+            };
+            for r in r0..=r1 {
+                let band_lo = origin.y + r as f64 * cell;
+                let band_hi = band_lo + cell;
+                let (xa, xb) = if a.y == b.y {
+                    (a.x, b.x)
+                } else {
+                    (x_at(a, b, ylo.max(band_lo)), x_at(a, b, yhi.min(band_hi)))
+                };
+                if let Some((c0, c1)) = cell_range(xa.min(xb), xa.max(xb), origin.x, cell, cols) {
+                    blocked[r * cols + c0..=r * cols + c1].fill(true);
+                }
+                let yc = band_lo + cell / 2.0;
+                if (a.y <= yc) != (b.y <= yc) {
+                    crossings[r].push(x_at(a, b, yc));
+                }
+            }
+        }
+    }
+
+    // 2. Maximal rectangle of inside cells (largest rectangle in a histogram, per row)
+    let mut heights = vec![0usize; cols];
+    let mut best = (0usize, 0usize, 0usize, 0usize, 0usize); // (cells, row, first col, last col, height)
+    let mut stack: Vec<usize> = Vec::with_capacity(cols + 1);
+    for r in 0..rows {
+        crossings[r].sort_by(|a, b| a.total_cmp(b));
+        let mut k = 0;
+        for c in 0..cols {
+            let xc = origin.x + (c as f64 + 0.5) * cell;
+            while k < crossings[r].len() && crossings[r][k] < xc {
+                k += 1;
+            }
+            let inside = k % 2 == 1 && !blocked[r * cols + c];
+            heights[c] = if inside { heights[c] + 1 } else { 0 };
+        }
+
+        stack.clear();
+        for c in 0..=cols {
+            let h = if c < cols { heights[c] } else { 0 };
+            while let Some(&top) = stack.last() {
+                if heights[top] < h {
+                    break;
+                }
+                stack.pop();
+                let left = stack.last().map(|&s| s + 1).unwrap_or(0);
+                let cells = heights[top] * (c - left);
+                if cells > best.0 {
+                    best = (cells, r, left, c - 1, heights[top]);
+                }
+            }
+            stack.push(c);
+        }
+    }
+
+    let (cells, row, first, last, h) = best;
+    if cells == 0 {
+        return None;
+    }
+    Some(Rect::new(
+        Coord {
+            x: origin.x + first as f64 * cell,
+            y: origin.y + (row + 1 - h) as f64 * cell,
+        },
+        Coord {
+            x: origin.x + (last + 1) as f64 * cell,
+            y: origin.y + (row + 1) as f64 * cell,
+        },
+    ))
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use geo::{line_string, point, polygon, Contains};
+
+    fn square(x: f64, y: f64, size: f64) -> Polygon<f64> {
+        polygon![
+            (x: x, y: y),
+            (x: x + size, y: y),
+            (x: x + size, y: y + size),
+            (x: x, y: y + size),
+            (x: x, y: y),
+        ]
+    }
+
+    fn disc_area(radius: f64) -> f64 {
+        let n = DISC_SEGMENTS as f64;
+        n * radius * radius * (PI / n).tan()
+    }
+
+    #[test]
+    fn buffers_points_and_polygons() {
+        let point = buffer(&Geometry::Point(point!(x: 5.0, y: 5.0)), 2.0);
+        assert!((point.unsigned_area() - disc_area(2.0)).abs() < 1e-9);
+        assert!(point.unsigned_area() >= PI * 4.0);
+
+        // Square + 4 edge strips + 4 corner discs, either ring orientation
+        let expected = 100.0 + 40.0 + disc_area(1.0);
+        let ccw = buffer(&Geometry::Polygon(square(0.0, 0.0, 10.0)), 1.0);
+        assert!((ccw.unsigned_area() - expected).abs() < 1e-6);
+        let mut cw = square(0.0, 0.0, 10.0);
+        cw.exterior_mut(|ring| ring.0.reverse());
+        let cw = buffer(&Geometry::Polygon(cw), 1.0);
+        assert!((cw.unsigned_area() - expected).abs() < 1e-6);
+    }
+
+    #[test]
+    fn field_edge_inset_and_setbacks() {
+        let field = MultiPolygon(vec![square(0.0, 0.0, 100.0)]);
+        let inset = usable_area(
+            &field,
+            &[],
+            &UsableAreaOptions {
+                field_edge_setback: 10.0,
+                ..Default::default()
+            },
+        );
+        assert!((inset.area - 6400.0).abs() < 1e-6);
+
+        let house = SetbackLayer {
+            distance: 5.0,
+            geometries: vec![Geometry::Polygon(square(45.0, 45.0, 10.0))],
+        };
+        let result = usable_area(&field, &[house], &UsableAreaOptions::default());
+        let excluded = 100.0 + 4.0 * 50.0 + disc_area(5.0);
+        assert!((result.area - (10_000.0 - excluded)).abs() < 1e-6);
+    }
+
+    #[test]
+    fn drops_small_patches() {
+        let field = MultiPolygon(vec![polygon![
+            (x: 0.0, y: 0.0), (x: 100.0, y: 0.0), (x: 100.0, y: 10.0), (x: 0.0, y: 10.0), (x: 0.0, y: 0.0),
+        ]]);
+        // A road crossing the field at x = 20 with a 2 m setback: patches of 180 and 780 m²
+        let road = SetbackLayer {
+            distance: 2.0,
+            geometries: vec![Geometry::LineString(line_string![
+                (x: 20.0, y: -50.0), (x: 20.0, y: 50.0)
+            ])],
+        };
+        let options = UsableAreaOptions {
+            min_patch_area: 200.0,
+            ..Default::default()
+        };
+        let result = usable_area(&field, &[road], &options);
+        assert_eq!(result.geometry.0.len(), 1);
+        assert_eq!(result.removed_patches, 1);
+        assert!((result.area - 780.0).abs() < 1e-6);
+    }
+
+    #[test]
+    fn finds_largest_inscribed_rectangle() {
+        // L-shape: the 100 x 40 leg is the largest rectangle
+        let l_shape = MultiPolygon(vec![polygon![
+            (x: 0.0, y: 0.0), (x: 100.0, y: 0.0), (x: 100.0, y: 40.0),
+            (x: 40.0, y: 40.0), (x: 40.0, y: 100.0), (x: 0.0, y: 100.0), (x: 0.0, y: 0.0),
+        ]]);
+        let rect = largest_inscribed_rectangle(&l_shape, 1.0).unwrap();
+        assert!((rect.width() * rect.height() - 4000.0).abs() < 1e-9);
+        assert!(l_shape.0[0].contains(&rect.to_polygon()));
+
+        // Holes block cells; the result never overlaps them
+        let with_hole = MultiPolygon(vec![Polygon::new(
+            square(0.0, 0.0, 50.0).exterior().clone(),
+            vec![square(10.5, 10.5, 5.0).exterior().clone()],
+        )]);
+        let rect = largest_inscribed_rectangle(&with_hole, 1.0).unwrap();
+        assert!(rect.width() * rect.height() >= 34.0 * 50.0);
+        let hole = square(10.5, 10.5, 5.0);
+        assert!(hole.intersection(&rect.to_polygon()).unsigned_area() < 1e-9);
+    }
+}
@@ -0,0 +1,56 @@
+"""Tests for the benchmark fixtures and the regression comparison (no engine build needed)."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from benchmark_suite import compare_results
+from fixtures import synthetic_fixture
+
+
+@pytest.mark.parametrize("n", [1, 100, 1000])
+def test_synthetic_fixtures_are_valid(n):
+    shapely_geometry = pytest.importorskip("shapely.geometry")
+    field, buildings = synthetic_fixture(n)
+
+    assert len(buildings) == n
+    assert len(field["coordinates"][0]) > 400 and len(field["coordinates"]) >= 3  # many vertices + holes
+    assert shapely_geometry.shape(field).is_valid
+    assert all(shapely_geometry.shape(b).is_valid for b in buildings)
+    assert synthetic_fixture(n) == (field, buildings)  # deterministic
+
+
+def test_synthetic_fixture_has_touching_and_outside_buildings():
+    shapely_geometry = pytest.importorskip("shapely.geometry")
+    field, buildings = synthetic_fixture(500)
+    field_shape = shapely_geometry.shape(field)
+    shapes = [shapely_geometry.shape(b) for b in buildings]
+
+    assert any(not field_shape.intersects(s) for s in shapes)
+    assert any(a.touches(b) for a, b in zip(shapes, shapes[1:]))
+
+
+def test_compare_flags_slowdowns_and_area_changes():
+    baseline = [
+        {"scenario": "synthetic_100", "path": "end_to_end", "median_ms": 2.0, "net_area_m2": 1000.0},
+        {"scenario": "synthetic_1000", "path": "end_to_end", "median_ms": 20.0, "net_area_m2": 5000.0},
+        {"scenario": "synthetic_1", "path": "core_json", "median_ms": 0.01, "net_area_m2": 10.0},
+    ]
+    current = [
+        {"scenario": "synthetic_100", "path": "end_to_end", "median_ms": 2.1, "net_area_m2": 1000.0},
+        {"scenario": "synthetic_1000", "path": "end_to_end", "median_ms": 30.0, "net_area_m2": 5000.0},
+        {"scenario": "synthetic_1", "path": "core_json", "median_ms": 0.03, "net_area_m2": 10.5},
+        {"scenario": "new_fixture", "path": "end_to_end", "median_ms": 1.0, "net_area_m2": 1.0},
+    ]
+
+    rows = {(r["scenario"], r["path"]): r for r in compare_results(baseline, current, threshold=0.15)}
+
+    assert len(rows) == 3
+    assert not rows[("synthetic_100", "end_to_end")]["regression"]
+    assert rows[("synthetic_1000", "end_to_end")]["regression"]
+    # 3x slower but below the noise floor; the area change is still caught
+    assert not rows[("synthetic_1", "core_json")]["regression"]
+    assert rows[("synthetic_1", "core_json")]["area_changed"]
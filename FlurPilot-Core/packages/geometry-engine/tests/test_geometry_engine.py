@@ -1,6 +1,15 @@
 import pytest
 import json
-from geometry_engine import calculate_virtual_parcel, __version__
+from geometry_engine import (
+    calculate_virtual_parcel,
+    calculate_virtual_parcels_batch,
+    calculate_usable_area,
+    calculate_usable_area_batch,
+    calculate_virtual_parcel_arrays,
+    pack_polygons,
+    unpack_multipolygon,
+    __version__,
+)
 
 
 def test_version():
@@ -141,6 +150,148 @@ def test_geojson_feature():
     assert result['net_area_sqm'] == pytest.approx(100.0, abs=1.0)
 
 
+def test_batch_calculation():
+    """Test batch API: plain GeoJSON objects in, one result per item, errors per item"""
+    square = lambda size: {
+        "type": "Polygon",
+        "coordinates": [[[0, 0], [size, 0], [size, size], [0, size], [0, 0]]]
+    }
+
+    items = [
+        {"id": "a", "field_block": square(100), "buildings": [square(10)]},
+        {"id": "b", "field_block": square(50), "buildings": []},
+        {"id": "c", "field_block": {"type": "Point", "coordinates": [0, 0]}, "buildings": []},
+    ]
+
+    results = json.loads(calculate_virtual_parcels_batch(json.dumps(items)))
+
+    assert [r['id'] for r in results] == ["a", "b", "c"]
+    assert results[0]['net_area_sqm'] == pytest.approx(9900.0, abs=1.0)
+    assert results[0]['virtual_parcel']['type'] == "MultiPolygon"
+    assert results[1]['net_area_sqm'] == pytest.approx(2500.0, abs=1.0)
+    # Invalid input fails only its own item
+    assert results[2]['error'] is not None
+    assert results[2]['net_area_sqm'] is None
+
+
+def test_arrays_calculation():
+    """Test coordinate-array API: field with a hole minus two buildings"""
+    field = {
+        "type": "Polygon",
+        "coordinates": [
+            [[0, 0], [100, 0], [100, 100], [0, 100], [0, 0]],
+            [[40, 40], [60, 40], [60, 60], [40, 60], [40, 40]],
+        ]
+    }
+    buildings = [
+        {"type": "Polygon", "coordinates": [[[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]]},
+        {"type": "MultiPolygon", "coordinates": [[[[90, 90], [100, 90], [100, 100], [90, 100], [90, 90]]]]},
+    ]
+
+    coords, ring_offsets, polygon_offsets = pack_polygons([field])
+    assert coords.dtype == "float64" and len(coords) == 20
+    assert list(ring_offsets) == [0, 5, 10]
+    assert list(polygon_offsets) == [0, 2]
+
+    (coords, ring_offsets, polygon_offsets), net_area = calculate_virtual_parcel_arrays(
+        pack_polygons([field]), pack_polygons(buildings)
+    )
+    assert net_area == pytest.approx(10000.0 - 400.0 - 200.0, abs=1.0)
+
+    geometry = unpack_multipolygon(coords, ring_offsets, polygon_offsets)
+    assert geometry["type"] == "MultiPolygon"
+    assert len(geometry["coordinates"][0]) == 2  # hole is preserved
+
+
+def test_arrays_rejects_bad_offsets():
+    """Inconsistent offsets raise ValueError instead of reading out of bounds"""
+    coords, ring_offsets, polygon_offsets = pack_polygons([
+        {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 0]]]}
+    ])
+    with pytest.raises(ValueError):
+        calculate_virtual_parcel_arrays((coords, ring_offsets + 1, polygon_offsets), pack_polygons([]))
+
+
+def test_geographic_area_in_square_meters():
+    """EPSG:4326 input: overlay in UTM, geodesic area in m² (like ST_Area(geography))"""
+    field = {
+        "type": "Polygon",
+        "coordinates": [[[11.50, 48.00], [11.51, 48.00], [11.51, 48.01], [11.50, 48.01], [11.50, 48.00]]]
+    }
+    building = {
+        "type": "Polygon",
+        "coordinates": [[[11.504, 48.004], [11.506, 48.004], [11.506, 48.006], [11.504, 48.006], [11.504, 48.004]]]
+    }
+    request = {
+        "field_block_geojson": json.dumps(field),
+        "building_geojsons": [json.dumps(building)],
+        "crs": "EPSG:4326"
+    }
+
+    result = json.loads(calculate_virtual_parcel(json.dumps(request)))
+
+    # Ellipsoidal area of the 0.01° and 0.002° cells at 48°N
+    assert result['net_area_sqm'] == pytest.approx(829682.3 - 33187.3, rel=1e-3)
+    # Result geometry stays in lon/lat
+    ring = json.loads(result['virtual_parcel_geojson'])['coordinates'][0][0]
+    assert all(11.49 < x < 11.52 and 47.99 < y < 48.02 for x, y in ring)
+
+
+def test_unsupported_crs_is_rejected():
+    request = {
+        "field_block_geojson": json.dumps({"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 0]]]}),
+        "building_geojsons": [],
+        "crs": "EPSG:3857"
+    }
+    with pytest.raises(ValueError):
+        calculate_virtual_parcel(json.dumps(request))
+
+
+def test_usable_area_with_setbacks():
+    """Per-layer setbacks, field-edge inset and the largest inscribed rectangle (metric input)"""
+    request = {
+        "field_block": {"type": "Polygon", "coordinates": [[[0, 0], [200, 0], [200, 100], [0, 100], [0, 0]]]},
+        "layers": [
+            # Road along x = 100 with 5 m setback splits the field
+            {"name": "roads", "distance_m": 5.0,
+             "geometries": [{"type": "LineString", "coordinates": [[100, -10], [100, 110]]}]},
+            # Shed in a corner, 10 m setback (Feature input)
+            {"name": "buildings", "distance_m": 10.0,
+             "geometries": [{"type": "Feature", "properties": {}, "geometry": {
+                 "type": "Polygon", "coordinates": [[[180, 80], [190, 80], [190, 90], [180, 90], [180, 80]]]}}]},
+        ],
+        "field_edge_setback_m": 2.0,
+        "min_patch_sqm": 100.0,
+        "rect_resolution_m": 1.0
+    }
+
+    result = json.loads(calculate_usable_area(json.dumps(request)))
+
+    assert result["patch_count"] == 2
+    assert result["removed_patch_count"] == 0
+    # Left patch 93 x 96 is untouched by the shed setback
+    rect = result["largest_rectangle"]
+    assert rect["area_sqm"] == pytest.approx(93 * 96)
+    assert result["usable_area_sqm"] < 2 * 93 * 96
+
+
+def test_usable_area_geographic_and_batch():
+    field = {
+        "type": "Polygon",
+        "coordinates": [[[11.50, 48.00], [11.51, 48.00], [11.51, 48.01], [11.50, 48.01], [11.50, 48.00]]]
+    }
+    requests = [
+        {"id": "a", "field_block": field, "crs": "EPSG:4326", "field_edge_setback_m": 20.0},
+        {"id": "b", "field_block": field, "crs": "EPSG:3857"},
+    ]
+
+    results = json.loads(calculate_usable_area_batch(json.dumps(requests)))
+
+    # ~745 m x 1112 m cell, 20 m inset on every side
+    assert results[0]["usable_area_sqm"] == pytest.approx(829682.3 - 2 * 20 * (745 + 1112), rel=5e-3)
+    assert results[1]["error"] and results[1]["usable_area_sqm"] is None
+
+
 # Benchmark tests (optional, requires pytest-benchmark)
 class TestBenchmarks:
     def test_benchmark_simple(self, benchmark):